@@ -36,6 +36,8 @@ from dolfin import *
 Feature:  coupled velocity and pressure laminar flow with G2 stabilisaton
 
 General Galerkin (G2) stabilisaton (reference paper: ), but it still does not work for Re>10.
+advection_settings = {'stabilization_method': 'G2', 'Re': 100, 'kappa1': 4, 'kappa2': 2, 'cellwise_stabilization': True}
+    `cellwise_stabilization`: delta is assembled as cell-wise DG0 field, `frozen_stabilization`: computed only once
 Turbulent flow will not be implemented: use third-party solvers like Oasis: a high-level/high-performance open source Navier-Stokes solver
 OpenFOAM solver.
 
@@ -114,6 +116,13 @@ class CoupledNavierStokesSolver(SolverBase):
         _w_prev = Function(self.function_space)  # on previous time-step mesh
         _w_prev.vector()[:] = self.w_prev.vector()[:]  # assuming no topo change
         self.w_prev = _w_prev  # 
+        for name in ('w_pp', 'w_ppp'):  # history for multistep time scheme
+            if getattr(self, name, None) is not None:
+                _w = Function(self.function_space)
+                _w.vector()[:] = getattr(self, name).vector()[:]
+                setattr(self, name, _w)
+        self._static_form = None  # form must be regenerated for the new function space
+        self._dirichlet_bc_cache = {}
 
     def get_body_source(self):
         # FIXME: source term type, centrifugal force is possible
@@ -128,7 +137,7 @@ class CoupledNavierStokesSolver(SolverBase):
 
     def get_initial_field(self):
         # assume: velocity is a tupe of constant, or string expression, or a function of the mixed functionspace
-        print("self.initial_values = ", self.initial_values)
+        self.logger.debug("self.initial_values = %s", self.initial_values)
 
         if isinstance(self.initial_values, (Function,)):
             try:
@@ -216,9 +225,9 @@ class CoupledNavierStokesSolver(SolverBase):
         W = self.function_space
         ## boundary setup and update for each time step
 
-        print("Updating boundary at time iter = {}".format(time_iter_))
+        self.logger.debug("Updating boundary at time iter = %d", time_iter_)
         ds = Measure("ds", subdomain_data=self.boundary_facets)
-        if time_iter_ == 0:
+        if time_iter_ == 0 and not self.parallel:
             plot(self.boundary_facets, title ="boundary colored by ID")  # diff color do visual diff boundary
 
         # Define unknown and test function(s)
@@ -262,8 +271,7 @@ class CoupledNavierStokesSolver(SolverBase):
             # it is possible to use SPUG (not rotating velocity),  with and without body source
             Tsettings['advection_settings'] = {'stabilization_method': 'IP', 'alpha': 0.1}
             #Tsettings['body_source'] = # incomplate form?
-            import pprint
-            pprint.pprint(Tsettings)
+            self.logger.debug('settings of the temperature solver: %s', Tsettings)
             from FenicsSolver import  ScalarTransportSolver
             Tsolver = ScalarTransportSolver.ScalarTransportSolver(Tsettings)
             #Tsover.is_mixed_function_space = False
@@ -271,6 +279,11 @@ class CoupledNavierStokesSolver(SolverBase):
             #print('type(u_current)', u_current, type(u_current))  # ufl.tensors.ListTensor
             #print('type(u)', u, type(u))
             Tsolver.convective_velocity = u_current
+            if self.transient_settings['transient']:  # share time step and multistep history with the coupled form
+                Tsolver.time_step_constant = self.get_time_step_constant(time_iter_)
+                if self.time_scheme:
+                    Tsolver.time_scheme_coefficients = self.get_time_scheme_coefficients()
+                    Tsolver.time_history = [split(w)[2] for w in self.get_time_history(up_prev)]
             #ds should be passed to Tsolver? but they are actually same
             #convection stab can be a problem!
             F_T, T_bc = Tsolver.generate_form(time_iter_, T, Tq, T_current, T_prev)
@@ -280,7 +293,7 @@ class CoupledNavierStokesSolver(SolverBase):
             epsdot = 0.5 * (grad(u) + grad(u).T)
             viscous_heating = inner(epsdot, tau)  # method 1
             #viscous_heating =  2 * self.viscosity(up_current) * tr(dot(epsdot, epsdot))
-            print('type of viscous heating:', type(viscous_heating))
+            self.logger.debug('type of viscous heating: %s', type(viscous_heating))
             ## sigma * u:  heat flux,  sigma * grad(u) heat source
             #F_T -= viscous_heating *Tq*dx  # need sum to scalar!
             return F_T, T_bc
@@ -321,7 +334,7 @@ class CoupledNavierStokesSolver(SolverBase):
         if 'reference_frame_settings' in self.settings:
             rfs = self.settings['reference_frame_settings']
             if rfs['type'] == 'ALE':  # also used in FSI mesh moving
-                advection_velocity -= self.translate_value(rfs['mesh_velocity'])
+                advection_velocity -= self.translate_value(rfs['mesh_velocity'], read_only = True)
                 # treated mesh_velocity as part of advection, so it can be stabilized
             #elif rfs['type'] == 'SRF':
             #    pass
@@ -352,11 +365,15 @@ class CoupledNavierStokesSolver(SolverBase):
             else:  # convection dominant, test_f<trial_f*h
                 U0_square = dot(advection_velocity, advection_velocity)
                 if self.transient:
-                    dt = self.get_time_step(time_iter_)
+                    dt = self.get_time_step_constant(self.current_step)  # F_static() has no time step index
                     delta1 = ads['kappa1'] /2.0 * 1.0/sqrt(1.0/(dt*dt) + 1.0/U0_square/h/h)
                 else:
                     delta1 = ads['kappa1'] /2.0 * h/sqrt(U0_square)
                 delta2 = ads['kappa2'] * h
+            if 'cellwise_stabilization' in ads and ads['cellwise_stabilization']:
+                # parameter of each cell is assembled into DG0 field, updated for each step (and Picard iteration) unless frozen
+                frozen = ads['frozen_stabilization'] if 'frozen_stabilization' in ads else False
+                delta1 = self.get_cell_field('g2_delta1', delta1, frozen)
             D_u =  delta1 * inner(dot(advection_velocity, grad(u)), dot(advection_velocity, grad(v)))*dx
             # D_u += delta2 * dot(grad(rho_0, grad(v)))  # D_s has the same item, why?
             # D_s =    density related item,  it should be ignored for incompressible NS equation
@@ -377,8 +394,11 @@ class CoupledNavierStokesSolver(SolverBase):
             u_prev, p_prev = split(up_prev)
         F = self.F_static(trial_function, test_function, up_current)
         #F_prev = self.F_static(prev, test_function, up_prev)  # should works for both Picard and Newton
+        if self.time_scheme:  # BDF multistep scheme selected in transient_settings
+            u_history = [split(w)[0] for w in self.get_time_history(up_prev)]
+            return F + inner(self.time_derivative(time_iter_, u, u_history), v) * dx
         #TODO: it is backward Euler, not Crank-Nicolson (2nd , unconditionally stable for diffusion problem)
-        return F + (1 / self.get_time_step(time_iter_)) * inner(u - u_prev, v) * dx
+        return F + (1 / self.get_time_step_constant(time_iter_)) * inner(u - u_prev, v) * dx
 
     def update_boundary_conditions(self, time_iter_, trial_function, test_function, ds):
         # shared by compressible and incompressible fluid solver
@@ -421,7 +441,7 @@ class CoupledNavierStokesSolver(SolverBase):
                 bc_values = boundary['values'].values()
             for bc in bc_values:  # a list of boundary values or dict
                 if bc['variable'] == 'velocity':
-                    print(bc['value'])
+                    self.logger.debug('boundary value: %s', bc['value'])
                     bvalue = self.translate_value(bc['value'])
                     '''  only velocity vector is acceptable, it must NOT be a magnitude scalar
                     if hasattr(bc['value'], '__len__') and len(bc['value']) == self.dimension:
@@ -431,8 +451,8 @@ class CoupledNavierStokesSolver(SolverBase):
                         raise TypeError('FacetNormal can not been used in Dirichlet boundary')
                     '''
                     if bc['type'] == 'Dirichlet':
-                        Dirichlet_bcs_up.append(DirichletBC(W.sub(i_velocity), bvalue, self.boundary_facets, boundary['boundary_id']) )
-                        print("found velocity boundary for id = {}".format(boundary['boundary_id']))
+                        Dirichlet_bcs_up.append(self.get_dirichlet_bc(W.sub(i_velocity), bvalue, boundary['boundary_id'], 'velocity'))
+                        self.logger.debug("found velocity boundary for id = %s", boundary['boundary_id'])
                     elif bc['type'] == 'Neumann':  # zero gradient, outflow
                         NotImplementedError('Neumann boundary for velocity is not implemented')
                     elif bc['type'] == 'symmetry':
@@ -443,14 +463,14 @@ class CoupledNavierStokesSolver(SolverBase):
                         F_bc.append(dot(grad(u), n)*v * ds(boundary['boundary_id']))
                         #velocity gradient is zero, do nothing here, no normal stress, see [COMSOL Multiphysics Modeling Guide]
                     else:
-                        print('velocity boundary type`{}` is not supported'.format(bc['type']))
+                        self.logger.warning('velocity boundary type`%s` is not supported', bc['type'])
                 elif bc['variable'] == 'pressure':
                     bvalue = self.translate_value(bc['value'])  # self.get_boundary_value(bc, 'pressure')
                     if bc['type'] == 'Dirichlet':  # pressure  inlet or outlet
-                        Dirichlet_bcs_up.append(DirichletBC(W.sub(i_pressure), bvalue, self.boundary_facets, boundary['boundary_id']) )
+                        Dirichlet_bcs_up.append(self.get_dirichlet_bc(W.sub(i_pressure), bvalue, boundary['boundary_id'], 'pressure'))
                         F_bc.append(inner(bvalue*n, v)*ds(boundary['boundary_id'])) # very important to make sure convergence
                         F_bc.append(-nu*inner((grad(u) + grad(u).T)*n, v)*ds(boundary['boundary_id']))  #  pressure no viscous stress boundary
-                        print("found pressure boundary for id = {}".format(boundary['boundary_id']))
+                        self.logger.debug("found pressure boundary for id = %s", boundary['boundary_id'])
                     elif bc['type'] == 'symmetry':
                         pass # already set in velocity, should be natural zero gradient for pressure
                     elif bc['type'] == 'farfield':   # 'open' to large volume is same with farfield
@@ -458,13 +478,13 @@ class CoupledNavierStokesSolver(SolverBase):
                     elif bc['type'] == 'Neumann':  # zero gradient
                         NotImplementedError('Neumann boundary for pressure is not implemented')
                     else:
-                        print('pressure boundary type`{}` is not supported thus ignored'.format(bc['type']))
+                        self.logger.warning('pressure boundary type`%s` is not supported thus ignored', bc['type'])
 
                 elif bc['variable'] == 'temperature':  # TODO: how to share code and boundary setup with ScalarTransportSolver
                     if self.compressible:  # used by compressible NS solver
                         bvalue = self.translate_value(bc['value'])
                         if bc['type'] == 'Dirichlet':
-                            Dirichlet_bcs_up.append(DirichletBC(W.sub(i_temperature), bvalue, self.boundary_facets, boundary['boundary_id']) )
+                            Dirichlet_bcs_up.append(self.get_dirichlet_bc(W.sub(i_temperature), bvalue, boundary['boundary_id'], 'temperature'))
                             #print("found temperature boundary for id = {}".format(boundary['boundary_id']))
                         ''' # not yet implemented for those bc below
                         if bc['type'] == 'symmetry':
@@ -482,13 +502,20 @@ class CoupledNavierStokesSolver(SolverBase):
                             htc = self.translate_value(bc['value'])  # must be specified in Constant or Expressed in setup dict
                             integrals_N.append( htc*(Ta-T)*Tq*ds(i))
                         else:
-                            print('temperature boundary type`{}` is not supported thus ignored'.format(bc['type']))
+                            self.logger.warning('temperature boundary type`%s` is not supported thus ignored', bc['type'])
                         '''
                 else:
-                    print('boundary setup is done in scalar transport for incompressible flow'.format(bc['variable']))
+                    self.logger.debug('boundary setup of `%s` is done in scalar transport for incompressible flow', bc['variable'])
         ## end of boundary setup
         return Dirichlet_bcs_up, F_bc
 
+    def get_fieldsplit_dofs(self):
+        # velocity (and temperature) as the first split, pressure as the second split for the Schur complement
+        W = self.function_space
+        dofs = [W.sub(i).dofmap().dofs() for i in range(W.num_sub_spaces())]
+        u_dofs = np.sort(np.concatenate([d for i, d in enumerate(dofs) if i != 1]))
+        return [('0', u_dofs), ('1', dofs[1])]
+
     def solve_form(self, F, up_, Dirichlet_bcs_up):
         # only for static case?
         if self.using_nonlinear_solver:
@@ -507,23 +534,28 @@ class CoupledNavierStokesSolver(SolverBase):
                 # solve the linear stokes flow to avoid up_s = 0
 
                 up_temp.assign(up_)
+                if iter_ > 0:
+                    self.update_cell_fields()  # stabilization parameter of the updated velocity
                 # other solving methods
                 up_ = self.solve_linear_problem(F, up_, Dirichlet_bcs_up)
                 #  AMG is not working with mixed function space
                 
                 #limiting result value, if the problem is highly nonlinear
-                diff_up = up_.vector().array() - up_temp.vector().array()
-                eps = np.linalg.norm(diff_up, ord=np.Inf)
+                # vector operation on local entries, norm is a collective reduction, so it is correct in parallel
+                diff_up = up_.vector() - up_temp.vector()
+                eps = diff_up.norm('linf')
 
-                print("iter = {:d}; eps_up = {:e}; time elapsed = {}\n".format(iter_, eps, timer_solver.elapsed()))
+                self.logger.info("iter = %d; eps_up = %e; time elapsed = %s", iter_, eps, timer_solver.elapsed())
 
                 ## underreleax should be defined here, Courant number,
-                up_.vector()[:] = up_temp.vector().array() + diff_up * under_relax_ratio
+                up_.vector().zero()
+                up_.vector().axpy(1.0, up_temp.vector())
+                up_.vector().axpy(under_relax_ratio, diff_up)
 
                 iter_ += 1
             ## end of Picard loop
             timer_solver.stop()
-            print("*" * 10 + " end of Navier-Stokes Picard iteration" + "*" * 10)
+            self.logger.info("end of Navier-Stokes Picard iteration")
 
             return up_
 
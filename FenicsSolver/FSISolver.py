@@ -11,7 +11,7 @@
 5. move mesh for fluid solver,  w_current, w_prev need to be in different function space, in order to save deformed mesh and data
 
 Limitations:
-- serial mapping only
+- serial only, SolverError is raised if it runs under MPI with more than one process
 - no movement relaxation
 - no higher Re fluid solver
 - will not support multiple frictional contact
@@ -25,6 +25,7 @@ from FenicsSolver.LinearElasticitySolver import LinearElasticitySolver
 from FenicsSolver.SolverBase import SolverBase, SolverError
 from dolfin import *
 import math, copy
+import logging
 import numpy as  np
 
 _debug = False
@@ -36,11 +37,11 @@ class CoupledSolver():
     """
     def __init__(self, solver_input):
         self.settings = solver_input
+        self.logger = logging.getLogger('FenicsSolver.' + self.__class__.__name__)
 
     def solve_transient(self):
         #
         self.init_solver()
-        file = File("pressure_output.pvd", "compressed")
 
         # Define a parameters for a stationary loop
         self.transient_settings = self.settings['transient_settings']
@@ -53,39 +54,52 @@ class CoupledSolver():
             t_end = self.current_time+ 1
 
         cs = self.settings['coupling_settings']
+        rs = self.settings['report_settings'] if 'report_settings' in self.settings else {}
+        if 'result_filename' in rs and rs['result_filename']:
+            result_filename = rs['result_filename']
+        else:
+            result_filename = 'fsi_fluid_output.xdmf'  # velocity and pressure on the moving mesh in one file
+        cf = rs['checkpoint_freq'] if 'checkpoint_freq' in rs else None
+        if 'checkpoint_filename' in rs and rs['checkpoint_filename']:
+            checkpoint_filename = rs['checkpoint_filename']
+        else:
+            checkpoint_filename = 'checkpoint.h5'
+        if 'restart' in ts and ts['restart']:
+            self.load_checkpoint(ts['restart'] if isinstance(ts['restart'], (str, type(u''))) else checkpoint_filename)
         #print(ts, self.current_time, t_end)
         # Transient loop also works for steady, by set `t_end = self.time_step`
         timer_solver_all = Timer("TimerSolveAll")  # 2017.2 Ubuntu Python2 errors
         timer_solver_all.start()
-        while (self.current_time < t_end):
-            if ts['transient']:
-                dt = self.get_time_step(self.current_step)
-            else:
-                dt = 1
-
-            # in the first step, initial flow field will be calc in a steady way, since up_current == up_prev
-            for s in self.solver_list:
-                s.current_step = self.current_step
-            ## overloaded by derived classes, maybe move out of temporal loop if boundary does not change form
-            self.solve_current_step()
-            p_result = self.fluid_solver.w_current.split()[1]
-            p_result.rename('pressure', 'label')
-            file << (p_result, self.current_time)  # todo: moved to fluid_solver
-            u_result = self.fluid_solver.w_current.split()[0]
-            u_result.rename('velocity', 'label')
-            file << (u_result, self.current_time)  # todo: moved to fluid_solver
-
-            print("Current time = ", self.current_time, " TimerSolveAll = ", timer_solver_all.elapsed())
-            # stop for steady case, or update time
-
-            if not self.transient_settings['transient']:
-                break
-            #quasi-static, check value change is small enough!
+        try:
+            while (self.current_time < t_end):
+                if ts['transient']:
+                    dt = self.get_time_step(self.current_step)
+                else:
+                    dt = 1
+
+                # in the first step, initial flow field will be calc in a steady way, since up_current == up_prev
+                for s in self.solver_list:
+                    s.current_step = self.current_step
+                ## overloaded by derived classes, maybe move out of temporal loop if boundary does not change form
+                self.solve_current_step()
+                self.fluid_solver.current_time = self.current_time
+                self.fluid_solver.save(result_filename)
+
+                self.logger.info("Current time = %s, TimerSolveAll = %s", self.current_time, timer_solver_all.elapsed())
+                # stop for steady case, or update time
+
+                if not self.transient_settings['transient']:
+                    break
+                #quasi-static, check value change is small enough!
             
-            self.current_step += 1
-            self.current_time += dt
-        ## end of time loop
-        timer_solver_all.stop()
+                self.current_step += 1
+                self.current_time += dt
+                if cf and cf>0 and (self.current_step % cf == 0):
+                    self.save_checkpoint(checkpoint_filename)
+            ## end of time loop
+        finally:  # results of the steps before an error are kept in a closed file
+            timer_solver_all.stop()
+            self.fluid_solver.close_result_writer()
         self.plot_result()
 
         return [solver.result for solver in self.solver_list]
@@ -94,6 +108,27 @@ class CoupledSolver():
         for solver in self.solver_list:
             solver.init_solver()
 
+    def get_checkpoint_functions(self, i):
+        # coupling state of the i-th participant solver, written into the same checkpoint file
+        return None
+
+    def _participant_checkpoint_filename(self, filename, i):
+        root = filename[:-3] if filename.endswith('.h5') else filename
+        return root + '_{}.h5'.format(i)
+
+    def save_checkpoint(self, filename):
+        # one checkpoint file for each participant solver
+        for i, solver in enumerate(self.solver_list):
+            solver.current_step = self.current_step
+            solver.current_time = self.current_time
+            solver.save_checkpoint(self._participant_checkpoint_filename(filename, i), self.get_checkpoint_functions(i))
+
+    def load_checkpoint(self, filename):
+        for i, solver in enumerate(self.solver_list):
+            solver.load_checkpoint(self._participant_checkpoint_filename(filename, i), self.get_checkpoint_functions(i))
+        self.current_step = self.solver_list[0].current_step
+        self.current_time = self.solver_list[0].current_time
+
     def solve(self):
         self.result = self.solve_transient()
         return self.result
@@ -114,7 +149,7 @@ class CoupledSolver():
             if len(ts) >= time_iter_:
                 dt = ts[time_iter_] - ts[time_iter_]
             else:
-                print('time step can only be a sequence or scalar')
+                self.logger.warning('time step can only be a sequence or scalar')
         #self.mesh.hmin()  # Compute minimum cell diameter. courant number
         return dt
 
@@ -126,15 +161,20 @@ class CoupledSolver():
             if len(self.transient_settings['time_series']) >= time_iter_:
                 tp = self.transient_settings['time_series'][time_iter_]
             else:
-                print('time point can only be a sequence of time series or derived from constant time step')
+                self.logger.warning('time point can only be a sequence of time series or derived from constant time step')
         return tp
 
 
 class FSISolver(CoupledSolver):
-    """ 
+    """ partitioned fluid-structure interaction of CoupledNavierStokesSolver and LinearElasticitySolver,
+    it runs only in serial: fluid and solid meshes are SubMesh of the parent mesh, and their vertex maps are
+    local to a process, so it is not included in the default cases of benchmarks and scaling harness
     """
     def __init__(self, solver_input):
         self.settings = solver_input
+        if MPI.size(mpi_comm_world()) > 1:
+            # SubMesh and the vertex maps between parent mesh, fluid and solid meshes are local to a process
+            raise SolverError('FSISolver can only run in serial, SubMesh based interface mapping is not distributed')
         for s in self.settings['participants']:
             if s['solver_domain'] == "fluidic":
                 self.fluid_solver = CoupledNavierStokesSolver(s['settings'])
@@ -144,6 +184,10 @@ class FSISolver(CoupledSolver):
             else:
                 raise SolverError("unsupported subdomain solver: {}".format(s['solver_name']))
         self.solver_list = [self.fluid_solver, self.solid_solver]
+        self.logger = self.fluid_solver.logger  # rank and rate limit filters are set by the participant solver
+        for s in self.solver_list:
+            s.using_static_form = False  # interface boundary values are replaced in settings for each step
+        self.fluid_solver.moving_mesh = True  # mesh is rewritten in result file
         self.detect_interfaces()
         self.original_solid_mesh = copy.copy(self.solid_solver.mesh)
         self.original_fluid_mesh = copy.copy(self.fluid_solver.mesh)
@@ -265,6 +309,12 @@ class FSISolver(CoupledSolver):
         self.move_fluid_interface(mesh_disp)
         # self.move_solid_interface()  # not necessary for submeshing no interpolation
 
+    def get_checkpoint_functions(self, i):
+        # fluid mesh displacement is needed to continue moving the fluid mesh
+        if self.solver_list[i] is self.fluid_solver:
+            return {'previous_fluid_mesh_disp': self.previous_fluid_mesh_disp}
+        return None
+
     def detect_interfaces(self, specific_type = 'FSI'):
         # matching by boundary name, not by coordinate coincidence, also comes from setting dict
         self.interfaces = {} # list of tuple of dict
@@ -285,7 +335,7 @@ class FSISolver(CoupledSolver):
             #bc_values = {'type': 'stress', 'value': boundary_stress}
             self.solid_solver.settings['boundary_conditions'][iface]['value'] = boundary_stress
             self.solid_solver.settings['boundary_conditions'][iface]['type'] = 'stress'
-            print("updated interface:", self.solid_solver.settings['boundary_conditions'][iface])
+            self.logger.debug("updated interface: %s", self.solid_solver.settings['boundary_conditions'][iface])
 
     def move_fluid_interface(self, mesh_disp):
         # assing no fluid mesh topo change
@@ -371,7 +421,8 @@ class FSISolver(CoupledSolver):
             bc_values = [{'variable': "velocity",'type': 'Dirichlet', 'value': boundary_velocity}]
             self.fluid_solver.settings['boundary_conditions'][iface]['value'] = bc_values
 
-        print('max mesh disp', np.max(mesh_disp.vector().array()))
+        if self.logger.isEnabledFor(logging.DEBUG):  # collective reduction, the level is the same on all processes
+            self.logger.debug('max mesh disp %s', mesh_disp.vector().max())
         return mesh_disp
 
     def move_solid_interface(self):
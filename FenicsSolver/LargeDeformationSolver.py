@@ -45,7 +45,7 @@ class LargeDeformationSolver(NonlinearElasticitySolver):
 
     def generate_function_space(self, periodic_boundary):
         self.is_mixed_function_space = True
-        print('self.is_mixed_function_space in the solver', self.is_mixed_function_space)
+        self.logger.debug('self.is_mixed_function_space in the solver %s', self.is_mixed_function_space)
         V = VectorElement(self.settings['fe_family'], self.mesh.ufl_cell(), self.settings['fe_degree']) 
         Q = FiniteElement(self.settings['fe_family'], self.mesh.ufl_cell(), self.settings['fe_degree'])
         mixed_element = MixedElement([V, V, Q])  # displacement, velocity, pressure
@@ -64,7 +64,7 @@ class LargeDeformationSolver(NonlinearElasticitySolver):
         # _initial_values.append(0.0)
         _initial_values = (self.dimension*2+1)*(0.0,)
         _expr = tuple([str(v) for v in _initial_values])
-        print(_expr)
+        self.logger.debug('%s', _expr)
         _initial_values_expr = Expression( _expr, degree = self.settings['fe_degree'])
         up0 = interpolate(_initial_values_expr, self.function_space)
         return up0
@@ -72,7 +72,7 @@ class LargeDeformationSolver(NonlinearElasticitySolver):
 
     def get_flux(self, u, mag_vector): 
         F = Identity(self.dimension) + grad(u)
-        print("mag_vector", mag_vector)
+        self.logger.debug('mag_vector %s', mag_vector)
         return det(F)*dot(inv(F).T, mag_vector)
 
     def generate_form(self, time_iter_, w_trial, w_test, w_current, w_prev):
@@ -110,7 +110,7 @@ class LargeDeformationSolver(NonlinearElasticitySolver):
             return S, pp
     
         if self.transient_settings['transient']:
-            dt = self.get_time_step(time_iter_)
+            dt = self.get_time_step_constant(time_iter_)
             q = 0.5  # time fwd scheme 0.5: crank-niklas
         else:
             raise SolverError("large deformation solver must be solved in a transient way")
@@ -127,7 +127,7 @@ class LargeDeformationSolver(NonlinearElasticitySolver):
         F = F1 + F2
         ds= Measure("ds", subdomain_data=self.boundary_facets)  # if later marking updating in this ds?
         bcs, integrals_F = self.update_boundary_conditions(time_iter_, u, _v, ds)
-        if time_iter_==0:
+        if time_iter_==0 and not self.parallel:
             plot(self.boundary_facets, title = "boundary facets colored by ID")
             #interactive()
 
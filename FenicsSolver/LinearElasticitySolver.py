@@ -116,7 +116,7 @@ class LinearElasticitySolver(SolverBase):
             i = bc_settings['boundary_id']
             bc = self.get_boundary_variable(bc_settings)
 
-            print(bc)
+            self.logger.debug('boundary condition: %s', bc)
             if bc['type'] =='Dirichlet' or bc['type'] =='displacement':
                 if not self.is_mixed_function_space:
                     bv = bc['value']  # translate_value() is not supported for value types: [1e-3, None, None]
@@ -124,11 +124,11 @@ class LinearElasticitySolver(SolverBase):
                         axis_i=0
                         for disp in bv:
                             if not disp is None:  # None means free of constraint, but zero is kind of constraint
-                                dbc = DirichletBC(V.sub(axis_i), self.translate_value(disp), self.boundary_facets, i)
+                                dbc = self.get_dirichlet_bc(V.sub(axis_i), self.translate_value(disp), i, component=axis_i)
                                 bcs.append(dbc)
                             axis_i += 1
                     else:
-                        dbc = DirichletBC(V, self.translate_value(bv), self.boundary_facets, i)
+                        dbc = self.get_dirichlet_bc(V, self.translate_value(bv), i)
                         bcs.append(dbc)
                 else: # mixed_function_space for LargeDeformationSolver, only displacement is needed in boundary condition
                     disp_i, vel_i, pressure_i = 0, 1, 2
@@ -138,11 +138,12 @@ class LinearElasticitySolver(SolverBase):
                             axis_i=0
                             for disp in bv:
                                 if not disp is None:  # None means free of constraint, but zero is kind of constraint
-                                    dbc = DirichletBC(V.sub(disp_i).sub(axis_i), self.translate_value(disp), self.boundary_facets, i)
+                                    dbc = self.get_dirichlet_bc(V.sub(disp_i).sub(axis_i), self.translate_value(disp), i,
+                                                                component=(disp_i, axis_i))
                                     bcs.append(dbc)
                                 axis_i += 1
                         else:  # bc['values'] =
-                            dbc = DirichletBC(V.sub(disp_i), self.translate_value(bv), self.boundary_facets, i)
+                            dbc = self.get_dirichlet_bc(V.sub(disp_i), self.translate_value(bv), i, component=disp_i)
                             bcs.append(dbc)
                     else: # bc['values'] =[ {'variable': displacement' , 'value': dvalue}, { 'variable':'velocity', 'value': vvalue}
                         pass  # not yet needed
@@ -151,7 +152,7 @@ class LinearElasticitySolver(SolverBase):
                 bc_force = self.translate_value(bc['value'])
                 # calc the surface area and calc stress, normal and tangential?
                 bc_area = assemble(Constant(1)*ds(bc['boundary_id'], domain=self.mesh))
-                print('boundary area (m2) for force boundary is', bc_area)
+                self.logger.debug('boundary area (m2) for force boundary is %s', bc_area)
                 g = bc_force / bc_area
                 # FIXME: assuming all force are normal to mesh boundary
                 if 'direction' in bc and bc['direction']:
@@ -202,7 +203,7 @@ class LinearElasticitySolver(SolverBase):
 
         ds= Measure("ds", subdomain_data=self.boundary_facets)  # if later marking updating in this ds?
         bcs, integrals_F = self.update_boundary_conditions(time_iter_, u, v, ds)
-        if time_iter_==0:
+        if time_iter_==0 and not self.parallel:
             plot(self.boundary_facets, title = "boundary facets colored by ID")
 
         if self.body_source:
@@ -226,7 +227,7 @@ class LinearElasticitySolver(SolverBase):
         return F, bcs
 
     def solve_form(self, F, u_, bcs):
-        if self.dimension == 3:
+        if self.dimension == 3 and not ('solver_preset' in self.solver_settings and self.solver_settings['solver_preset']):
             u_ = self.solve_amg(F, u_, bcs)
         else:
             u_ = self.solve_linear_problem(F, u_, bcs)
@@ -264,7 +265,7 @@ class LinearElasticitySolver(SolverBase):
     def solve_modal_form(self, F, bcs):
         # Test for PETSc
         if not has_linear_algebra_backend("PETSc"):
-            print("DOLFIN has not been configured with PETSc. Exiting.")
+            self.logger.error("DOLFIN has not been configured with PETSc. Exiting.")
             exit()
         # Set backend to PETSC
         parameters["linear_algebra_backend"] = "PETSc"
@@ -278,13 +279,13 @@ class LinearElasticitySolver(SolverBase):
         eigensolver = SLEPcEigenSolver(A)
 
         # Compute all eigenvalues of A x = \lambda x
-        print("Computing eigenvalues. This can take a minute.")
+        self.logger.info("Computing eigenvalues. This can take a minute.")
         eigensolver.solve()
 
         # Extract largest (first) eigenpair
         r, c, rx, cx = eigensolver.get_eigenpair(0)
 
-        print("Largest eigenvalue: ", r)
+        self.logger.info("Largest eigenvalue: %s", r)
 
         # Initialize function and assign eigenvector
         ev = Function(self.function_space)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2018 - Qingfeng Xia <qingfeng.xia iesensor.com>         *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""
+Tabulated (e.g. temperature-dependent) material property, given in case file as
+    'thermal_conductivity': {'type': 'table', 'x': [300, 400, 500], 'values': [0.6, 0.65, 0.68],
+                             'interpolation': 'linear', 'extrapolation': 'constant'}
+
++ `interpolation`: 'linear' (piecewise linear) or 'cubic' (monotone piecewise cubic Hermite, Fritsch-Carlson slopes),
+    the monotonicity of data is kept, no overshoot between table points
++ `extrapolation`: 'constant' (end values) or 'linear' (end slopes) outside the table range
++ `property(T)` returns an UFL expression: a balanced binary tree of `conditional` selecting the table interval,
+    with depth log2(N), each leaf is the linear or cubic polynomial of the interval,
+    it is compiled into the generated C++ kernel, polynomial degree (quadrature degree) does not grow with table size
++ UFL differentiation of the conditional tree is the exact piecewise derivative, used by Newton Jacobian
+    via `derivative()`, `property.derivative(T)` is also available as expression
++ `property(t)` of a number returns a float, evaluated by numpy
+"""
+
+from __future__ import print_function, division
+import numbers
+import numpy as np
+
+from dolfin import conditional, lt, gt, variable, diff
+
+
+class TabulatedProperty(object):
+    """ piecewise linear or monotone cubic interpolation of table data, as UFL expression of the variable """
+    def __init__(self, x, values, interpolation = 'linear', extrapolation = 'constant'):
+        self.x = np.array(x, dtype = float)
+        self.values = np.array(values, dtype = float)
+        if self.x.ndim != 1 or self.x.shape != self.values.shape or len(self.x) < 2:
+            raise ValueError('table `x` and `values` must be 1D arrays of the same length, at least 2 points')
+        if not (np.diff(self.x) > 0).all():
+            raise ValueError('table `x` must be strictly increasing')
+        if interpolation not in ('linear', 'cubic'):
+            raise ValueError('table interpolation `{}` is not supported, only linear or cubic'.format(interpolation))
+        if extrapolation not in ('constant', 'linear'):
+            raise ValueError('table extrapolation `{}` is not supported, only constant or linear'.format(extrapolation))
+        self.interpolation = interpolation
+        self.extrapolation = extrapolation
+        self.slopes = self._get_slopes()
+        self.coefficients = self._get_coefficients()
+
+    @classmethod
+    def from_dict(cls, d):
+        x = d['x'] if 'x' in d else d['temperature']
+        interpolation = d['interpolation'] if 'interpolation' in d else 'linear'
+        extrapolation = d['extrapolation'] if 'extrapolation' in d else 'constant'
+        return cls(x, d['values'], interpolation, extrapolation)
+
+    def _get_slopes(self):
+        # derivative at table points, secant slopes for linear interpolation
+        h = np.diff(self.x)
+        delta = np.diff(self.values) / h
+        if self.interpolation == 'linear':
+            return np.concatenate([delta, delta[-1:]])  # slope of the last point is used by linear extrapolation
+        if len(self.x) == 2:
+            return np.array([delta[0], delta[0]])
+        m = np.zeros(len(self.x))
+        w1 = 2 * h[1:] + h[:-1]
+        w2 = h[1:] + 2 * h[:-1]
+        same_sign = delta[:-1] * delta[1:] > 0
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            harmonic = (w1 + w2) / (w1 / delta[:-1] + w2 / delta[1:])
+        m[1:-1] = np.where(same_sign, harmonic, 0.0)
+        m[0] = self._end_slope(h[0], h[1], delta[0], delta[1])
+        m[-1] = self._end_slope(h[-1], h[-2], delta[-1], delta[-2])
+        return m
+
+    @staticmethod
+    def _end_slope(h0, h1, d0, d1):
+        # shape-preserving three-point end slope
+        m = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+        if np.sign(m) != np.sign(d0):
+            return 0.0
+        if np.sign(d0) != np.sign(d1) and abs(m) > abs(3 * d0):
+            return 3 * d0
+        return m
+
+    def _get_coefficients(self):
+        # polynomial coefficients (a, b, c, d) of each interval in local coordinate t = (x - x_i)/h, Horner form
+        h = np.diff(self.x)
+        y0, y1 = self.values[:-1], self.values[1:]
+        if self.interpolation == 'linear':
+            zero = np.zeros(len(h))
+            return np.column_stack([y0, y1 - y0, zero, zero])
+        m0, m1 = self.slopes[:-1] * h, self.slopes[1:] * h
+        return np.column_stack([y0, m0, 3 * (y1 - y0) - 2 * m0 - m1, 2 * (y0 - y1) + m0 + m1])
+
+    def _interval(self, T, i):
+        a, b, c, d = [float(v) for v in self.coefficients[i]]
+        t = (T - float(self.x[i])) / float(self.x[i + 1] - self.x[i])
+        if self.interpolation == 'linear':
+            return a + b * t
+        return a + t * (b + t * (c + t * d))
+
+    def _tree(self, T, start, end):
+        # balanced binary tree of conditionals for intervals [start, end)
+        if end - start == 1:
+            return self._interval(T, start)
+        mid = (start + end) // 2
+        return conditional(lt(T, float(self.x[mid])), self._tree(T, start, mid), self._tree(T, mid, end))
+
+    def _outside(self, T, end):
+        i = 0 if end == 'lower' else -1
+        if self.extrapolation == 'constant':
+            return float(self.values[i])
+        return float(self.values[i]) + float(self.slopes[i]) * (T - float(self.x[i]))
+
+    def __call__(self, T):
+        if isinstance(T, numbers.Number):
+            return float(self.evaluate(T))
+        n = len(self.x) - 1
+        inside = self._tree(T, 0, n)
+        lower = self._outside(T, 'lower')
+        upper = self._outside(T, 'upper')
+        return conditional(lt(T, float(self.x[0])), lower, conditional(gt(T, float(self.x[-1])), upper, inside))
+
+    def derivative(self, T):
+        """ exact derivative expression of the piecewise polynomial with respect to T """
+        if isinstance(T, numbers.Number):
+            return float(self.evaluate(T, derivative = True))
+        v = variable(T)
+        return diff(self(v), v)
+
+    def evaluate(self, t, derivative = False):
+        """ numpy evaluation of value (or derivative) at number or array t """
+        t = np.asarray(t, dtype = float)
+        h = np.diff(self.x)
+        i = np.clip(np.searchsorted(self.x, t, side = 'right') - 1, 0, len(h) - 1)
+        s = (t - self.x[i]) / h[i]
+        a, b, c, d = self.coefficients[i].T
+        if derivative:
+            result = (b + s * (2 * c + s * 3 * d)) / h[i]
+        else:
+            result = a + s * (b + s * (c + s * d))
+        for outside, end in ((t < self.x[0], 0), (t > self.x[-1], -1)):
+            if self.extrapolation == 'constant':
+                value = 0.0 if derivative else self.values[end]
+            else:
+                value = self.slopes[end] if derivative else self.values[end] + self.slopes[end] * (t - self.x[end])
+            result = np.where(outside, value, result)
+        return result
+
+
+def translate_material_property(value):
+    """ TabulatedProperty for table dict of case file, otherwise value is returned unchanged """
+    if isinstance(value, dict) and 'type' in value and value['type'] == 'table':
+        return TabulatedProperty.from_dict(value)
+    return value
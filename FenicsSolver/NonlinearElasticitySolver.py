@@ -72,6 +72,7 @@ class NonlinearElasticitySolver(LinearElasticitySolver):
 
         # how about kinematic energy, only for dynamic process vibration
         if self.transient_settings['transient']:
+            dt = self.get_time_step_constant(time_iter_)
             vel = (u_current - u_prev) /dt
             Pi += 0.5*vel*vel*dx  # not yet tested code!
         
@@ -81,7 +82,7 @@ class NonlinearElasticitySolver(LinearElasticitySolver):
         ds= Measure("ds", subdomain_data=self.boundary_facets)  # if later marking updating in this ds?
         # hack solution: u_current as testfunction v
         bcs, integrals_F = self.update_boundary_conditions(time_iter_, u, u_current, ds)
-        if time_iter_==0:
+        if time_iter_==0 and not self.parallel:
             plot(self.boundary_facets, title = "boundary facets colored by ID")
         # Assemble system, applying boundary conditions and extra items
         if len(integrals_F):
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2018 - Qingfeng Xia <qingfeng.xia iesensor.com>         *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+from __future__ import print_function, division
+import os
+import sys
+import json
+import time
+import tempfile
+import contextlib
+import xml.etree.ElementTree as ET
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+"""
+Per-phase wall time of each time step and cumulative time, plus linear and nonlinear iteration counts,
+written into a JSON report if `report_settings['performance_report']` is a file name, phases are:
+    form_generation (including boundary_setup), boundary_setup, jit, assembly, linear_solve, nonlinear_solve,
+    post_processing, io, advection (explicit sub-steps of operator splitting)
+phase timers can be nested, e.g. boundary_setup is also counted in form_generation, `exclusive` of the report
+is the cumulative time of each phase excluding its nested phases, e.g. nonlinear_solve without assembly and linear_solve
+`notes` of the report explain phases which are not separately timed, e.g. by default linear problem is solved
+by dolfin LinearVariationalSolver, whose assembly and JIT are counted in linear_solve and its Krylov iterations
+are not counted, set solver_settings `reusing_linear_solver` to time assembly and to count linear iterations
+dolfin timings (`list_timings()` table) are included, parsed from `dump_timings_to_xml()`
+
+Memory usage of each step: number of DOFs, nonzeros of the assembled matrix and of the LU/Cholesky factor
+(only if petsc4py is available and the persistent linear solver is used), peak RSS (MB) of each MPI process,
+`peak_memory` of the report is the maximum of all steps.
+"""
+
+from dolfin import MPI, dump_timings_to_xml, TimingClear
+
+
+class PerformanceProfiler(object):
+    def __init__(self, mpi_comm):
+        self.mpi_comm = mpi_comm
+        self.cumulative = {}  # phase -> seconds
+        self.exclusive = {}  # phase -> seconds, excluding the nested phases
+        self._nested = []  # seconds of nested phases, for each running phase
+        self.iterations = {'linear': 0, 'nonlinear': 0}
+        self.steps = []  # list of dict of each step
+        self.peak_memory = {}  # maximum of memory usage items of all steps
+        self.notes = {}  # phase -> limitation of its timing or counting
+        self._step = self._new_step()
+        self._start = time.time()
+
+    def _new_step(self):
+        return {'phases': {}, 'linear_iterations': 0, 'nonlinear_iterations': 0}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        t0 = time.time()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.time() - t0
+            nested = self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+            phases = self._step['phases']
+            phases[name] = phases.get(name, 0.0) + elapsed
+            self.cumulative[name] = self.cumulative.get(name, 0.0) + elapsed
+            self.exclusive[name] = self.exclusive.get(name, 0.0) + elapsed - nested
+
+    def add_iterations(self, kind, n):
+        # kind: 'linear' (KSP), 'nonlinear' (Newton/SNES/Picard) or other counter like 'jacobian' (assemblies)
+        if n is None:
+            return
+        self.iterations[kind] = self.iterations.get(kind, 0) + int(n)
+        key = kind + '_iterations'
+        self._step[key] = self._step.get(key, 0) + int(n)
+
+    def add_note(self, phase, note):
+        self.notes[phase] = note
+
+    def end_step(self, step, current_time, memory = None):
+        self._step['step'] = step
+        self._step['time'] = current_time
+        if memory:
+            self._step['memory'] = memory
+            for key, value in memory.items():
+                if isinstance(value, (int, float)):
+                    self.peak_memory[key] = max(self.peak_memory.get(key, 0), value)
+        self.steps.append(self._step)
+        self._step = self._new_step()
+
+    def get_peak_rss(self):
+        """ peak resident set size (MB) of all MPI processes, as list ordered by rank if mpi4py is available,
+        otherwise as dict of min, max and mean value
+        """
+        if resource is None:
+            return None
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        rss = rss / 1024.0**2 if sys.platform == 'darwin' else rss / 1024.0  # bytes on MacOS, KB on Linux
+        try:
+            return self.mpi_comm.tompi4py().allgather(rss)
+        except (AttributeError, ImportError):
+            size = MPI.size(self.mpi_comm)
+            return {'min': MPI.min(self.mpi_comm, rss), 'max': MPI.max(self.mpi_comm, rss),
+                    'mean': MPI.sum(self.mpi_comm, rss) / size}
+
+    def get_dolfin_timings(self):
+        # dict of task name -> dict of reps and times, from dolfin timing table
+        fd, filename = tempfile.mkstemp(suffix = '.xml')
+        os.close(fd)
+        try:
+            dump_timings_to_xml(filename, TimingClear.keep)  # collective call
+            timings = {}
+            if os.path.getsize(filename) == 0:  # only written by some of the processes
+                return timings
+            for row in ET.parse(filename).getroot().iter('row'):
+                timings[row.get('key')] = dict((col.get('key'), float(col.get('value'))) for col in row.iter('col'))
+        finally:
+            os.remove(filename)
+        return timings
+
+    def get_report(self, extra = None):
+        report = {'total_time': time.time() - self._start,
+                  'mpi_size': MPI.size(self.mpi_comm),
+                  'cumulative': self.cumulative,
+                  'exclusive': self.exclusive,
+                  'iterations': self.iterations,
+                  'steps': self.steps,
+                  'peak_memory': self.peak_memory,
+                  'notes': self.notes,
+                  'dolfin_timings': self.get_dolfin_timings()}
+        if extra:
+            report.update(extra)
+        return report
+
+    def write_report(self, filename, extra = None):
+        report = self.get_report(extra)
+        if MPI.rank(self.mpi_comm) == 0:
+            with open(filename, 'w') as f:
+                json.dump(report, f, indent = 2, sort_keys = True)
+        return report
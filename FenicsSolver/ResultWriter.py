@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2018 - Qingfeng Xia <qingfeng.xia iesensor.com>         *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+from __future__ import print_function, division
+import timeit  # module `time` is shadowed by the time argument of write()
+
+"""
+Result output stage used by SolverBase.save(), file streams are opened once and kept for the whole run,
+so time series are appended into the same pvd collection, instead of reopening and rewriting the file for each step.
+
+File format is decided by file name suffix, `.xdmf` for XDMF/HDF5 time series: mesh is written once and
+fields of all time steps (all sub functions of mixed function space) are appended into one HDF5 file with parallel IO,
+mesh is rewritten for each step only if `moving_mesh` is True, e.g. fluid mesh of FSI solver.
+
+Writing is synchronous: XDMFFile.write() and File << hold the Python GIL, so a background thread would not overlap
+writing with assembly or solving. `close()` must be called (SolverBase does it also if the time loop raises),
+otherwise the last results of a XDMF/HDF5 file may not be flushed.
+`get_timings()` gives the number of written functions and the time spent in file writing.
+"""
+
+from dolfin import File, XDMFFile
+
+
+class ResultWriter(object):
+    def __init__(self, mpi_comm, moving_mesh = False):
+        self.streams = {}  # filename -> file stream
+        self.mpi_comm = mpi_comm
+        self.moving_mesh = moving_mesh
+        self.write_time = 0.0  # seconds spent in writing files
+        self.results = 0  # number of written functions
+
+    def write(self, filename, function, time):
+        # append function at time into file, the stream is opened by the first call
+        t0 = timeit.default_timer()
+        if filename not in self.streams:
+            self.streams[filename] = self._open(filename)
+        if filename.endswith('.xdmf'):
+            self.streams[filename].write(function, float(time))
+        else:
+            self.streams[filename] << (function, time)
+        self.write_time += timeit.default_timer() - t0
+        self.results += 1
+
+    def _open(self, filename):
+        if filename.endswith('.xdmf'):
+            f = XDMFFile(self.mpi_comm, filename)
+            f.parameters['functions_share_mesh'] = True
+            f.parameters['rewrite_function_mesh'] = self.moving_mesh
+            f.parameters['flush_output'] = True  # readable while running, or after the job is killed
+            return f
+        return File(filename)
+
+    def close(self):
+        t0 = timeit.default_timer()
+        for f in self.streams.values():
+            if isinstance(f, XDMFFile):
+                f.close()
+        self.streams = {}
+        self.write_time += timeit.default_timer() - t0
+
+    def get_timings(self):
+        return {'results': self.results, 'write_time': self.write_time}
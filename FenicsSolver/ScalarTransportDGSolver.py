@@ -139,7 +139,7 @@ class ScalarTransportDGSolver(ScalarTransportSolver):
                 F = (a_int + a_fac + a_vel) * Constant(capacity)
 
             if integrals_N:
-                print("integrals_N", integrals_N)
+                self.logger.debug('integrals_N %s', integrals_N)
                 F -= sum(integrals_N)  # FIXME: DG may need distinct newmann boundary flux
             # Linear form
             if self.body_source:
@@ -154,7 +154,7 @@ class ScalarTransportDGSolver(ScalarTransportSolver):
 
         if self.convective_velocity:  # convective heat conduction
             F = F_convective()
-            print('Discrete Galerkin method solves only advection-diffusion equation')
+            self.logger.warning('Discrete Galerkin method solves only advection-diffusion equation')
         else:
             F = None
             raise SolverError('Error: Discrete Galerkin method should be used with advection velocity')
@@ -170,7 +170,7 @@ class ScalarTransportDGSolver(ScalarTransportSolver):
             solver.solve()
             """
             a, L = lhs(F), rhs(F)
-            print(a, L)
+            self.logger.debug('a = %s, L = %s', a, L)
 
             A = PETScMatrix()
             assemble(a, tensor=A)
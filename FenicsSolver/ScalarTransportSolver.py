@@ -24,6 +24,7 @@
 
 from __future__ import print_function, division
 import math
+import copy
 import numpy as np
 
 from dolfin import *
@@ -39,17 +40,23 @@ electric_permittivity_in_vacumm = 8.854187817e-12
 # thermal volumetric capacity = density * specific heat
 
 from .SolverBase import SolverBase, SolverError
+from .MaterialProperty import TabulatedProperty, translate_material_property
 class ScalarTransportSolver(SolverBase):
     """  general scalar transportation (diffusion and advection) solver, exampled by Heat Transfer
     # 4 types of boundaries supported: math, physical 
     # body source unit:  W/m^3, apply to whole body/domain
     # surface source unit: W/m^2, apply to whole boundary,  
     # convective velocity: m/s, stablization is controlled by advection_settings
+    # advection_settings: {'stabilization_method': 'SPUG' or 'IP', 'Pe': 1, 'alpha': 0.1, 'cellwise_stabilization': False,
+    #       'frozen_stabilization': False}, SUPG parameter as DG0 field if cellwise, computed only once if frozen
+    #       'operator_splitting': 'strang', 'cfl': 0.5 for transient case: explicit advection (SSP-RK3, lumped mass,
+    #       sub-cycled by Courant number) half steps around implicit diffusion step, without stabilization, CG1 element only,
+    #       diffusion step uses the 'diffusion' solver preset, unless `solver_preset` or `linear_solver` is given
     # Thermal Conductivity:  w/(K m)
     # Specific Heat Capacity, Cp:  J/(kg K)
     # thermal specific:
     # shear_heating: common in lubrication scinario, high viscosity and high shear speed, one kind of volume/body source
-    # radiation:  radiation_settings {}
+    # radiation:  radiation_settings {'ambient_temperature', 'emissivity', 'enclosure'}, enclosure: see ViewFactor
     """
     def __init__(self, s):
         SolverBase.__init__(self, s)
@@ -63,11 +70,31 @@ class ScalarTransportSolver(SolverBase):
         self.nonlinear = False
         self.nonlinear_material = True
         for v in self.material.values():
-            if callable(v):  # fixedme: if other material properties are functions, it will be regarded as nonlinear
+            if callable(v) or isinstance(translate_material_property(v), TabulatedProperty):  # fixedme: if other material properties are functions, it will be regarded as nonlinear
                 self.nonlinear = True
 
         if self.scalar_name == "eletric_potential":
             assert self.settings['transient_settings']['transient'] == False
+
+        ads = self.settings['advection_settings'] if 'advection_settings' in self.settings else {}
+        self.operator_splitting = ads['operator_splitting'] if 'operator_splitting' in ads else None
+        if self.operator_splitting:
+            if self.operator_splitting != 'strang':
+                raise SolverError('operator splitting `{}` is not supported, only strang'.format(self.operator_splitting))
+            if not self.transient_settings['transient'] or self.time_scheme:
+                raise SolverError('operator splitting is only for transient case of Crank-Nicolson time scheme')
+            element = self.function_space.ufl_element()
+            if element.family() != 'Lagrange' or element.degree() != 1:  # e.g. ScalarTransportDGSolver, fe_degree 2
+                raise SolverError('operator splitting is only for continuous linear (CG1) element, since the explicit '
+                                  'advection uses the lumped mass, whose row sums are zero or negative for P2')
+            sp = self.solver_settings['solver_parameters'] if 'solver_parameters' in self.solver_settings else None
+            if not ('solver_preset' in self.solver_settings and self.solver_settings['solver_preset']) \
+                    and not (sp and 'linear_solver' in sp):
+                self.solver_settings = copy.copy(self.solver_settings)
+                self.solver_settings['solver_preset'] = 'diffusion'  # symmetric positive definite system
+            self.reusing_linear_solver = True
+            self.T_split = Function(self.function_space)  # start value of diffusion step, advected by half step
+        self._advection = None
         #delay the convective velocity and radiation setting detection in geneate_form()
 
     def capacity(self, T=None):
@@ -76,8 +103,11 @@ class ScalarTransportSolver(SolverBase):
             c = self.material['capacity']
         # if not found, calc it, otherwise, it is 
         elif self.scalar_name == "temperature":
-            cp = self.material['specific_heat_capacity']
-            c = self.material['density'] * cp
+            cp = translate_material_property(self.material['specific_heat_capacity'])
+            if isinstance(cp, TabulatedProperty):
+                c = lambda T: self.material['density'] * cp(T)
+            else:
+                c = self.material['density'] * cp
         elif self.scalar_name == "electric_potential":
             c = electric_permittivity_in_vacumm
         elif self.scalar_name == "spicies_concentration":
@@ -85,11 +115,7 @@ class ScalarTransportSolver(SolverBase):
         else:
             raise SolverError('material capacity property is not found for {}'.format(self.scalar_name))
         #print(type(c))
-        from inspect import isfunction
-        if isfunction(c):  # accept only function or lambda,  ulf.algebra.Product is also callable
-            self.nonlinear_material = True
-            return c(T)
-        return self.get_material_value(c)  # todo: deal with nonlinear material
+        return self.get_material_property(c, T)
 
     def diffusivity(self, T=None):
         if 'diffusivity' in self.material:
@@ -103,11 +129,7 @@ class ScalarTransportSolver(SolverBase):
         else:
             raise SolverError('conductivity material property is not found for {}'.format(self.scalar_name))
 
-        from inspect import isfunction  # dolfin.Funciton is also callable
-        if isfunction(c):
-            self.nonlinear_material = True
-            return c(T)
-        return self.get_material_value(c)  # todo: deal with nonlinear material
+        return self.get_material_property(c, T)
 
     def conductivity(self, T=None):
         # nonlinear material:  c = function(T)
@@ -122,8 +144,13 @@ class ScalarTransportSolver(SolverBase):
         else:
             c = self.diffusivity() * self.capacity()
         #print('conductivity', c)
+        return self.get_material_property(c, T)
+
+    def get_material_property(self, c, T):
+        # nonlinear material: python function or tabulated property is evaluated as UFL expression of T
+        c = translate_material_property(c)  # table dict of case file
         from inspect import isfunction
-        if isfunction(c): 
+        if isfunction(c) or isinstance(c, TabulatedProperty):  # accept only function or lambda,  ulf.algebra.Product is also callable
             self.nonlinear_material = True
             return c(T)
         return self.get_material_value(c)  # todo: deal with nonlinear material
@@ -134,7 +161,7 @@ class ScalarTransportSolver(SolverBase):
             return convective_velocity
         else:
             self.vector_function_space = VectorFunctionSpace(self.mesh, 'CG', self.settings['fe_degree']+1)
-            vel = self.translate_value(convective_velocity, self.vector_function_space)
+            vel = self.translate_value(convective_velocity, self.vector_function_space, read_only = True)
             #print('type of convective_velocity', type(convective_velocity), type(vel))
             #print("vel.ufl_shape", vel.ufl_shape)
             return vel
@@ -165,7 +192,7 @@ class ScalarTransportSolver(SolverBase):
             if bc['type'] == 'Dirichlet' or bc['type'] == 'fixedValue':
                 if not isinstance(bc['value'], DirichletBC):
                     T_bc = self.translate_value(bc['value'])
-                    dbc = DirichletBC(self.function_space, T_bc, self.boundary_facets, i)
+                    dbc = self.get_dirichlet_bc(self.function_space, T_bc, i)
                     bcs.append(dbc)
                 else:
                     bcs.append(bc['value'])
@@ -185,7 +212,7 @@ class ScalarTransportSolver(SolverBase):
                     integrals_N.append(g*Tq*ds(i))
                 else:  # solver flux
                     integrals_N.append(capacity*g*Tq*ds(i))
-                dbc = DirichletBC(self.function_space, T_bc, self.boundary_facets, i)
+                dbc = self.get_dirichlet_bc(self.function_space, T_bc, i)
                 bcs.append(dbc)
             elif bc['type'].lower().find('flux')>=0 or bc['type'] == 'electric_current':
                 # flux is a general flux density, heatFlux: W/m2 is not a general flux name
@@ -208,15 +235,15 @@ class ScalarTransportSolver(SolverBase):
 
     def get_body_source_items(self, time_iter_, T, Tq, dx):
         bs = self.get_body_source()  # defined in base solver, has already translated value
-        print("body source: ", bs)
-        if bs and isinstance(bs, dict):
+        self.logger.debug('body source: %s', bs)
+        if bs is not None and isinstance(bs, dict):  # region value is not number, e.g. Expression
             S = []
             for k,v in bs.items():
                 # it is good to using DG for multi-scale meshing, subdomain marking double
                 S.append(v['value']*Tq*dx(v['subdomain_id']))
             return S
         else:
-            if bs:
+            if bs is not None:  # multi-region number values have been translated into one DG0 field
                 return [bs*Tq*dx]
             else:
                 return None
@@ -229,10 +256,15 @@ class ScalarTransportSolver(SolverBase):
         ds= Measure("ds", subdomain_data=self.boundary_facets)  #boundary cells
         #dS = Measure("dS", subdomain_data=self.boundary_facets)  
 
-        conductivity = self.conductivity(T) # constant, experssion or tensor, function of T for nonlinear
-        print('conductivity = ', conductivity)
-        capacity = self.capacity(T)  # density * specific capacity -> volumetrical capacity
-        print('capacity = ', capacity)
+        # Picard iteration: nonlinear coefficients are evaluated at the previous iterate `T_current`, form is linear in T
+        picard = self.nonlinear_method == 'picard'
+        T_coefficient = T_current if picard else T
+        # operator splitting: advection is solved explicitly in solve_form(), the form has only diffusion and sources
+        splitting = bool(self.operator_splitting)
+        conductivity = self.conductivity(T_coefficient) # constant, experssion or tensor, function of T for nonlinear
+        self.logger.debug('conductivity = %s', conductivity)
+        capacity = self.capacity(T_coefficient)  # density * specific capacity -> volumetrical capacity
+        self.logger.debug('capacity = %s', capacity)
         #diffusivity = self.diffusivity(T)  # diffusivity not in used for this conductivity form
         #print("diffusivity = ", diffusivity)
 
@@ -252,9 +284,9 @@ class ScalarTransportSolver(SolverBase):
             velocity = self.get_convective_velocity_function(self.convective_velocity)
             h = 2*Circumradius(self.mesh)  # cell size
 
-            if ads['stabilization_method'] == 'SPUG':
+            if ads['stabilization_method'] == 'SPUG' and not splitting:
                 # Add SUPG stabilisation terms
-                print('solving convection by SPUG stablization')
+                self.logger.debug('solving convection by SPUG stablization')
                 #`Numerical simulations of advection-dominated scalar mixing with applications to spinal CSF flow and drug transport` page 20
                 # SPUG_method == 2, ref: 
                 vnorm = sqrt(dot(velocity, velocity))
@@ -262,6 +294,10 @@ class ScalarTransportSolver(SolverBase):
                 tau = 0.5*h*pow(4.0/(Pe*h)+2.0*vnorm,-1.0)  # this user-chosen value
                 delta = h/(2*vnorm)
                 SPUG_method = 2
+                if 'cellwise_stabilization' in ads and ads['cellwise_stabilization']:
+                    # parameter of each cell is assembled into DG0 field, once or for each step
+                    frozen = ads['frozen_stabilization'] if 'frozen_stabilization' in ads else False
+                    tau = self.get_cell_field('supg_tau', tau, frozen)
                 if SPUG_method == 2:
                     Tq = (T_test + tau*inner(velocity, grad(T_test)))  # residual and variatonal form has diff sign for  the diffusion item
                 elif SPUG_method == 1:
@@ -280,12 +316,19 @@ class ScalarTransportSolver(SolverBase):
             return  inner(conductivity * grad(T), grad(Tq))*dx
 
         if self.transient_settings['transient']:
-            dt = self.get_time_step(time_iter_)
-            theta = Constant(0.5) # Crank-Nicolson time scheme
+            dt = self.get_time_step_constant(time_iter_)
             # Define time discretized equation, it depends on scalar type:  Energy, Species,
             # FIXME: nonlinear capacity is not supported
-            F = (1.0/dt)*inner(T-T_prev, Tq)*capacity*dx \
-                   + theta*F_static(T, Tq) + (1.0-theta)*F_static(T_prev, Tq)  # FIXME:  check using T_0 or T_prev ?
+            if self.time_scheme:  # BDF multistep scheme, fully implicit
+                theta = 1.0
+                dTdt = self.time_derivative(time_iter_, T, self.get_time_history(T_prev))
+                F = inner(dTdt, Tq)*capacity*dx + F_static(T, Tq)
+            else:
+                theta = Constant(0.5) # Crank-Nicolson time scheme
+                T_start = self.T_split if splitting else T_prev
+                dTdt = (T-T_start)/dt
+                F = (1.0/dt)*inner(T-T_start, Tq)*capacity*dx \
+                   + theta*F_static(T, Tq) + (1.0-theta)*F_static(T_start, Tq)  # FIXME:  check using T_0 or T_prev ?
         else:
             F = F_static(T, Tq)
 
@@ -297,14 +340,16 @@ class ScalarTransportSolver(SolverBase):
         if bs_items:
             F -= sum(bs_items)
 
-        if self.convective_velocity:
+        if self.convective_velocity and splitting:
+            self.build_advection_operator(velocity, capacity, bcs)
+        elif self.convective_velocity:
             if self.nonlinear_material:
                 F += inner(velocity, grad(T*capacity))*Tq*dx  # those 2 are equal
                 #F += inner(velocity, grad(T))*Tq*capacity*dx + inner(velocity, grad(T))*Tq*self.material['dc_dT']*T*dx
             else:
                 F += inner(velocity, grad(T))*Tq*capacity*dx
             if ads['stabilization_method'] and ads['stabilization_method'] == 'IP':
-                print('solving convection by interior penalty stablization')
+                self.logger.debug('solving convection by interior penalty stablization')
                 alpha = Constant(ads['alpha'])
                 F +=  alpha*avg(h)**2*inner(jump(grad(T),normal), jump(grad(Tq),normal))*capacity*dS
                 # http://www.karlin.mff.cuni.cz/~hron/fenics-tutorial/convection_diffusion/doc.html
@@ -312,7 +357,7 @@ class ScalarTransportSolver(SolverBase):
                 #https://fenicsproject.org/qa/6951/help-on-supg-method-in-the-advection-diffusion-demo/
                 if self.transient_settings['transient']:
                     residual = dot(velocity, grad(T)) - theta*conductivity*div(grad(T)) - (1.0-theta)*conductivity*div(grad(T_prev)) \
-                                    + (1.0/dt)*inner(T-T_prev, Tq)*capacity # FIXME:
+                                    + inner(dTdt, Tq)*capacity # FIXME:
                 else:
                     residual = dot(velocity, grad(T)) - conductivity*div(grad(T))  # diffusion item sign is different from variational form
                 F_residual = residual * delta*dot(velocity, grad(Tq)) * dx
@@ -323,7 +368,7 @@ class ScalarTransportSolver(SolverBase):
 
         using_mass_conservation = False # not well tested, Nitsche boundary
         if using_mass_conservation:
-            print('mass conservation compensation for zero mass flux on the curved boundary')
+            self.logger.debug('mass conservation compensation for zero mass flux on the curved boundary')
             sigma = Constant(2) # penalty parameter
             #he = self.mesh.ufl_cell().max_facet_edge_length,    T - Constant(300)
             #F -= inner(dot(velocity, normal), dot(grad(T), normal))*Tq*capacity*ds  # (1.0/ h**sigma) *
@@ -341,18 +386,44 @@ class ScalarTransportSolver(SolverBase):
             if self.has_radiation:
                 #print(m_, radiation_flux, F)
                 self.nonlinear = True
-                F -= self.radiation_flux(T)*Tq*ds # for all surface, without considering view angle
+                if 'enclosure' in self.radiation_settings and self.radiation_settings['enclosure']:
+                    vf = self.get_view_factor_radiation()  # surface to surface radiation between enclosure boundaries
+                    F -= vf.absorbed_flux(T, T_current if picard else None)*Tq*vf.measure(ds)
+                else:
+                    F -= self.radiation_flux(T, T_current if picard else None)*Tq*ds # for all surface, without considering view angle
         
         #print(F)
+        if splitting and self.nonlinear:
+            raise SolverError('operator splitting supports only linear problem, without radiation or nonlinear material')
         if self.nonlinear_material:
             self.nonlinear_material = True
-        if self.nonlinear:
+        if self.nonlinear and not picard:
             F = action(F, T_current)  # API 1.0 still working ; newer API , replacing TrialFunction with Function for nonlinear 
             self.J = derivative(F, T_current, T)  # Gateaux derivative
 
+        operator_coefficients = [conductivity, capacity]
+        if self.convective_velocity and not splitting:
+            operator_coefficients.append(velocity)
+        self.operator_time_invariant = self.is_operator_time_invariant(operator_coefficients)
         return F, bcs
 
-    def radiation_flux(self, T):
+    def is_operator_time_invariant(self, operator_coefficients):
+        # linear transient problem, matrix depends only on dt, capacity, conductivity, velocity and HTC
+        if self.nonlinear or not self.transient_settings['transient']:
+            return False
+        for name, bc_settings in self.boundary_conditions.items():
+            bc = self.get_boundary_variable(bc_settings)
+            if bc['type'] == 'HTC':
+                operator_coefficients.append(bc['value'])
+        return all(self.is_time_invariant_value(c) for c in operator_coefficients)
+
+    def invalidate_operator(self):
+        SolverBase.invalidate_operator(self)
+        if self._advection is not None:
+            self._advection['assembled'] = False
+
+    def radiation_flux(self, T, T_lagged = None):
+            # T**4 is linearized as T_lagged**3 * T for Picard iteration
             Stefan_constant = 5.670367e-8  # W/m-2/K-4
             if 'emissivity' in self.material:
                 emissivity = self.material['emissivity']  # self.settings['radiation_settings']['emissivity'] 
@@ -366,12 +437,125 @@ class ScalarTransportSolver(SolverBase):
                 T_ambient_radiaton = self.reference_values['temperature']
 
             m_ = emissivity * Stefan_constant
+            if T_lagged is not None:
+                return m_*(T_ambient_radiaton**4 - pow(T_lagged, 3)*T)
             radiation_flux = m_*(T_ambient_radiaton**4 - pow(T, 4))  # it is nonlinear item
             return radiation_flux
 
+    def get_view_factor_radiation(self):
+        # view factors are computed (or loaded from cache) once, irradiation is updated in solve_form()
+        if getattr(self, 'view_factor_radiation', None) is None:
+            from .ViewFactor import ViewFactorRadiation
+            if 'ambient_temperature' in self.radiation_settings:
+                T_ambient = self.radiation_settings['ambient_temperature']
+            else:
+                T_ambient = self.reference_values['temperature']
+            self.view_factor_radiation = ViewFactorRadiation(self.mesh, self.boundary_facets,
+                    self.radiation_settings['enclosure'], T_ambient, self.settings['case_folder'])
+        return self.view_factor_radiation
+
+    def build_advection_operator(self, velocity, capacity, bcs):
+        """ advection matrix and lumped mass (row sum of consistent mass matrix) for the explicit advection step,
+        forms are compiled once, assembled once if velocity and capacity are time invariant, otherwise for each step
+        """
+        key = repr((velocity, capacity))
+        if self._advection is None or self._advection['key'] != key:
+            V = self.function_space
+            T, Tq = TrialFunction(V), TestFunction(V)
+            self._advection = {'key': key, 'assembled': False,
+                    'time_invariant': all(self.is_time_invariant_value(c) for c in [velocity, capacity]),
+                    'form': Form(inner(velocity, grad(T))*Tq*capacity*dx), 'mass': Form(capacity*Tq*dx),
+                    'K': PETScMatrix(), 'rate': Function(V).vector(), 'minus_m_inv': Function(V).vector()}
+        h = 2*Circumradius(self.mesh)  # cell size
+        self._advection['courant'] = self.get_cell_field('advection_courant', sqrt(dot(velocity, velocity))/h,
+                self._advection['time_invariant'])  # |u|/h of each cell
+        self._advection['bcs'] = bcs
+
+    def advect(self, T, duration):
+        """ explicit SSP-RK3 advection of T in place, M_L dT/dt = -K T, sub-cycled so that Courant number
+        max(|u| dt/h) is below advection_settings `cfl` (default 0.5), Dirichlet values are applied for each stage
+        """
+        adv = self._advection
+        if not adv['assembled']:
+            with self.profiler.phase('assembly'):
+                assemble(adv['form'], tensor = adv['K'])
+                m = assemble(adv['mass'])
+                adv['minus_m_inv'].set_local(-1.0 / m.get_local())
+                adv['minus_m_inv'].apply('insert')
+            adv['assembled'] = True
+        ads = self.settings['advection_settings']
+        cfl = ads['cfl'] if 'cfl' in ads else 0.5
+        n = max(1, int(math.ceil(duration * adv['courant'].vector().max() / cfl)))
+        k = duration / n
+        self.logger.debug('advection of %s by %d explicit sub-steps', duration, n)
+
+        K, rate, bcs = adv['K'], adv['rate'], adv['bcs']
+        def euler(x):  # forward Euler step u = x - k M_L^-1 K x
+            K.mult(x, rate)
+            rate *= adv['minus_m_inv']
+            u = x.copy()
+            u.axpy(k, rate)
+            return u
+        with self.profiler.phase('advection'):
+            x = T.vector()
+            for i in range(n):
+                u1 = euler(x)
+                [bc.apply(u1) for bc in bcs]
+                u2 = euler(u1)
+                u2 *= 0.25
+                u2.axpy(0.75, x)
+                [bc.apply(u2) for bc in bcs]
+                u3 = euler(u2)
+                u3 *= 2.0/3
+                u3.axpy(1.0/3, x)
+                [bc.apply(u3) for bc in bcs]
+                x.zero()
+                x.axpy(1.0, u3)
+        return T
+
+    def solve_split_step(self, F, T_current, bcs):
+        """ Strang splitting: half step of explicit advection, full step of implicit diffusion (symmetric matrix,
+        CG + AMG by 'diffusion' solver preset, preconditioner is reused), then half step of explicit advection
+        """
+        dt = self.get_time_step(self.current_step)
+        if self._advection is not None and not self._advection['time_invariant']:
+            self._advection['assembled'] = False  # velocity or capacity of the current step
+        self.T_split.assign(T_current)  # solution of previous step
+        if self._advection is not None:
+            self.advect(self.T_split, 0.5*dt)
+        T_current = self.solve_scalar_form(F, T_current, bcs)
+        if self._advection is not None:
+            self.advect(T_current, 0.5*dt)
+        return T_current
+
     def solve_form(self, F, T_current, bcs):
-        if self.nonlinear:
-            print('solving by nonlinear solver')
+        """ irradiation of enclosure radiation is lagged, updated for each step in transient, or iterated until
+        its relative change is below enclosure `tolerance` for steady case, or `maximum_iterations` is reached
+        """
+        if self.operator_splitting:
+            return self.solve_split_step(F, T_current, bcs)
+        vf = getattr(self, 'view_factor_radiation', None)
+        if vf is None:
+            return self.solve_scalar_form(F, T_current, bcs)
+        es = self.radiation_settings['enclosure']
+        if 'maximum_iterations' in es and es['maximum_iterations']:
+            max_iter = es['maximum_iterations']
+        else:
+            max_iter = 1 if self.transient_settings['transient'] else 50
+        for i in range(max_iter):
+            change = vf.update(T_current)
+            self.logger.debug('enclosure radiation iteration %d: relative change of irradiation = %e', i, change)
+            if i > 0 and change < vf.tolerance:
+                break
+            T_current = self.solve_scalar_form(F, T_current, bcs)
+        return T_current
+
+    def solve_scalar_form(self, F, T_current, bcs):
+        if self.nonlinear and self.nonlinear_method == 'picard':
+            self.logger.debug('solving by Picard iteration')
+            return self.solve_picard(F, T_current, bcs)
+        elif self.nonlinear:
+            self.logger.debug('solving by nonlinear solver')
             return self.solve_nonlinear_problem(F, T_current, bcs, self.J)
         else:
             return self.solve_linear_problem(F, T_current, bcs)
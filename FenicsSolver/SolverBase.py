@@ -32,6 +32,46 @@ Feature: provide basic shared methods like translate_value(), build mesh and fun
 + temporal differentiation
     - Crank-Nicolson (2nd , unconditionally stable for diffusion problem) for ScalarTransportSolver
     - NS function, backward Euler for the time being.
++ `adaptive_time_step`: dict of `tolerance`, `minimum_time_step`, `maximum_time_step`, optional `safety_factor`,
+    `maximum_growth`, `absolute_tolerance` (default 0), local temporal error is estimated by comparing with extrapolation
+    from `w_prev` and `w_pp`, accepted if error < absolute_tolerance + tolerance * (max - min of the solution)
++ `time_scheme`: multistep backward differentiation 'BDF1' (backward Euler), 'BDF2' or 'BDF3', using history `w_prev`, `w_pp`
+    and `w_ppp`, coefficients are derived for variable time step, lower order is used for the first steps (bootstrap),
+    default None: the solver's own scheme, e.g. Crank-Nicolson for ScalarTransportSolver
++ `static_form`: generate_form() is called only once per run, time step `dt` and current time are Constant,
+    time-dependent values (callable, Expression with `t` attribute) are updated in place for each step
++ `steady_state_detection`: dict of `tolerance` of relative change between `w_current` and `w_prev`, optional
+    `consecutive_steps` (default 3) and `residual_tolerance` of the steady residual norm, time loop is stopped
+    once the criteria are met for consecutive steps, `steady_state_step` and `steady_state_time` are recorded
++ `restart`: True (from `checkpoint_filename` of 'report_settings') or a HDF5 checkpoint file name, to resume the time loop
+
+'solver_settings'
++ `solver_preset`: name of PETSc KSP/PC options in `solver_presets`, 'direct', 'diffusion' (CG + hypre BoomerAMG),
+    'advection' (GMRES + ASM/ILU), 'elasticity' (CG + GAMG with rigid body near nullspace),
+    'navier_stokes' (FGMRES + fieldsplit Schur complement of velocity and pressure), the persistent solver is used,
+    tolerances of `solver_parameters` are not applied, use `petsc_options` instead
++ `petsc_options`: dict of PETSc options without prefix to override or extend the preset, e.g. {'ksp_rtol': 1e-10}
++ `solver_parameters`: dolfin solver parameters, nested dict like {'newton_solver': {'maximum_iterations': 20}} is supported
++ `nonlinear_solver`: dict of `method`: 'newton' (default, dolfin NonlinearVariationalSolver), 'modified_newton'
+    (Jacobian and its factorization/preconditioner are reused for `jacobian_update_freq` iterations, default 5, and
+    across time steps, refreshed earlier if the residual reduction ratio is above `jacobian_refresh_ratio`, default 0.5),
+    'inexact_newton' (Krylov relative tolerance by Eisenstat-Walker forcing term, `forcing_term_max` default 0.9,
+    `forcing_term_gamma` default 0.9, `forcing_term_alpha` default 2, an iterative linear solver is required,
+    e.g. `solver_preset`, since it is the same as Newton with the direct solver) or 'picard' (fixed point iteration of the form
+    linearized by the derived solver with lagged coefficients); optional `maximum_iterations` (default 25),
+    `relative_tolerance` (default 1e-8), `absolute_tolerance` (default 1e-10), `relaxation_parameter` (default 1.0)
+
+'report_settings'
++ `result_filename`: `.pvd` (default) or `.xdmf` for single file XDMF/HDF5 time series with parallel IO,
+    file streams are kept open for the run and closed also if the time loop raises, see ResultWriter,
+    the number of written results and writing time are reported as `result_writer` of the performance report
++ `monitors`: dict of point probes, boundary and volume integrals evaluated for each step, see SolverMonitor
++ `performance_report`: JSON file name of per-phase timing, iteration and memory usage report, see PerformanceProfiler
++ `logging_level` (default logging.INFO), `logging_file` (default None: console), `logging_rate_limit`: the same
+    message (source line) below warning level is emitted at most once per `logging_rate_limit` seconds (default 0: no limit),
+    `logging_all_ranks`: by default only rank 0 logs messages below error level in parallel
++ `checkpoint_freq`, `checkpoint_filename`: HDF5 checkpoint of solution history, time loop state and mesh coordinates,
+    written every `checkpoint_freq` steps, it can be read with a different MPI rank count
     
 """
 
@@ -52,24 +92,142 @@ else:
 import numbers
 import copy
 import logging
+import weakref
 import numpy as np
 import os.path
 
 # import math may cause error
 from dolfin import *
+from .PerformanceProfiler import PerformanceProfiler
 
 class SolverError(Exception):
     pass
 
-default_report_settings  = {"logging_level": logging.DEBUG,  "logging_file": None,
+def _constant_values(value):
+    # raw value which can be used to construct or assign a Constant
+    if isinstance(value, Constant):
+        if value.ufl_shape == ():
+            return float(value)
+        return value.values().reshape(value.ufl_shape)
+    elif isinstance(value, list):
+        return tuple(value)
+    return value
+
+_bdf_orders = {'BDF1': 1, 'BDF2': 2, 'BDF3': 3}
+
+def _bdf_coefficients(time_steps):
+    """ coefficients c of the backward differentiation: du/dt = (c[0]*u + c[1]*u_prev + c[2]*u_pp ...) / time_steps[0]
+    time_steps: current and previous time steps, latest first, the order is len(time_steps),
+    derived from the derivative of Lagrange polynomial through the time points at the current time
+    """
+    tp = [0.0]
+    for dt in time_steps:
+        tp.append(tp[-1] - dt)
+    coefficients = []
+    for j in range(len(tp)):
+        d = 0.0
+        for m in range(len(tp)):
+            if m != j:
+                prod = 1.0 / (tp[j] - tp[m])
+                for k in range(len(tp)):
+                    if k != j and k != m:
+                        prod *= (0.0 - tp[k]) / (tp[j] - tp[k])
+                d += prod
+        coefficients.append(d * time_steps[0])
+    return coefficients
+
+default_report_settings  = {"logging_level": logging.INFO,  "logging_file": None,
+                            "logging_rate_limit": 0, "logging_all_ranks": False,
                             "plotting_freq": 10, 'plotting_interactive': True, 'plotting_file': None,
-                            'saving_freq': 10, 'result_filename': None}
+                            'saving_freq': 10, 'result_filename': None,
+                            'checkpoint_freq': 0, 'checkpoint_filename': None}
 
 # directly mapping to solver.parameters of Fenics
 default_solver_parameters = {"relative_tolerance": 1e-5,
                              "maximum_iterations": 500,
                              "monitor_convergence": True,  # print to console
                              }
+# mapping dolfin linear solver and preconditioner names to PETSc KSP and PC types
+_petsc_ksp_types = {'cg': 'cg', 'gmres': 'gmres', 'minres': 'minres', 'tfqmr': 'tfqmr',
+                    'richardson': 'richardson', 'bicgstab': 'bcgs'}
+_petsc_pc_types = {'default': None, 'none': 'none', 'ilu': 'ilu', 'icc': 'icc', 'jacobi': 'jacobi', 'bjacobi': 'bjacobi',
+                   'sor': 'sor', 'additive_schwarz': 'asm', 'petsc_amg': 'gamg', 'amg': 'gamg', 'hypre_amg': 'hypre'}
+_linear_solver_counter = [0]  # to generate unique PETSc options prefix for each persistent linear solver
+
+# physics-aware PETSc options, `near_nullspace` is not a PETSc option, but to attach rigid body modes to the matrix
+solver_presets = {
+    'direct': {'ksp_type': 'preonly', 'pc_type': 'lu'},
+    'diffusion': {'ksp_type': 'cg', 'ksp_rtol': 1e-8, 'pc_type': 'hypre', 'pc_hypre_type': 'boomeramg'},
+    'advection': {'ksp_type': 'gmres', 'ksp_gmres_restart': 100, 'ksp_rtol': 1e-8,
+                  'pc_type': 'asm', 'pc_asm_overlap': 1, 'sub_ksp_type': 'preonly', 'sub_pc_type': 'ilu'},
+    'elasticity': {'ksp_type': 'cg', 'ksp_rtol': 1e-8, 'pc_type': 'gamg', 'near_nullspace': True,
+                   'mg_levels_ksp_type': 'chebyshev', 'mg_levels_pc_type': 'jacobi',
+                   'mg_levels_esteig_ksp_type': 'cg', 'mg_levels_ksp_chebyshev_esteig_steps': 50},
+    'navier_stokes': {'ksp_type': 'fgmres', 'ksp_rtol': 1e-8, 'pc_type': 'fieldsplit',
+                      'pc_fieldsplit_type': 'schur', 'pc_fieldsplit_schur_fact_type': 'lower',
+                      'pc_fieldsplit_schur_precondition': 'selfp',
+                      'fieldsplit_0_ksp_type': 'preonly', 'fieldsplit_0_pc_type': 'hypre',
+                      'fieldsplit_0_pc_hypre_type': 'boomeramg',
+                      'fieldsplit_1_ksp_type': 'preonly', 'fieldsplit_1_pc_type': 'jacobi'},
+    }
+class _RankFilter(logging.Filter):
+    # only rank 0 emits messages below error level, so log lines are not multiplied by the number of processes
+    def __init__(self, rank):
+        logging.Filter.__init__(self)
+        self.rank = rank
+
+    def filter(self, record):
+        return self.rank == 0 or record.levelno >= logging.ERROR
+
+
+class _RateLimitFilter(logging.Filter):
+    # message from the same source line is emitted at most once per `interval` seconds, warnings are always emitted
+    def __init__(self, interval):
+        logging.Filter.__init__(self)
+        self.interval = interval
+        self._last_emitted = {}  # (pathname, lineno) -> time
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno)
+        if key in self._last_emitted and record.created - self._last_emitted[key] < self.interval:
+            return False
+        self._last_emitted[key] = record.created
+        return True
+
+
+def _release_logger(logger, handler):
+    # called when the solver object owning the logger is garbage collected, log file is closed
+    logger.removeHandler(handler)
+    handler.close()
+    logging.Logger.manager.loggerDict.pop(logger.name, None)
+
+
+_nonlinear_methods = ('newton', 'modified_newton', 'inexact_newton', 'picard')
+_global_parameters_set = [False]  # global dolfin parameters are set once, before the first solver is created
+
+
+def _set_global_parameters():
+    if _global_parameters_set[0]:
+        return
+    parameters["linear_algebra_backend"] = "PETSc"  #UMFPACK: out of memory, PETSc divergent
+    #parameters["linear_algebra_backend"] = "Eigen"  # 'uBLAS' is not supported any longer
+    parameters["mesh_partitioner"] = "SCOTCH"
+    #parameters["form_compiler"]["representation"] = "quadrature"
+    parameters["form_compiler"]["optimize"] = True
+    _global_parameters_set[0] = True
+
+
+def _update_parameters(prm, values):
+    # recursively copy dict into dolfin Parameters, keys not existing in `prm` are skipped
+    for key, value in values.items():
+        if key in prm:
+            if isinstance(value, dict):
+                _update_parameters(prm[key], value)
+            else:
+                prm[key] = value
+
 default_case_settings = {'solver_name': None,
                 'case_name': 'test', 'case_folder': "./",  'case_file': None,  # if used by GUI tool, may be removed later
                 'mesh':  None, 'fe_degree': 1, 'fe_family': "CG",
@@ -80,9 +238,11 @@ default_case_settings = {'solver_name': None,
                 'initial_values': {},  # dict with key as scalar or vector name
                 'material':{},  # can be a list of material dict for different subdomains
                 'solver_settings': {
-                    'transient_settings': {'transient': False, 'starting_time': 0, 'time_step': 0.01, 'ending_time': 0.03},
+                    'transient_settings': {'transient': False, 'starting_time': 0, 'time_step': 0.01, 'ending_time': 0.03,
+                                                    'static_form': False},
                     'reference_values': {},
                     'solver_parameters': default_solver_parameters,
+                    'reusing_linear_solver': False,  # keep KSP and preconditioner/factorization between steps
                     },
                 "report_settings": default_report_settings
                 }
@@ -93,25 +253,29 @@ class SolverBase():
     generate_form() and update_boundary_conditions() must be implemented by derived class
     """
     def __init__(self, case_input):
+        # detected before loading settings, since mesh reading and boundary marking may print
+        self.rank = dolfin.MPI.rank(dolfin.mpi_comm_world())
+        self.parallel = dolfin.MPI.size(dolfin.mpi_comm_world())>1  # no plotting and diagnostic output only on rank 0
         if isinstance(case_input, (dict)):
             self.settings = case_input
             #self.print()
             self.load_settings(case_input)
         else:
             raise SolverError('case setup data must be a python dict')
-        
-        if dolfin.MPI.size(dolfin.mpi_comm_world())>1:
-            self.parallel = True
-            #TODO: suppress output from other process
-        else:
-            self.parallel = False
 
     def print(self):
+        if self.rank != 0:
+            return
         import pprint
         pp = pprint.PrettyPrinter(indent=4)
         pp.pprint(self.settings)
 
     def load_settings(self, s):
+        _set_global_parameters()  # mesh partitioner must be set before mesh is read
+        if 'report_settings' not in self.settings:
+            self.settings['report_settings'] = default_report_settings
+        self.report_settings = self.settings['report_settings']
+        self.set_logger(self.settings['report_settings'])  # before mesh reading, which may log
         if 'periodic_boundary' not in s:  # check: settings file can not store None element?
             s['periodic_boundary'] = None
         ## mesh and boundary
@@ -142,7 +306,7 @@ class SolverBase():
         self.dimension = self.mesh.geometry().dim()
 
         if not hasattr(self, 'subdomains'):  # useful to set nulti-region material and body_source
-            self.subdomains = MeshFunction("size_t", self.mesh, self.dimension)
+            self.subdomains = MeshFunction("size_t", self.mesh, self.dimension, 0)
         ##
         if 'body_source' in s and s['body_source']:
             self.body_source = s['body_source']
@@ -163,29 +327,92 @@ class SolverBase():
         self.solver_settings = s['solver_settings']
         self.transient_settings = s['solver_settings']['transient_settings']
         self.transient = self.transient_settings['transient']
-
-        if 'report_settings' not in self.settings:
-            self.settings['report_settings'] = default_report_settings
-        self.report_settings = self.settings['report_settings'] 
-        self.set_logger(self.settings['report_settings'])
+        # form is generated once and reused for all time steps, time-dependent values are updated in place
+        if 'static_form' in self.transient_settings and self.transient_settings['static_form']:
+            self.using_static_form = True
+        else:
+            self.using_static_form = False
+        if 'adaptive_time_step' in self.transient_settings and self.transient_settings['adaptive_time_step']:
+            self.adaptive_time_stepping = self.transient
+        else:
+            self.adaptive_time_stepping = False
+        if 'time_scheme' in self.transient_settings and self.transient_settings['time_scheme']:
+            self.time_scheme = self.transient_settings['time_scheme']
+            if self.time_scheme not in _bdf_orders:
+                raise SolverError('time scheme `{}` is not supported, only {}'.format(self.time_scheme, list(_bdf_orders)))
+        else:
+            self.time_scheme = None  # solver's own time scheme
+        self._time_step_history = []  # accepted time steps, latest first
+        if 'steady_state_detection' in self.transient_settings and self.transient_settings['steady_state_detection']:
+            self.steady_state_detection = self.transient_settings['steady_state_detection']
+        else:
+            self.steady_state_detection = None
+        self._static_form = None
+        self._time_dependent_expressions = []  # Expression with time parameter `t`
+        self._time_dependent_constants = {}  # id(value) -> (value evaluator, Constant)
+        if 'reusing_linear_solver' in self.solver_settings and self.solver_settings['reusing_linear_solver']:
+            self.reusing_linear_solver = True
+        else:
+            self.reusing_linear_solver = False
+        if 'solver_preset' in self.solver_settings and self.solver_settings['solver_preset']:
+            if self.solver_settings['solver_preset'] not in solver_presets:
+                raise SolverError('solver preset `{}` is not supported, valid names: {}'.format(
+                        self.solver_settings['solver_preset'], sorted(solver_presets.keys())))
+            self.reusing_linear_solver = True  # preset is applied to the persistent PETSc solver
+        self._linear_system = None  # persistent matrix, vector and linear solver
+        self._owned_values = weakref.WeakValueDictionary()  # id -> Constant or Function created from time-invariant content
+        self.time_invariant_values = []  # Constant or Function of user, declared as not changed between time steps
+        self._newton_system = None  # persistent Jacobian matrix, residual vector and linear solver of the Newton loop
+        if 'nonlinear_solver' in self.solver_settings and self.solver_settings['nonlinear_solver']:
+            self.nonlinear_solver_settings = self.solver_settings['nonlinear_solver']
+        else:
+            self.nonlinear_solver_settings = {}
+        ns = self.nonlinear_solver_settings
+        self.nonlinear_method = ns['method'] if 'method' in ns else 'newton'
+        if self.nonlinear_method not in _nonlinear_methods:
+            raise SolverError('nonlinear solver method `{}` is not supported, only {}'.format(self.nonlinear_method, _nonlinear_methods))
+        if self.nonlinear_method == 'inexact_newton' and self.get_petsc_options().get('ksp_type') == 'preonly':
+            raise SolverError('inexact_newton needs an iterative linear solver, e.g. `solver_preset`, '
+                              'the forcing term has no effect on the direct linear solver')
+        self._dirichlet_bc_cache = {}  # (boundary_id, variable, component) -> (DirichletBC, boundary value)
+        self._translated_values = {}  # value content key -> (value, function space, translated value)
+        self._region_fields = {}  # id(multi-region dict) -> (dict, DG0 function, region values filled)
+        self._cell_fields = {}  # name -> [expression repr, DG0 function, cell average form, frozen]
+        self.operator_time_invariant = False  # set by derived solver if bilinear form does not change with time
+        self.moving_mesh = False  # set by coupling solver if mesh is moved, e.g. ALE
+        self.profiler = PerformanceProfiler(mpi_comm_world())  # per-phase timing, always on since it is cheap
 
     def set_logger(self, s):
-        logger = logging.getLogger(self.__class__.__name__)
-        # create console handler and set level to debug
+        """ one child logger per solver object, named `FenicsSolver.<class name>.<hex id>`, so that solvers
+        of the same class (e.g. participants of a coupled case) keep their own level, log file and filters,
+        the handler is closed when the solver object is garbage collected
+        usage: `self.logger.debug('value = %s', value)`, lazy formatting is cheap if the level is not enabled
+        """
+        logger = logging.getLogger('FenicsSolver.{}.{:x}'.format(self.__class__.__name__, id(self)))
+        for h in [h for h in logger.handlers if getattr(h, 'fenicssolver_handler', False)]:
+            logger.removeHandler(h)  # set_logger() is called again, or a dead solver had the same id
+            h.close()
+        # create console handler or file handler
         if ('logging_file' not in s) or (s['logging_file'] == None):
             fh = logging.StreamHandler()
         else:
             fh = logging.FileHandler(s['logging_file'])
-        if 'logging_level' in s:
-            fh.setLevel(s['logging_level'])
-        else:
-            fh.setLevel(logging.DEBUG)
+        fh.fenicssolver_handler = True
+        level = s['logging_level'] if 'logging_level' in s else logging.INFO
+        logger.setLevel(level)
+        fh.setLevel(level)
         # create formatter
         formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         fh.setFormatter(formatter)
+        if not ('logging_all_ranks' in s and s['logging_all_ranks']):
+            fh.addFilter(_RankFilter(self.rank))
+        if 'logging_rate_limit' in s and s['logging_rate_limit']:
+            fh.addFilter(_RateLimitFilter(s['logging_rate_limit']))
 
         # add console stdout or log file to logger
+        fh.fenicssolver_owner = weakref.ref(self, lambda ref, logger = logger, fh = fh: _release_logger(logger, fh))
         logger.addHandler(fh)
+        logger.propagate = False  # not duplicated by the root logger's handlers
         self.logger = logger  # usage: self.logger.debug(msg)
 
     def _read_hdf5_mesh(self, filename):
@@ -195,17 +422,17 @@ class SolverBase():
         hdf.read(mesh, "/mesh", False)
         self.mesh = mesh
 
-        self.subdomains = MeshFunction("size_t", mesh, mesh.geometry().dim())
+        self.subdomains = MeshFunction("size_t", mesh, mesh.geometry().dim(), 0)
         if (hdf.has_dataset("/subdomains")):
             hdf.read(self.subdomains, "/subdomains")
         else:
-            print('Subdomain file is not provided')
+            self.logger.info('Subdomain file is not provided')
 
         if (hdf.has_dataset("/boundaries")):
             self.boundary_facets = MeshFunction("size_t", mesh, mesh.geometry().dim()-1)
             hdf.read(self.boundary_facets, "/boundaries")
         else:
-            print('Boundary facets file is not provided, marked from boundary settings')
+            self.logger.info('Boundary facets file is not provided, marked from boundary settings')
             self.generate_boundary_facets()  # boundary marking from subdomain instance
 
     def _read_xml_mesh(self, filename):
@@ -216,17 +443,17 @@ class SolverBase():
         if os.path.exists(bmeshfile):
             self.boundary_facets = MeshFunction("size_t", mesh, bmeshfile)
         else:
-            print('Boundary facets are not provided by xml input file, boundary will be marked from subdomain instance')
+            self.logger.info('Boundary facets are not provided by xml input file, boundary will be marked from subdomain instance')
             self.generate_boundary_facets()  # boundary marking from subdomain instance
 
         subdomain_meshfile = filename[:-4] + "_physical_region.xml"
         if os.path.exists(subdomain_meshfile):
             self.subdomains = MeshFunction("size_t", mesh, subdomain_meshfile)
         else:
-            self.subdomains = MeshFunction("size_t", mesh, mesh.geometry().dim())
+            self.subdomains = MeshFunction("size_t", mesh, mesh.geometry().dim(), 0)
 
     def read_mesh(self, filename):
-        print(filename, type(filename))
+        self.logger.debug('read mesh file %s of type %s', filename, type(filename))
         if sys.version_info[0]<3 and isinstance(filename, (unicode,)):
             filename = filename.encode('utf-8')
         if not os.path.exists(filename):
@@ -236,7 +463,7 @@ class SolverBase():
             f = XDMFFile(mpi_comm_world(), filename)
             f.read(mesh, True)
             self.generate_boundary_facets()
-            self.subdomains = MeshFunction("size_t", mesh, mesh.geometry().dim())
+            self.subdomains = MeshFunction("size_t", mesh, mesh.geometry().dim(), 0)
             self.mesh = mesh
         elif filename[-4:] == ".xml":
             self._read_xml_mesh(filename)
@@ -317,30 +544,159 @@ class SolverBase():
                 if isinstance(value[0][0], (numbers.Number,)):
                     return as_matrix(value)
         elif isinstance(value, dict):  # inhomogeneous, multi-region values
-            return self._translate_dict_value(value)
+            return self._translate_dict_value_to_function(value, True)
         elif isinstance(value, (numbers.Number,)):
             return value
         # TODO: nonlinear, function/expression of temperature, or any variable
         else:  # linear homogenous material, str, Expression, numbers.Number, Constant, Callable
             return value # self.translate_value(value)
 
-    def _translate_dict_value_to_function(self, value):
-        """ body source, initial value or material for multiple subdomains 
-        dict input format: {'region1': {'subdomain_id': 1, 'material': metal_material}, ...}
-        for performance reason, numpy array is operated directly, or cpp expression
+    def _get_region_values(self, value):
+        """ list of (subdomain id array, value) of multi-region dict, None if any value is not number or number tuple
+        dict input format: {'region1': {'subdomain_id': 1, 'value': 2}, ...}, `subdomain_id` can be a list of ids,
+        or simply {subdomain_id: value}
+        """
+        regions = []
+        for k, v in value.items():
+            if isinstance(v, dict):
+                if 'subdomain_id' not in v or 'value' not in v:
+                    raise SolverError('region `{}` of multi-region dict needs `subdomain_id` and `value`'.format(k))
+                ids, v = v['subdomain_id'], v['value']
+            else:
+                ids = k
+            if isinstance(v, Constant):
+                v = v.values() if v.value_size() > 1 else float(v)
+            if not (isinstance(v, numbers.Number) or (isinstance(v, (tuple, list, np.ndarray))
+                    and all(isinstance(c, numbers.Number) for c in v))):
+                return None
+            regions.append((ids, v))
+        for i, (ids, v) in enumerate(regions):  # all values are numbers, it is a multi-region dict
+            try:
+                regions[i] = (np.atleast_1d(np.asarray(ids, dtype = np.intp)), v)
+            except (TypeError, ValueError):
+                raise SolverError('subdomain id of multi-region dict must be integer or list of integer, '
+                                  'but got `{}`, use {{name: {{"subdomain_id": id, "value": value}}}}'.format(ids))
+        return regions
+
+    def _translate_dict_value_to_function(self, value, required = False):
+        """ body source or material for multiple subdomains, as a DG0 function (scalar or vector),
+        cell values are filled from `self.subdomains` by one numpy indexing pass of a region lookup table,
+        so that only one integral is needed instead of one `dx(subdomain_id)` integral for each region,
+        cells of subdomain not in the dict are zero, or SolverError is raised if `required` (material).
+        The field is cached for the dict object, if its region values are edited in place, the same field is
+        filled again, so that forms using it are still valid, and the matrix is assembled again
+        """
+        key = id(value)
+        regions = self._get_region_values(value)
+        if not regions:
+            raise SolverError('only number or number tuple is supported as value of multi-region dict')
+        content = [(ids.tolist(), np.asarray(v, dtype = float).tolist()) for ids, v in regions]
+        f = None
+        if key in self._region_fields and self._region_fields[key][0] is value:
+            f = self._region_fields[key][1]
+            if self._region_fields[key][2] == content:
+                return f
+        shape = np.shape(regions[0][1])
+        mesh = self.mesh
+        tdim = mesh.topology().dim()
+        if f is not None and f.ufl_shape != shape:
+            raise SolverError('value shape of multi-region dict should not be changed during the run')
+        if shape == ():
+            V = FunctionSpace(mesh, 'DG', 0) if f is None else f.function_space()
+            sub_spaces = [V]
+        else:
+            V = VectorFunctionSpace(mesh, 'DG', 0, dim = shape[0]) if f is None else f.function_space()
+            sub_spaces = [V.sub(i) for i in range(shape[0])]
+
+        markers = self.subdomains.array()
+        n = max(int(markers.max()) if len(markers) else 0, max(int(ids.max()) for ids, v in regions)) + 1
+        table = np.zeros((n,) + shape)
+        defined = np.zeros(n, dtype = bool)
+        for ids, v in regions:
+            table[ids] = v
+            defined[ids] = True
+        if required and not defined[markers].all():
+            raise SolverError('value is not defined for subdomain ids: {}'.format(np.unique(markers[~defined[markers]])))
+        cell_values = table[markers]
+
+        if f is None:
+            f = Function(V)
+            self._owned_values[id(f)] = f
+        else:  # region values are edited in place
+            self.invalidate_operator()
+        local_size = f.vector().local_size()
+        x = np.zeros(local_size)
+        for i, W in enumerate(sub_spaces):
+            dofs = np.asarray(W.dofmap().entity_dofs(mesh, tdim), dtype = np.intp)  # dof of each local cell
+            owned = dofs < local_size  # ghost cell dofs are set by the owner process
+            x[dofs[owned]] = cell_values[owned] if shape == () else cell_values[owned, i]
+        f.vector().set_local(x)
+        f.vector().apply('insert')
+        self._region_fields[key] = (value, f, content)  # hold the dict, so its id is not reused
+        return f
+
+    def translate_value(self, value, function_space = None, read_only = False):
+        """ for both internal and boundary values, translated value is memorized by the value content
+        (number, tuple, string expression or file) and the target function space, so string expression is interpolated once,
+        time-dependent values (callable, value sequence for time steps) are not memorized.
+        Each call returns a distinct Constant or Function copied from the memorized value, so in-place `assign`
+        on the value of one boundary or material does not change other users of the same content.
+        A `read_only` user, e.g. convective velocity, gets the memorized value itself, so expressions built from it
+        are equal for each step, and cell fields and operators cached by the expression are not compiled again
         """
-        v0 = Function(self.function_space)
-        for k, v in value.item():
-            raise NotImplementedError('not yet implemented')
-        return v0
-
-    def translate_value(self, value, function_space = None):
-        # for both internal and boundary values
-        _degree = self.settings['fe_degree']
         if function_space:
             W = function_space
         else:
             W = self.function_space
+        key = self._translated_value_key(value, W)
+        if key is None:
+            return self._translate_value(value, W)
+        if key not in self._translated_values:
+            values_0 = self._translate_value(value, W)
+            self._translated_values[key] = (value, W, values_0)  # hold W, so id(W) in key is not reused
+            self._owned_values[id(values_0)] = values_0  # created by the solver from time-invariant content
+        values_0 = self._translated_values[key][2]
+        if read_only:
+            return values_0
+        return self._copy_translated_value(values_0)  # memorized value is kept private
+
+    def _copy_translated_value(self, value):
+        # copying a Constant or Function vector is much cheaper than interpolating the expression again
+        if isinstance(value, Constant):
+            value = Constant(_constant_values(value))
+        elif isinstance(value, Function):
+            value = value.copy(deepcopy = True)
+        self._owned_values[id(value)] = value  # created by the solver from time-invariant content
+        return value
+
+    def _translated_value_key(self, value, W):
+        # hashable key of time-invariant value content, None if value should not be memorized
+        if isinstance(value, bool) or value is None:
+            return None
+        if isinstance(value, numbers.Number):
+            return ('number', value)
+        if isinstance(value, (str, unicode)):
+            return ('str', value, id(W))
+        if isinstance(value, (tuple, list)) and len(value) == self.dimension:
+            if all(isinstance(v, numbers.Number) for v in value):
+                return ('tuple', tuple(value))
+            if all(isinstance(v, (str, unicode)) for v in value):
+                return ('str', tuple(value), id(W))
+        return None
+
+    def clear_translated_values(self, value=None):
+        """ explicit invalidation of the memorized value, e.g. content of a file or interpolated expression is changed,
+        all memorized values are cleared if value is None
+        """
+        if value is None:
+            self._translated_values = {}
+        else:
+            content = tuple(value) if isinstance(value, list) else value
+            for key in [k for k, v in self._translated_values.items() if v[0] is value or k[1] == content]:
+                del self._translated_values[key]
+
+    def _translate_value(self, value, W):
+        _degree = self.settings['fe_degree']
         if isinstance(value, (tuple, list, np.ndarray)):  # json dump tuple into list
             if len(value) == self.dimension and isinstance(value[0], (numbers.Number)):
                 if isinstance(value, list):
@@ -351,9 +707,12 @@ class SolverBase():
                     value = Constant(tuple(value))
                 values_0 = interpolate(Expression(value, degree = _degree), W)
             elif self.transient_settings['transient'] and len(value) > self.dimension:
-                values_0 = value[self.current_step]
+                if self.using_static_form:
+                    values_0 = self._get_time_dependent_constant(value, lambda: value[self.current_step])
+                else:
+                    values_0 = value[self.current_step]
             else:
-                print(' {} is supplied, but only tuple of number and string expr of dim = len(v) are supported'.format(type(value)))
+                self.logger.warning('%s is supplied, but only tuple of number and string expr of dim = len(v) are supported', type(value))
         elif isinstance(value, (numbers.Number)):
             values_0 = Constant(value)
         elif isinstance(value, (Constant, Function)):
@@ -361,8 +720,14 @@ class SolverBase():
         elif isinstance(value, (Expression, )): 
             # FIXME can not interpolate an expression, not necessary?
             values_0 = value  # interpolate(value, W)
+            if self.using_static_form and hasattr(value, 't'):  # time is updated in place for each step
+                if not any(e is value for e in self._time_dependent_expressions):
+                    self._time_dependent_expressions.append(value)
         elif callable(value) and self.transient_settings['transient']:  # Function is also callable
-            values_0 = value(self.get_current_time())
+            if self.using_static_form:
+                values_0 = self._get_time_dependent_constant(value, lambda: value(self.get_current_time()))
+            else:
+                values_0 = value(self.get_current_time())
         elif isinstance(value, (str, )):  # file or string expression
             if os.path.exists(value):
                 # also possible continue from existent solution, or interpolate from diff mesh density
@@ -380,6 +745,50 @@ class SolverBase():
             #values_0 = None
         return values_0
 
+    def _get_time_dependent_constant(self, value, evaluator):
+        # a Constant holding the current value of a time-dependent value, reused by the static form
+        key = id(value)
+        if key not in self._time_dependent_constants:
+            v = evaluator()
+            if not isinstance(v, (numbers.Number, Constant, tuple, list)):
+                raise SolverError('static form supports only time-dependent value of number or Constant, but got {}'.format(type(v)))
+            self._time_dependent_constants[key] = (evaluator, Constant(_constant_values(v)))
+        return self._time_dependent_constants[key][1]
+
+    def is_time_invariant_value(self, value):
+        """ coefficient value which is not changed between time steps: number, Expression without `t`,
+        Constant or Function created by the solver from number, tuple, string expression, file or multi-region dict.
+        Constant and Function of the user (or of another solver) can be assigned between time steps, so they are
+        time dependent, unless they are listed in `self.time_invariant_values`, `invalidate_operator()` should
+        be called if a listed value is changed
+        """
+        from ufl.core.expr import Expr
+        from ufl.algorithms import extract_coefficients
+        if value is None or isinstance(value, (numbers.Number, str, unicode)):
+            return True
+        if isinstance(value, (tuple, list, np.ndarray)):
+            if self.transient_settings['transient'] and len(value) > self.dimension:
+                return False  # a value for each time step
+            return all(self.is_time_invariant_value(v) for v in value)
+        if any(value is c for evaluator, c in self._time_dependent_constants.values()):
+            return False
+        if isinstance(value, Expression):
+            return not hasattr(value, 't')
+        if any(value is v for v in self.time_invariant_values):
+            return True
+        if isinstance(value, (Constant, Function)):  # not solution or a value of user
+            return self._owned_values.get(id(value)) is value
+        if isinstance(value, Expr):  # compound expression, may be solution of another solver
+            return all(self.is_time_invariant_value(c) for c in extract_coefficients(value))
+        return False  # callable of time or solution
+
+    def invalidate_operator(self):
+        """ the matrix and its preconditioner are assembled again for the next solve, called after a value
+        listed in `time_invariant_values` is changed in place, e.g. by `Constant.assign()`
+        """
+        if self._linear_system is not None:
+            self._linear_system['assembled'] = False
+
     def get_variable_name(self):
         if 'scalar_name' in self.settings:
             return self.settings['scalar_name']
@@ -413,11 +822,63 @@ class SolverBase():
             bvalue = bc['value']
         return translate_value(bvalue)
 
+    def get_dirichlet_bc(self, V, value, boundary_id, variable=None, component=None):
+        """ DirichletBC is cached by boundary id and variable (and subspace component), so the facet lookup is done once,
+        the DirichletBC holds the caller's value object, so in-place update of Constant or Expression (e.g. the
+        time-dependent Constant of static form) is seen when the bc is applied, a different value object is set
+        """
+        if not variable:
+            variable = self.get_variable_name()
+        key = (boundary_id, variable, component)
+        with self.profiler.phase('boundary_setup'):
+            if key in self._dirichlet_bc_cache:
+                dbc, current_value = self._dirichlet_bc_cache[key]
+                if value is not current_value:
+                    dbc.set_value(value)
+                    self._dirichlet_bc_cache[key] = (dbc, value)
+            else:
+                dbc = DirichletBC(V, value, self.boundary_facets, boundary_id)
+                self._dirichlet_bc_cache[key] = (dbc, value)  # value object is kept alive with the bc
+        return dbc
+
+    def get_cell_field(self, name, expression, frozen = False):
+        """ DG0 function of cell average of a scalar UFL expression, e.g. stabilization parameter `tau` of
+        `Circumradius` and velocity magnitude, so the form has a coefficient instead of the expression evaluated
+        at each quadrature point. The cell average form (test function divided by `CellVolume`) is compiled once,
+        the field is assembled when it is created, and when the form is generated or by `update_cell_fields()`
+        for each step, unless `frozen`, e.g. for a velocity field not changed with time
+        """
+        key = repr(expression)
+        if name in self._cell_fields and self._cell_fields[name][0] == key:
+            key, f, form, frozen = self._cell_fields[name]
+            if not frozen:
+                assemble(form, tensor = f.vector())
+            return f
+        V0 = FunctionSpace(self.mesh, 'DG', 0)
+        f = Function(V0)
+        f.rename(name, name)
+        q = TestFunction(V0)
+        form = Form(expression * q / CellVolume(self.mesh) * dx(domain = self.mesh))
+        self._cell_fields[name] = [key, f, form, frozen]
+        assemble(form, tensor = f.vector())
+        return f
+
+    def update_cell_fields(self):
+        # assemble cell fields which are not frozen, by the current values of coefficients in the expression
+        if self._cell_fields:
+            with self.profiler.phase('assembly'):
+                for key, f, form, frozen in self._cell_fields.values():
+                    if not frozen:
+                        assemble(form, tensor = f.vector())
+
     def get_body_source(self):
-        if isinstance(self.body_source, (dict)):  # a dict of subdomain, perhaps easier by giving an Expression
-            vdict = copy.copy(self.body_source)
-            for k in vdict:
-                vdict[k]['value'] = self.translate_value(self.body_source[k]['value'])
+        if isinstance(self.body_source, (dict)) and self._get_region_values(self.body_source):
+            return self._translate_dict_value_to_function(self.body_source)  # DG0 field of all regions
+        elif isinstance(self.body_source, (dict)):  # a dict of subdomain, perhaps easier by giving an Expression
+            vdict = {}
+            for k, v in self.body_source.items():
+                vdict[k] = copy.copy(v)  # nested dict of user is not changed
+                vdict[k]['value'] = self.translate_value(v['value'])
             return vdict
         else:
             if self.body_source:
@@ -427,18 +888,72 @@ class SolverBase():
 
     def get_time_step(self, time_iter_):
         ## fixed step, but could be supplied with an np.array/list
+        if self.adaptive_time_stepping and hasattr(self, 'adaptive_dt'):
+            return self.adaptive_dt
         try:
             dt = float(self.transient_settings['time_step'])
         except:
             ts = self.transient_settings['time_series']
-            if len(ts) >= time_iter_:
-                dt = ts[time_iter_] - ts[time_iter_]
+            if len(ts) > time_iter_ + 1:
+                dt = ts[time_iter_ + 1] - ts[time_iter_]
             else:
-                print('time step can only be a sequence or scalar')
+                self.logger.warning('time step can only be a sequence or scalar')
         #self.mesh.hmin()  # Compute minimum cell diameter. courant number
         return dt
 
+    def get_time_step_constant(self, time_iter_):
+        # used in form instead of float dt, so form is still valid (also no JIT recompiling) if dt is changed
+        if not hasattr(self, 'time_step_constant'):
+            self.time_step_constant = Constant(self.get_time_step(time_iter_))
+        return self.time_step_constant
+
+    def get_time_scheme_coefficients(self):
+        # Constant coefficients of multistep scheme, values are updated by step size history for each step
+        if not hasattr(self, 'time_scheme_coefficients'):
+            self.time_scheme_coefficients = [Constant(0.0) for i in range(_bdf_orders[self.time_scheme] + 1)]
+            self.update_time_scheme_coefficients()
+        return self.time_scheme_coefficients
+
+    def update_time_scheme_coefficients(self):
+        # bootstrap: order is limited by the number of solutions in history
+        order = min(_bdf_orders[self.time_scheme], len(self._time_step_history) + 1)
+        dt = self.get_time_step(self.current_step)
+        coefficients = _bdf_coefficients([dt] + self._time_step_history[:order-1])
+        for i, c in enumerate(self.time_scheme_coefficients):
+            c.assign(coefficients[i] if i < len(coefficients) else 0.0)
+
+    def get_time_history(self, w_prev):
+        """ previous solutions for multistep time scheme, latest first, starting with `w_prev` passed to generate_form()
+        a coupling solver can assign `time_history` of sub functions
+        """
+        if hasattr(self, 'time_history'):
+            return self.time_history
+        return [w_prev, self.w_pp, self.w_ppp][:_bdf_orders[self.time_scheme]]
+
+    def time_derivative(self, time_iter_, u, history):
+        # backward differentiation of the selected `time_scheme`, history from get_time_history()
+        c = self.get_time_scheme_coefficients()
+        dudt = c[0] * u
+        for ci, ui in zip(c[1:], history):
+            dudt += ci * ui
+        return dudt / self.get_time_step_constant(time_iter_)
+
+    def update_time_dependent_values(self):
+        # called before solving each step, Constant and Expression in the form are updated in place
+        if self.transient_settings['transient']:
+            if hasattr(self, 'time_step_constant'):
+                self.time_step_constant.assign(self.get_time_step(self.current_step))
+            if hasattr(self, 'time_scheme_coefficients'):
+                self.update_time_scheme_coefficients()
+            t = self.get_current_time()
+            for expr in self._time_dependent_expressions:
+                expr.t = t
+            for evaluator, c in self._time_dependent_constants.values():
+                c.assign(Constant(_constant_values(evaluator())))
+
     def get_current_time(self, time_iter_=None):
+        if self.adaptive_time_stepping and time_iter_ is None:
+            return self.current_time  # not derivable from time step index
         if not time_iter_:
             time_iter_ = self.current_step
         #self.current_time
@@ -449,7 +964,7 @@ class SolverBase():
             if len(self.transient_settings['time_series']) >= time_iter_:
                 tp = self.transient_settings['time_series'][time_iter_]
             else:
-                print('time point can only be a sequence of time series or derived from constant time step')
+                self.logger.warning('time point can only be a sequence of time series or derived from constant time step')
         return tp
 
     def init_solver(self):
@@ -461,21 +976,136 @@ class SolverBase():
         self.w_prev.assign(self.w_current)
         self.w_pp = Function(self.function_space)  # previous previous value, for dynamic and high order temporal scheme
         self.w_pp.assign(self.w_current)
+        if self.time_scheme and _bdf_orders[self.time_scheme] >= 3:
+            self.w_ppp = Function(self.function_space)
+            self.w_ppp.assign(self.w_current)
+        else:
+            self.w_ppp = None
+        self._time_step_history = []
+        self._static_form = None  # form is bound to the functions above
+        self._dirichlet_bc_cache = {}
 
     def get_acceleration(self, time_iter_):
         # FIXME:  it does not works for non-uniform time step
         assert time_iter_ >= 1  # acceleration can only be calc since the second step
-        vel = Constant(1 / self.get_time_step(time_iter_)) * (self.w_current - self.w_prev)
-        vel_prev = Constant(1 / self.get_time_step(time_iter_ - 1)) * (self.w_prev - self.w_pp)
-        return (vel - vel_prev) / Constant(1 / self.get_time_step(time_iter_))
+        dt = self.get_time_step_constant(time_iter_)
+        vel = (self.w_current - self.w_prev) / dt
+        vel_prev = (self.w_prev - self.w_pp) / dt
+        return (vel - vel_prev) / dt
 
     def solve_current_step(self):
         # only NS equation needs current value to build form
-        F, Dirichlet_bcs_up = self.generate_form(self.current_step, self.trial_function, self.test_function, self.w_current, self.w_prev)
+        self.update_time_dependent_values()
+        with self.profiler.phase('form_generation'):
+            if self.using_static_form:
+                if self._static_form is None:
+                    self._static_form = self.generate_form(self.current_step, self.trial_function, self.test_function, self.w_current, self.w_prev)
+                else:
+                    self.update_cell_fields()  # fields in generated form are assembled for the current step
+                F, Dirichlet_bcs_up = self._static_form
+            else:
+                F, Dirichlet_bcs_up = self.generate_form(self.current_step, self.trial_function, self.test_function, self.w_current, self.w_prev)
+        if self.w_ppp is not None:
+            self.w_ppp.assign(self.w_pp)
         self.w_pp.assign(self.w_prev)
         self.w_prev.assign(self.w_current)
         self.w_current = self.solve_form(F, self.w_current, Dirichlet_bcs_up)  # solve for each time step, up_prev tis not needed
         self.result = self.w_current
+        self._current_form = (F, Dirichlet_bcs_up)
+        if self.transient_settings['transient']:
+            self._time_step_history = [self.get_time_step(self.current_step)] + self._time_step_history[:1]
+
+    def solve_adaptive_step(self, t_end):
+        """ solve current step with local error control, rejected step is repeated by a smaller time step
+        error estimation: difference between the solution and linear extrapolation from `w_prev` and `w_pp`,
+        i.e. the embedded lower order (explicit) prediction, scaled by the mixed tolerance
+        `absolute_tolerance + tolerance * (max - min of the solution)`, which does not depend on the offset
+        of the variable, e.g. temperature in Kelvin or Celsius
+        return the accepted time step, and `self.adaptive_dt` is set for the next step
+        """
+        s = self.transient_settings['adaptive_time_step']
+        tol = s['tolerance']
+        atol = s['absolute_tolerance'] if 'absolute_tolerance' in s else 0.0
+        dt_min = s['minimum_time_step'] if 'minimum_time_step' in s else 0.0
+        dt_max = s['maximum_time_step'] if 'maximum_time_step' in s else float('inf')
+        safety = s['safety_factor'] if 'safety_factor' in s else 0.9
+        max_growth = s['maximum_growth'] if 'maximum_growth' in s else 2.0
+        if not hasattr(self, '_w_pp_backup'):
+            self._w_pp_backup = Function(self.function_space)
+            if self.w_ppp is not None:
+                self._w_ppp_backup = Function(self.function_space)
+
+        while True:
+            dt = min(self.adaptive_dt, t_end - self.current_time)
+            self.adaptive_dt = dt
+            self._w_pp_backup.assign(self.w_pp)
+            if self.w_ppp is not None:
+                self._w_ppp_backup.assign(self.w_ppp)
+            time_step_history = list(self._time_step_history)
+            self.solve_current_step()  # w_prev and w_pp are shifted
+            if self.current_step == 0:  # no history to estimate error
+                self.previous_time_step = dt
+                return dt
+
+            ratio = dt / self.previous_time_step
+            e = self.w_current.vector().copy()
+            e.axpy(-(1.0 + ratio), self.w_prev.vector())
+            e.axpy(ratio, self.w_pp.vector())
+            w = self.w_current.vector()
+            scale = atol + tol * (w.max() - w.min())
+            if scale <= 0.0:  # uniform solution and no absolute tolerance
+                scale = tol * max(w.norm('linf'), 1e-12)
+            error = e.norm('linf') / scale  # accepted if error <= 1
+
+            # extrapolation error is second order in dt
+            factor = safety * (1.0 / max(error, 1e-16))**0.5
+            dt_new = min(max(dt * min(factor, max_growth), dt_min), dt_max)
+            if error <= 1.0 or dt <= dt_min:
+                if error > 1.0:
+                    self.logger.warning('time step error %s (scaled by the tolerance) is larger than 1 at the minimum time step', error)
+                self.previous_time_step = dt
+                self.adaptive_dt = dt_new
+                return dt
+            # reject this step, restore the history before this step
+            self.rejected_steps += 1
+            self.logger.info('time step %s is rejected with error %s, retry with time step %s', dt, error, dt_new)
+            self.w_current.assign(self.w_prev)
+            self.w_prev.assign(self.w_pp)
+            self.w_pp.assign(self._w_pp_backup)
+            if self.w_ppp is not None:
+                self.w_ppp.assign(self._w_ppp_backup)
+            self._time_step_history = time_step_history
+            self.adaptive_dt = dt_new
+
+    def get_steady_residual_norm(self):
+        # residual of current form, with history replaced by current solution, so time derivative items vanish
+        F, bcs = self._current_form
+        if len(F.arguments()) == 2:  # linear problem: a(u, v) - L(v)
+            F = action(lhs(F), self.w_current) - rhs(F)
+        history = [w for w in (self.w_prev, self.w_pp, self.w_ppp) if w is not None]
+        r = assemble(replace(F, dict((w, self.w_current) for w in history)))
+        for bc in bcs:
+            bc_h = DirichletBC(bc)
+            bc_h.homogenize()
+            bc_h.apply(r)
+        return r.norm('l2')
+
+    def is_steady_state(self):
+        """ relative change between `w_current` and `w_prev` (and optionally the steady residual) is below tolerance
+        for consecutive steps, called after each accepted step
+        """
+        s = self.steady_state_detection
+        consecutive_steps = s['consecutive_steps'] if 'consecutive_steps' in s else 3
+        change = self.w_current.vector() - self.w_prev.vector()
+        relative_change = change.norm('l2') / max(self.w_current.vector().norm('l2'), 1e-16)
+        converged = relative_change < s['tolerance']
+        if converged and 'residual_tolerance' in s and s['residual_tolerance']:
+            converged = self.get_steady_residual_norm() < s['residual_tolerance']
+        if converged:
+            self._steady_state_count += 1
+        else:
+            self._steady_state_count = 0
+        return self._steady_state_count >= consecutive_steps
 
     def solve_transient(self):
         #
@@ -497,35 +1127,80 @@ class SolverBase():
             else:
                 result_filename = 'result_file.pvd'  # default filename
 
+        cf = self.report_settings['checkpoint_freq'] if 'checkpoint_freq' in self.report_settings else None
+        checkpoint_filename = self.get_checkpoint_filename()
+
         #print(ts, self.current_time, t_end)
         # Transient loop also works for steady, by set `t_end = self.time_step`
         timer_solver_all = Timer("TimerSolveAll")  # 2017.2 Ubuntu Python2 errors
         timer_solver_all.start()
-        while (self.current_time < t_end):
-            if ts['transient']:
-                dt = self.get_time_step(self.current_step)
-            else:
-                dt = 1
-
-            ## overloaded by derived classes, maybe move out of temporal loop if boundary does not change form
-            self.solve_current_step()
-
-            print("Current step = ", self.current_step, "time = ", self.current_time, " TimerSolveAll = ", timer_solver_all.elapsed())
-            pf = self.report_settings['plotting_freq']
-            if pf>0 and self.current_step> 0 and (self.current_step % pf == 0):
-                self.plot()
-            # stop for steady case, or update time
-
-            if sf and sf>0:
-                if self.current_step > 0 and (self.current_step % sf == 0):
-                    self.save(result_filename)  # 
-                    print("save data to file `{}` at step: {} , at time: {}". format(result_filename, self.current_time))
-            if not self.transient_settings['transient']:
-                break
-            self.current_step += 1
-            self.current_time += dt
-        ## end of time loop
-        timer_solver_all.stop()
+        if self.adaptive_time_stepping:
+            self.adaptive_dt = float(ts['time_step'])
+            self.rejected_steps = 0
+        self._steady_state_count = 0  # restored by load_checkpoint()
+        self.steady_state_step = None
+        self.steady_state_time = None
+        if 'restart' in ts and ts['restart']:
+            self.load_checkpoint(ts['restart'] if isinstance(ts['restart'], (str, unicode)) else checkpoint_filename)
+        if 'monitors' in self.report_settings and self.report_settings['monitors']:
+            from .SolverMonitor import SolverMonitor
+            self.monitor = SolverMonitor(self, self.report_settings['monitors'])
+        else:
+            self.monitor = None
+        try:
+            while (self.current_time < t_end):
+                if ts['transient']:
+                    dt = self.get_time_step(self.current_step)
+                else:
+                    dt = 1
+
+                ## overloaded by derived classes, maybe move out of temporal loop if boundary does not change form
+                if self.adaptive_time_stepping:
+                    dt = self.solve_adaptive_step(t_end)  # accepted time step
+                else:
+                    self.solve_current_step()
+
+                self.logger.info("Current step = %d, time = %s, TimerSolveAll = %s", self.current_step, self.current_time, timer_solver_all.elapsed())
+                pf = self.report_settings['plotting_freq']
+                if pf>0 and self.current_step> 0 and (self.current_step % pf == 0) and not self.parallel:
+                    self.plot()
+                # stop for steady case, or update time
+
+                with self.profiler.phase('post_processing'):
+                    if self.monitor:
+                        self.monitor.record(self.current_step, self.current_time)
+                    steady = bool(self.steady_state_detection) and self.transient_settings['transient'] \
+                            and self.current_step > 0 and self.is_steady_state()
+                with self.profiler.phase('io'):
+                    if sf and sf>0:
+                        if self.current_step > 0 and (self.current_step % sf == 0):
+                            self.save(result_filename)  # 
+                            self.logger.info("save data to file `%s` at step: %d , at time: %s", result_filename, self.current_step, self.current_time)
+                self.profiler.end_step(self.current_step, self.current_time, self.get_memory_usage())
+                if not self.transient_settings['transient']:
+                    break
+                if steady:
+                    self.steady_state_step = self.current_step
+                    self.steady_state_time = self.current_time  # time of the recorded and saved result
+                    self.logger.info("steady state is reached at step: %d, at time: %s", self.current_step, self.steady_state_time)
+                    if sf and sf>0 and self.current_step % sf != 0:
+                        with self.profiler.phase('io'):
+                            self.save(result_filename)  # final result is saved
+                    break
+                self.current_step += 1
+                self.current_time += dt
+                if cf and cf>0 and (self.current_step % cf == 0):
+                    with self.profiler.phase('io'):
+                        self.save_checkpoint(checkpoint_filename)  # state to continue from the next step
+            ## end of time loop
+        finally:  # results and monitor records of the steps before an error are kept in closed files
+            timer_solver_all.stop()
+            with self.profiler.phase('io'):
+                self.close_result_writer()
+            if self.monitor:
+                self.monitor.close()
+        if 'performance_report' in self.report_settings and self.report_settings['performance_report']:
+            self.write_performance_report(self.report_settings['performance_report'])
 
         return self.w_current
 
@@ -533,7 +1208,42 @@ class SolverBase():
         self.result = self.solve_transient()
         return self.result
 
+    def get_memory_usage(self):
+        # DOFs, matrix and factor nonzeros, peak RSS of each process, recorded for each step in performance report
+        memory = {'dofs': self.function_space.dim()}
+        ls = self._linear_system
+        if ls is not None and ls['assembled']:
+            memory['matrix_nnz'] = int(ls['A'].nnz())
+            memory['factor_nnz'] = self.get_factor_nnz(ls['solver'])
+        rss = self.profiler.get_peak_rss()
+        if rss is not None:
+            memory['peak_rss_mb'] = rss
+            memory['peak_rss_mb_max'] = max(rss) if isinstance(rss, list) else rss['max']
+        return memory
+
+    def get_factor_nnz(self, solver):
+        # fill-in of direct solver, petsc4py is needed to access the factor matrix
+        try:
+            pc = solver.ksp().getPC()
+            if pc.getType() in ('lu', 'cholesky'):
+                return int(pc.getFactorMatrix().getInfo()['nz_used'])
+        except Exception:  # dolfin without petsc4py, or matrix info not supported by the external factor package
+            pass
+        return None
+
+    def write_performance_report(self, filename):
+        # JSON report of per-phase timing, iteration counts and dolfin timings, see PerformanceProfiler
+        extra = {'solver_name': self.__class__.__name__, 'number_of_steps': len(self.profiler.steps),
+                 'rejected_steps': getattr(self, 'rejected_steps', 0),
+                 'result_writer': getattr(self, 'result_writer_timings', None)}
+        report = self.profiler.write_report(filename, extra)
+        self.logger.info("write performance report to file `%s`, cumulative time of phases: %s", filename, report['cumulative'])
+        self.logger.info("peak memory usage: %s", report['peak_memory'])
+        return report
+
     def plot(self):
+        if self.parallel:  # plot() of distributed function is not supported, result file should be used instead
+            return
         ver = dolfin.dolfin_version().split('.')
         #if self.report_settings['plotting_interactive']:
         if int(ver[0]) <= 2017 and int(ver[1])<2:
@@ -551,28 +1261,127 @@ class SolverBase():
             import matplotlib.pyplot as plt
             plt.show()
 
+    def get_result_writer(self):
+        # file streams are kept open for the run, mesh is written for each step only if it is moving
+        if getattr(self, 'result_writer', None) is None:
+            from .ResultWriter import ResultWriter
+            self.result_writer = ResultWriter(self.mesh.mpi_comm(), self.moving_mesh)
+        return self.result_writer
+
+    def close_result_writer(self):
+        # close file streams, so XDMF/HDF5 file is complete
+        if getattr(self, 'result_writer', None) is not None:
+            self.result_writer.close()
+            self.result_writer_timings = self.result_writer.get_timings()
+            self.result_writer = None
+
     def save(self, result_filename):
         #currently support only pvd, this format support parallel IO
         #XDMFFile is preferred for parallel IO, checkpoint
         #how to deal with DG and higher order element? velocity of NS has order 2
+        writer = self.get_result_writer()
         if (not self.is_mixed_function_space):
-            result_stream = File(result_filename)
-            result_stream << (self.w_current, self.current_time)
+            writer.write(result_filename, self.w_current, self.current_time)
         else:
             # write all var into one pvd is possible as multiblock dataset
-            suffix = '.pvd'
-            assert result_filename[-4:] == '.pvd'
-            result_filename_root = result_filename[:-4]
-            ret = split(self.result)
+            using_xdmf = result_filename.endswith('.xdmf')  # all variables in one file
+            if not using_xdmf:
+                suffix = '.pvd'
+                assert result_filename[-4:] == '.pvd'
+                result_filename_root = result_filename[:-4]
+            ret = self.w_current.split(deepcopy = True)  # sub functions are also the snapshot to write
             for i, var in enumerate(ret):
                 var_name = self.settings['mixed_variable'][i]
-                var.rename(var_name, "label")  # why renaming does not show in vtu file?
-                var_result_filename = result_filename_root + '_' + var_name + suffix
-                result_stream = File(var_result_filename)
-                result_stream << (var, self.current_time)
+                var.rename(var_name, "label")
+                if using_xdmf:
+                    var_result_filename = result_filename
+                else:
+                    var_result_filename = result_filename_root + '_' + var_name + suffix
+                writer.write(var_result_filename, var, self.current_time)
+
+    def get_checkpoint_filename(self):
+        if 'checkpoint_filename' in self.report_settings and self.report_settings['checkpoint_filename']:
+            return self.report_settings['checkpoint_filename']
+        return 'checkpoint.h5'  # default filename
+
+    def get_mesh_coordinates(self):
+        # vertex coordinates as a CG1 vector function, which is partition independent, for moved mesh (ALE, FSI)
+        V = VectorFunctionSpace(self.mesh, 'CG', 1)
+        x = ['x[{}]'.format(i) for i in range(self.mesh.geometry().dim())]
+        return interpolate(Expression(x, degree = 1), V)
+
+    def save_checkpoint(self, filename, extra_functions = None):
+        """ write solution history, time loop state and mesh coordinates into a HDF5 file, for restart
+        file is written to a temporary file then renamed, so a pre-empted job does not corrupt the last checkpoint
+        """
+        comm = self.mesh.mpi_comm()
+        if sys.version_info[0]<3 and isinstance(filename, (unicode,)):
+            filename = filename.encode('utf-8')  # HDF5File takes std::string
+        tmp_filename = filename + '.tmp'
+        f = HDF5File(comm, tmp_filename, 'w')
+        f.write(self.get_mesh_coordinates(), '/mesh_coordinates')
+        for name in ('w_current', 'w_prev', 'w_pp', 'w_ppp'):
+            if getattr(self, name, None) is not None:
+                f.write(getattr(self, name), '/' + name)
+        if extra_functions:
+            for name, w in extra_functions.items():
+                f.write(w, '/' + name)
+        attr = f.attributes('/w_current')
+        attr['current_step'] = self.current_step
+        attr['current_time'] = float(self.current_time)
+        if self._time_step_history:
+            attr['time_step_history'] = np.array(self._time_step_history, dtype=float)
+        if self.adaptive_time_stepping:
+            attr['adaptive_dt'] = float(self.adaptive_dt)
+            attr['previous_time_step'] = float(getattr(self, 'previous_time_step', self.adaptive_dt))
+            attr['rejected_steps'] = self.rejected_steps
+        if self.steady_state_detection:
+            attr['steady_state_count'] = self._steady_state_count
+        f.close()
+        MPI.barrier(comm)
+        if MPI.rank(comm) == 0:
+            os.rename(tmp_filename, filename)  # atomic replacement of the previous checkpoint
+        MPI.barrier(comm)
+        self.logger.info("save checkpoint to file `%s` at step: %d, at time: %s", filename, self.current_step, self.current_time)
+
+    def load_checkpoint(self, filename, extra_functions = None):
+        # restore what is written by save_checkpoint(), must be called after init_solver()
+        if sys.version_info[0]<3 and isinstance(filename, (unicode,)):
+            filename = filename.encode('utf-8')
+        if not os.path.exists(filename):
+            raise SolverError('checkpoint file `{}` is not found for restart'.format(filename))
+        f = HDF5File(self.mesh.mpi_comm(), filename, 'r')
+        x = self.get_mesh_coordinates()
+        mesh_disp = Function(x.function_space())
+        f.read(mesh_disp, '/mesh_coordinates')
+        mesh_disp.vector().axpy(-1.0, x.vector())
+        if mesh_disp.vector().norm('linf') > 0:  # mesh has been moved
+            ALE.move(self.mesh, mesh_disp)
+        for name in ('w_current', 'w_prev', 'w_pp', 'w_ppp'):
+            if getattr(self, name, None) is not None and f.has_dataset('/' + name):
+                f.read(getattr(self, name), '/' + name)
+        if extra_functions:
+            for name, w in extra_functions.items():
+                f.read(w, '/' + name)
+        attr = f.attributes('/w_current')
+        self.current_step = int(attr['current_step'])
+        self.current_time = float(attr['current_time'])
+        if attr.exists('time_step_history'):
+            self._time_step_history = list(attr['time_step_history'])
+        if self.adaptive_time_stepping and attr.exists('adaptive_dt'):
+            self.adaptive_dt = float(attr['adaptive_dt'])
+            self.previous_time_step = float(attr['previous_time_step'])
+            self.rejected_steps = int(attr['rejected_steps'])
+        if self.steady_state_detection and attr.exists('steady_state_count'):
+            self._steady_state_count = int(attr['steady_state_count'])
+        f.close()
+        self.result = self.w_current
+        self.logger.info("restart from checkpoint file `%s` at step: %d, at time: %s", filename, self.current_step, self.current_time)
 
     ####################################
     def solve_linear_problem(self, F, u, Dirichlet_bcs):
+        if self.reusing_linear_solver:
+            return self.solve_linear_problem_reusing_solver(F, u, Dirichlet_bcs)
         if False:  # LU solver cause errors for heat transfer examples
             a_T, L_T = system(F)
             A_T = assemble(a_T)
@@ -588,10 +1397,120 @@ class SolverBase():
             solver = LinearVariationalSolver(problem)
             self.set_solver_parameters(solver)
 
-            solver.solve()
+            with self.profiler.phase('linear_solve'):  # including JIT and assembly
+                solver.solve()
+            self.profiler.add_note('linear_solve', 'including JIT and assembly of LinearVariationalSolver, '
+                    'linear iterations are not counted, unless `reusing_linear_solver` is set')
         return u
 
+    def solve_linear_problem_reusing_solver(self, F, u, Dirichlet_bcs):
+        """ matrix, vector and PETSc linear solver are kept between calls (time steps, Picard iterations),
+        the matrix and its preconditioner or LU factorization are reused only if the derived solver has set
+        `operator_time_invariant` and the time step (and the BDF leading coefficient) is not changed,
+        otherwise the matrix is assembled and the preconditioner is rebuilt
+        """
+        ls = self._linear_system
+        if ls is None or ls['function_space'] is not self.function_space:
+            ls = {'function_space': self.function_space, 'form': None, 'A': PETScMatrix(), 'b': PETScVector(),
+                    'solver': self.create_linear_solver(), 'assembled': False,
+                    'near_nullspace': bool(self.get_petsc_options().get('near_nullspace', False))}
+            self._linear_system = ls
+        if ls['form'] is not F:  # static form is assembled by the same assembler
+            with self.profiler.phase('jit'):
+                a, L = Form(lhs(F)), Form(rhs(F))
+            ls['assembler'] = SystemAssembler(a, L, Dirichlet_bcs)
+            ls['form'] = F
+        A, b, solver = ls['A'], ls['b'], ls['solver']
+        dt = float(self.time_step_constant) if hasattr(self, 'time_step_constant') else None
+        if hasattr(self, 'time_scheme_coefficients'):  # leading coefficient is in the matrix, changed during bootstrap
+            dt = (dt, float(self.time_scheme_coefficients[0]))
+        if self.operator_time_invariant and ls['assembled'] and ls['time_step'] == dt:
+            with self.profiler.phase('assembly'):
+                ls['assembler'].assemble(b)  # matrix and its preconditioner are reused as they are
+        else:
+            with self.profiler.phase('assembly'):
+                ls['assembler'].assemble(A, b)
+            if not ls['assembled']:
+                if ls['near_nullspace']:  # for smoothed aggregation AMG
+                    A.set_near_nullspace(self.build_nullspace(self.function_space, u.vector()))
+                solver.set_operator(A)
+            solver.set_reuse_preconditioner(False)  # matrix is changed, or not known to be unchanged
+            ls['assembled'] = True
+        ls['time_step'] = dt
+
+        with self.profiler.phase('linear_solve'):
+            self.profiler.add_iterations('linear', solver.solve(u.vector(), b))
+        return u
+
+    def get_petsc_options(self):
+        # options of `solver_preset`, or translated from `solver_parameters`, then overridden by `petsc_options`
+        ss = self.solver_settings
+        sp = {}
+        if 'solver_parameters' in ss and ss['solver_parameters']:
+            sp = ss['solver_parameters']
+        method = sp['linear_solver'] if 'linear_solver' in sp else 'default'
+        preconditioner = sp['preconditioner'] if 'preconditioner' in sp else 'default'
+
+        if 'solver_preset' in ss and ss['solver_preset']:
+            options = copy.copy(solver_presets[ss['solver_preset']])
+        elif method in _petsc_ksp_types:
+            options = {'ksp_type': _petsc_ksp_types[method]}
+            if preconditioner not in _petsc_pc_types:
+                raise SolverError('preconditioner `{}` is not supported'.format(preconditioner))
+            if _petsc_pc_types[preconditioner]:
+                options['pc_type'] = _petsc_pc_types[preconditioner]
+            if preconditioner == 'hypre_amg':
+                options['pc_hypre_type'] = 'boomeramg'
+        else:  # 'default', 'lu', 'mumps', 'superlu_dist', 'umfpack', 'petsc'
+            options = {'ksp_type': 'preonly', 'pc_type': 'lu'}
+            if method not in ('default', 'lu', 'direct'):
+                options['pc_factor_mat_solver_package'] = method
+        if 'petsc_options' in ss and ss['petsc_options']:
+            options.update(ss['petsc_options'])
+        return options
+
+    def create_linear_solver(self):
+        # PETSc solver configured by options with an unique prefix, direct LU solver by default as LinearVariationalSolver
+        _set_global_parameters()
+        options = self.get_petsc_options()
+        options.pop('near_nullspace', None)
+
+        _linear_solver_counter[0] += 1
+        prefix = 'fenicssolver{}_'.format(_linear_solver_counter[0])
+        for key, value in options.items():
+            PETScOptions.set(prefix + key, value)
+        solver = PETScKrylovSolver()
+        solver.set_options_prefix(prefix)
+        solver.set_from_options()
+        if options.get('pc_type') == 'fieldsplit':
+            self.set_fieldsplit(solver)
+
+        if not ('solver_preset' in self.solver_settings and self.solver_settings['solver_preset']):
+            self.set_solver_parameters(solver)  # otherwise tolerances of dolfin parameters would override the preset
+        if options.get('ksp_type') != 'preonly':
+            solver.parameters['nonzero_initial_guess'] = True  # previous step value is a good guess
+        return solver
+
+    def get_fieldsplit_dofs(self):
+        # list of (split name, owned global dofs), one split for each sub space, derived solver may merge sub spaces
+        W = self.function_space
+        return [(str(i), W.sub(i).dofmap().dofs()) for i in range(W.num_sub_spaces())]
+
+    def set_fieldsplit(self, solver):
+        # index sets of fieldsplit preconditioner, split names are used in PETSc options like `fieldsplit_0_pc_type`
+        splits = self.get_fieldsplit_dofs()
+        if len(splits) < 2:
+            raise SolverError('fieldsplit preconditioner needs a mixed function space')
+        from petsc4py import PETSc
+        comm = self.function_space.mesh().mpi_comm().tompi4py()
+        pc = solver.ksp().getPC()
+        pc.setFieldSplitIS(*[(name, PETSc.IS().createGeneral(dofs, comm = comm)) for name, dofs in splits])
+
     def solve_nonlinear_problem(self, F, u_current, Dirichlet_bcs, J):
+        if self.nonlinear_method in ('modified_newton', 'inexact_newton'):
+            return self.solve_newton(F, u_current, Dirichlet_bcs, J)
+        elif self.nonlinear_method == 'picard':  # residual form can not be linearized here
+            raise SolverError('Picard iteration is not supported by {}'.format(self.__class__.__name__))
         problem = NonlinearVariationalProblem(F, u_current, Dirichlet_bcs, J)
         solver = NonlinearVariationalSolver(problem)
 
@@ -602,26 +1521,136 @@ class SolverBase():
 
         self.set_solver_parameters(solver)
 
-        solver.solve()
+        with self.profiler.phase('nonlinear_solve'):  # including JIT and assembly
+            iterations, converged = solver.solve()
+        self.profiler.add_iterations('nonlinear', iterations)
+        self.profiler.add_note('nonlinear_solve', 'including JIT and assembly of NonlinearVariationalSolver, '
+                'linear iterations are not counted, unless `nonlinear_method` is `modified_newton` or `inexact_newton`')
         return u_current
 
-    def set_solver_parameters(self, solver):
-        # Define a dolfin linear algobra solver parameters
-
-        parameters["linear_algebra_backend"] = "PETSc"  #UMFPACK: out of memory, PETSc divergent
-        #parameters["linear_algebra_backend"] = "Eigen"  # 'uBLAS' is not supported any longer
+    def solve_newton(self, F, u, Dirichlet_bcs, J):
+        """ Newton iteration with the persistent Jacobian matrix and PETSc linear solver, for 'modified_newton' the Jacobian
+        is not reassembled every iteration, so the LU factorization or preconditioner is reused; for 'inexact_newton'
+        the linear solver tolerance follows the Eisenstat-Walker (choice 2) forcing term
+        """
+        s = self.nonlinear_solver_settings
+        max_iter = s['maximum_iterations'] if 'maximum_iterations' in s else 25
+        rtol = s['relative_tolerance'] if 'relative_tolerance' in s else 1e-8
+        atol = s['absolute_tolerance'] if 'absolute_tolerance' in s else 1e-10
+        relaxation = s['relaxation_parameter'] if 'relaxation_parameter' in s else 1.0
+        modified = self.nonlinear_method == 'modified_newton'
+        update_freq = s['jacobian_update_freq'] if modified and 'jacobian_update_freq' in s else (5 if modified else 1)
+        refresh_ratio = s['jacobian_refresh_ratio'] if 'jacobian_refresh_ratio' in s else 0.5
+        inexact = self.nonlinear_method == 'inexact_newton'
+        eta_max = s['forcing_term_max'] if 'forcing_term_max' in s else 0.9
+        gamma = s['forcing_term_gamma'] if 'forcing_term_gamma' in s else 0.9
+        alpha = s['forcing_term_alpha'] if 'forcing_term_alpha' in s else 2.0
+
+        ns = self._newton_system
+        if ns is None or ns['function_space'] is not self.function_space:
+            ns = {'function_space': self.function_space, 'form': None, 'A': PETScMatrix(), 'b': PETScVector(),
+                    'du': Function(self.function_space), 'solver': self.create_linear_solver(), 'jacobian_age': None}
+            self._newton_system = ns
+        if ns['form'] is not F:
+            bcs_h = [DirichletBC(bc) for bc in Dirichlet_bcs]  # correction du has zero Dirichlet values
+            for bc in bcs_h:
+                bc.homogenize()
+            with self.profiler.phase('jit'):
+                ns['assembler'] = SystemAssembler(Form(J), Form(F), bcs_h)
+            ns['form'] = F
+            if not modified:
+                ns['jacobian_age'] = None  # Jacobian of the previous step is kept by modified Newton
+        A, b, du, solver, assembler = ns['A'], ns['b'], ns['du'], ns['solver'], ns['assembler']
+
+        with self.profiler.phase('nonlinear_solve'):
+            for bc in Dirichlet_bcs:
+                bc.apply(u.vector())
+            eta = eta_max
+            r0 = r_prev = None
+            converged = False
+            iterations = jacobian_assemblies = 0
+            while True:
+                with self.profiler.phase('assembly'):
+                    assembler.assemble(b)
+                r = b.norm('l2')
+                r0 = r if r0 is None else r0
+                self.logger.debug('Newton iteration %d: residual norm = %e', iterations, r)
+                if r < atol or r < rtol * r0:
+                    converged = True
+                    break
+                if iterations >= max_iter:
+                    break
+                if ns['jacobian_age'] is None or ns['jacobian_age'] >= update_freq or \
+                        (r_prev is not None and r > refresh_ratio * r_prev):  # slow convergence by the outdated Jacobian
+                    with self.profiler.phase('assembly'):
+                        assembler.assemble(A)
+                    if ns['jacobian_age'] is None:
+                        solver.set_operator(A)
+                    ns['jacobian_age'] = 0
+                    jacobian_assemblies += 1
+                if inexact:
+                    if r_prev is not None:
+                        eta_new = gamma * (r / r_prev)**alpha
+                        if gamma * eta**alpha > 0.1:  # safeguard against oversolving after a large reduction
+                            eta_new = max(eta_new, gamma * eta**alpha)
+                        eta = min(eta_max, eta_new)
+                    eta = min(eta_max, max(eta, 0.5 * max(atol, rtol * r0) / r))
+                    # prefixed `ksp_rtol` of the preset would override the dolfin parameter, so both are updated
+                    PETScOptions.set(solver.get_options_prefix() + 'ksp_rtol', eta)
+                    solver.set_from_options()
+                    solver.parameters['relative_tolerance'] = eta
+                with self.profiler.phase('linear_solve'):
+                    self.profiler.add_iterations('linear', solver.solve(du.vector(), b))
+                u.vector().axpy(-relaxation, du.vector())
+                ns['jacobian_age'] += 1
+                iterations += 1
+                r_prev = r
+        self.profiler.add_iterations('nonlinear', iterations)
+        self.profiler.add_iterations('jacobian', jacobian_assemblies)
+        self.logger.info('%s: %d iterations, %d Jacobian assemblies, residual norm = %e',
+                    self.nonlinear_method, iterations, jacobian_assemblies, r)
+        if not converged:
+            raise SolverError('{} did not converge in {} iterations, residual norm = {}'.format(self.nonlinear_method, iterations, r))
+        return u
 
-        parameters["mesh_partitioner"] = "SCOTCH"
-        #parameters["form_compiler"]["representation"] = "quadrature"
-        parameters["form_compiler"]["optimize"] = True
+    def solve_picard(self, F, u, Dirichlet_bcs):
+        """ fixed point iteration, `F` is linear in the trial function and its coefficients are evaluated at `u` (lagged),
+        converged if the relative change between iterations is below `relative_tolerance`
+        """
+        s = self.nonlinear_solver_settings
+        max_iter = s['maximum_iterations'] if 'maximum_iterations' in s else 25
+        rtol = s['relative_tolerance'] if 'relative_tolerance' in s else 1e-8
+        relaxation = s['relaxation_parameter'] if 'relaxation_parameter' in s else 1.0
+        if getattr(self, '_picard_previous', None) is None or self._picard_previous[0] is not self.function_space:
+            self._picard_previous = (self.function_space, Function(self.function_space))
+        u_prev = self._picard_previous[1]
+        with self.profiler.phase('nonlinear_solve'):
+            for iterations in range(1, max_iter + 1):
+                u_prev.assign(u)
+                self.solve_linear_problem(F, u, Dirichlet_bcs)
+                if relaxation != 1.0:
+                    x = u.vector()
+                    x *= relaxation
+                    x.axpy(1.0 - relaxation, u_prev.vector())
+                change = (u.vector() - u_prev.vector()).norm('l2') / max(u.vector().norm('l2'), 1e-16)
+                self.logger.debug('Picard iteration %d: relative change = %e', iterations, change)
+                if change < rtol:
+                    break
+        self.profiler.add_iterations('nonlinear', iterations)
+        self.logger.info('picard: %d iterations, relative change = %e', iterations, change)
+        if change >= rtol:
+            raise SolverError('Picard iteration did not converge in {} iterations, relative change = {}'.format(iterations, change))
+        return u
 
-        if 'solver_parameters' in self.solver_settings:
-            for key in self.solver_settings['solver_parameters']:
-                if key in solver.parameters:
-                    solver.parameters[key] = self.solver_settings['solver_parameters'][key]
+    def set_solver_parameters(self, solver):
+        # Define a dolfin linear algobra solver parameters
+        _set_global_parameters()
+        if 'solver_parameters' in self.solver_settings and self.solver_settings['solver_parameters']:
+            _update_parameters(solver.parameters, self.solver_settings['solver_parameters'])
 
     def solve_amg(self, F, u, bcs):
-        A, b = assemble_system(lhs(F), rhs(F), bcs)
+        with self.profiler.phase('assembly'):
+            A, b = assemble_system(lhs(F), rhs(F), bcs)
         # Create near null space basis (required for smoothed aggregation AMG).
         # The solution vector is passed so that it can be copied to generate compatible vectors for the nullspace.
         null_space = self.build_nullspace(self.function_space, u.vector())
@@ -647,7 +1676,8 @@ class SolverBase():
         solver.set_operator(A)
 
         # Compute solution
-        solver.solve(u.vector(), b)
+        with self.profiler.phase('linear_solve'):
+            self.profiler.add_iterations('linear', solver.solve(u.vector(), b))
         
         return u
     
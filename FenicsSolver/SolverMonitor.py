@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2018 - Qingfeng Xia <qingfeng.xia iesensor.com>         *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+from __future__ import print_function, division
+import numpy as np
+
+"""
+In-situ monitors evaluated for each time step, setup by `report_settings['monitors']` dict:
+    {'probes': {'T_center': {'point': (0.5, 0.5), 'component': None}},
+     'boundary_integrals': {'hot_flux': {'boundary_id': 1, 'integrand': 'normal_gradient'}},
+     'volume_integrals': {'mean_T': {'subdomain_id': None, 'integrand': 'value'}},
+     'filename': 'monitors.csv',  'npz_filename': 'monitors.npz'}
+
++ `component`: index of sub function of mixed function space, or (sub, component) tuple, for vector/mixed solution,
+    it is required by the probe of vector/mixed solution, which must select a scalar sub space
++ `integrand`: 'value', 'normal_gradient' (boundary only) or a callable `integrand(u, normal)` returning UFL expression,
+    e.g. heat flux `lambda T, n: -k*dot(grad(T), n)`
++ point probe is evaluated as `b.inner(w.vector())`, where vector b is the basis function values at the point,
+    computed once by PointSource, it is partition independent, no point-cell search for each step
++ integral forms are compiled once and assembled for each step
++ CSV is streamed by rank 0, one row per step, NPZ file of all records is written at the end
+"""
+
+from dolfin import *
+
+
+class SolverMonitor(object):
+    def __init__(self, solver, settings):
+        self.solver = solver
+        self.settings = settings
+        self.names = []
+        self.records = []  # list of [step, time, values...]
+        self.function = None  # the monitored solution function, forms must be rebuilt if it is replaced
+        self._csv = None
+        self.rank = MPI.rank(solver.mesh.mpi_comm())
+
+    def _sub_space(self, V, component):
+        if component is None:
+            return V
+        if isinstance(component, (tuple, list)):
+            for c in component:
+                V = V.sub(c)
+            return V
+        return V.sub(component)
+
+    def _sub_function(self, w, component):
+        if component is None:
+            return w
+        if isinstance(component, (tuple, list)):
+            for c in component:
+                w = split(w)[c]
+            return w
+        return split(w)[component]
+
+    def _integrand(self, u, integrand, normal):
+        if callable(integrand):
+            return integrand(u, normal)
+        elif integrand == 'value':
+            return u
+        elif integrand == 'normal_gradient':
+            return dot(grad(u), normal)
+        raise ValueError('monitor integrand `{}` is not supported'.format(integrand))
+
+    def build(self):
+        # probe vectors and compiled integral forms, bound to the current solution function
+        solver = self.solver
+        w = solver.w_current
+        V = w.function_space()
+        normal = FacetNormal(solver.mesh)
+        self.function = w
+        self.probes = []
+        self.forms = []
+        s = self.settings
+        names = []
+        if 'probes' in s and s['probes']:
+            for name, p in sorted(s['probes'].items()):
+                component = p['component'] if 'component' in p else None
+                W = self._sub_space(V, component)
+                if W.num_sub_spaces() > 0:  # point source of all components, probe value would be their sum
+                    raise ValueError('probe `{}` of vector or mixed function space needs `component` of a scalar sub space'.format(name))
+                b = Function(V).vector()
+                b.zero()
+                PointSource(W, Point(*p['point']), 1.0).apply(b)
+                self.probes.append(b)
+                names.append(name)
+        if 'boundary_integrals' in s and s['boundary_integrals']:
+            ds = Measure("ds", domain = solver.mesh, subdomain_data = solver.boundary_facets)
+            for name, bi in sorted(s['boundary_integrals'].items()):
+                component = bi['component'] if 'component' in bi else None
+                u = self._sub_function(w, component)
+                integrand = bi['integrand'] if 'integrand' in bi else 'value'
+                self.forms.append(Form(self._integrand(u, integrand, normal) * ds(bi['boundary_id'])))
+                names.append(name)
+        if 'volume_integrals' in s and s['volume_integrals']:
+            dx = Measure("dx", domain = solver.mesh, subdomain_data = solver.subdomains)
+            for name, vi in sorted(s['volume_integrals'].items()):
+                component = vi['component'] if 'component' in vi else None
+                u = self._sub_function(w, component)
+                integrand = vi['integrand'] if 'integrand' in vi else 'value'
+                if 'subdomain_id' in vi and vi['subdomain_id'] is not None:
+                    measure = dx(vi['subdomain_id'])
+                else:
+                    measure = dx
+                self.forms.append(Form(self._integrand(u, integrand, normal) * measure))
+                names.append(name)
+        if self.names and self.names != names:
+            raise ValueError('monitor names should not be changed during the run')
+        self.names = names
+
+    def evaluate(self):
+        if self.function is not self.solver.w_current:  # e.g. function space is updated by FSI mesh moving
+            self.build()
+        x = self.solver.w_current.vector()
+        values = [b.inner(x) for b in self.probes]
+        values += [assemble(f) for f in self.forms]
+        return values
+
+    def record(self, step, time):
+        values = self.evaluate()
+        row = [step, time] + values
+        self.records.append(row)
+        if self.rank == 0 and 'filename' in self.settings and self.settings['filename']:
+            if self._csv is None:
+                self._csv = open(self.settings['filename'], 'w')
+                self._csv.write(','.join(['step', 'time'] + self.names) + '\n')
+            self._csv.write(','.join(repr(v) for v in row) + '\n')
+            self._csv.flush()
+        return values
+
+    def get_records(self):
+        # dict of numpy array for each monitor, and also `step` and `time`
+        data = np.array(self.records).reshape((len(self.records), len(self.names) + 2))
+        result = {'step': data[:, 0], 'time': data[:, 1]}
+        for i, name in enumerate(self.names):
+            result[name] = data[:, i + 2]
+        return result
+
+    def close(self):
+        if self._csv is not None:
+            self._csv.close()
+            self._csv = None
+        if self.rank == 0 and 'npz_filename' in self.settings and self.settings['npz_filename']:
+            np.savez(self.settings['npz_filename'], **self.get_records())
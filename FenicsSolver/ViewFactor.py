@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2018 - Qingfeng Xia <qingfeng.xia iesensor.com>         *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+from __future__ import print_function, division
+import os.path
+import hashlib
+import numpy as np
+import scipy.sparse
+import scipy.sparse.linalg
+
+"""
+Surface-to-surface (enclosure) radiation between tagged boundaries for ScalarTransportSolver, set by
+`radiation_settings['enclosure']`: {'boundary_ids': [1, 2], 'emissivity': 0.8 or {1: 0.8, 2: 0.3},
+    'closed': False, 'cache_folder': None, 'maximum_iterations': None, 'tolerance': 1e-6,
+    'threshold': 1e-8, 'maximum_facets': 20000}
+
++ view factor between boundary facets, by the differential-area (centroid to centroid) formula,
+    cos_i cos_j A_j / (pi r^2) for 3D and cos_i cos_j L_j / (2 r) for 2D, visibility of each facet pair is checked
+    by ray casting against all exterior facets of the mesh, accelerated by a bounding volume hierarchy (BVH),
+    ray packets are traversed node by node with numpy vectorized slab and ray-primitive tests
++ row sum larger than 1 (facets too close for the differential formula) is scaled to 1, for `closed` enclosure
+    all rows are scaled to 1; for open enclosure, the missing view factor is to ambient at `ambient_temperature`
++ view factor matrix is stored as scipy sparse (CSR) matrix, view factors below `threshold` are dropped,
+    since most facet pairs are not visible or negligible for large enclosures; it is computed once block by block,
+    and cached into `view_factors_<hash>.npz` in `cache_folder`
+    (default: the case folder), the hash is from facet coordinates, so the cache is invalid once mesh is changed
++ gray diffuse radiosity: irradiation G = F J + (1 - sum_j F_ij) sigma T_amb^4, radiosity J = eps sigma T^4 + (1 - eps) G,
+    sparse linear system of G is LU factorized once (SuperLU), G is updated from facet temperature (mean of vertex T^4)
+    by one pair of triangular solves and stored in a DGT (facet) function, absorbed heat flux `eps (G - sigma T^4)`
+    is used as a boundary integral
++ facet pairs are ray casted, so the cost grows with the square of enclosure facet number, which is limited by
+    `maximum_facets`, SolverError is raised for a larger enclosure, coarsen the enclosure boundary mesh or raise the limit
++ only for simplex mesh (segment or triangle facets), in serial, since boundary facets are local to a process
+"""
+
+from dolfin import *
+
+from .SolverBase import SolverError
+
+Stefan_constant = 5.670367e-8  # W/m-2/K-4
+
+
+class BVH(object):
+    """ bounding volume hierarchy of axis aligned bounding boxes of primitives, built by median split of the longest axis """
+    def __init__(self, lower, upper, leaf_size = 8):
+        self.order = np.arange(len(lower))
+        self.leaf_size = leaf_size
+        self._lower, self._upper = [], []
+        self._children = []  # (left, right) or None for leaf
+        self._ranges = []  # (start, end) of `order` for leaf
+        centers = 0.5 * (lower + upper)
+        self._build(lower, upper, centers, 0, len(lower))
+        self.node_lower = np.array(self._lower)
+        self.node_upper = np.array(self._upper)
+
+    def _build(self, lower, upper, centers, start, end):
+        idx = self.order[start:end]
+        node = len(self._lower)
+        self._lower.append(lower[idx].min(axis = 0))
+        self._upper.append(upper[idx].max(axis = 0))
+        self._children.append(None)
+        self._ranges.append((start, end))
+        if end - start > self.leaf_size:
+            c = centers[idx]
+            axis = np.argmax(c.max(axis = 0) - c.min(axis = 0))
+            mid = (start + end) // 2
+            self.order[start:end] = idx[np.argpartition(c[:, axis], mid - start)]
+            left = self._build(lower, upper, centers, start, mid)
+            right = self._build(lower, upper, centers, mid, end)
+            self._children[node] = (left, right)
+        return node
+
+    def occluded(self, origins, directions, primitive_test):
+        """ bool array, True if segment `origin + t * direction` (0 < t < 1) hits any primitive,
+        `primitive_test(origins, directions, primitive_indices)` returns bool matrix of rays x primitives
+        """
+        hit = np.zeros(len(origins), dtype = bool)
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            inv_dir = 1.0 / np.where(directions == 0, 1e-300, directions)
+        stack = [(0, np.arange(len(origins)))]
+        while stack:
+            node, rays = stack.pop()
+            rays = rays[~hit[rays]]
+            if not len(rays):
+                continue
+            # slab test of the ray segment against the node box
+            t0 = (self.node_lower[node] - origins[rays]) * inv_dir[rays]
+            t1 = (self.node_upper[node] - origins[rays]) * inv_dir[rays]
+            t_enter = np.minimum(t0, t1).max(axis = 1)
+            t_exit = np.maximum(t0, t1).min(axis = 1)
+            rays = rays[(t_enter <= t_exit) & (t_exit >= 0) & (t_enter <= 1)]
+            if not len(rays):
+                continue
+            if self._children[node] is None:
+                start, end = self._ranges[node]
+                h = primitive_test(origins[rays], directions[rays], self.order[start:end]).any(axis = 1)
+                hit[rays[h]] = True
+            else:
+                stack.extend((child, rays) for child in self._children[node])
+        return hit
+
+
+def segment_test(vertices, eps = 1e-6):
+    # 2D ray segment test, vertices: array of (n, 2, 2) for n segments
+    def test(o, d, prims):
+        a = vertices[prims, 0]
+        e = vertices[prims, 1] - a
+        denom = d[:, None, 0] * e[None, :, 1] - d[:, None, 1] * e[None, :, 0]
+        w = a[None, :, :] - o[:, None, :]
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            t = (w[..., 0] * e[None, :, 1] - w[..., 1] * e[None, :, 0]) / denom
+            s = (w[..., 0] * d[:, None, 1] - w[..., 1] * d[:, None, 0]) / denom
+        return (np.abs(denom) > 1e-300) & (t > eps) & (t < 1 - eps) & (s >= 0) & (s <= 1)
+    return test
+
+
+def triangle_test(vertices, eps = 1e-6):
+    # 3D ray triangle test (Moller-Trumbore), vertices: array of (n, 3, 3) for n triangles
+    def test(o, d, prims):
+        v0 = vertices[prims, 0]
+        e1 = vertices[prims, 1] - v0
+        e2 = vertices[prims, 2] - v0
+        p = np.cross(d[:, None, :], e2[None, :, :])
+        det = np.einsum('kj,mkj->mk', e1, p)
+        tvec = o[:, None, :] - v0[None, :, :]
+        q = np.cross(tvec, e1[None, :, :])
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            inv_det = 1.0 / det
+            u = np.einsum('mkj,mkj->mk', tvec, p) * inv_det
+            v = np.einsum('mj,mkj->mk', d, q) * inv_det
+            t = np.einsum('kj,mkj->mk', e2, q) * inv_det
+        return (np.abs(det) > 1e-300) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t > eps) & (t < 1 - eps)
+    return test
+
+
+def compute_view_factors(centroids, normals, areas, bvh, primitive_test, closed = False, block_size = 500000,
+                         threshold = 0.0):
+    """ sparse view factor matrix F[i, j] from facet i to facet j, entries not larger than `threshold` are dropped,
+    visibility is symmetric, so only pairs i < j are ray casted
+    """
+    n, dim = centroids.shape
+    rows_list, cols_list, values_list = [np.zeros(0, dtype = np.intp)], [np.zeros(0, dtype = np.intp)], [np.zeros(0)]
+    rows = max(1, block_size // max(n, 1))
+    for i0 in range(0, n, rows):
+        i1 = min(n, i0 + rows)
+        I, J = np.nonzero(np.arange(i0, i1)[:, None] < np.arange(n)[None, :])
+        I += i0
+        r = centroids[J] - centroids[I]
+        dist = np.sqrt((r * r).sum(axis = 1))
+        cos_i = (normals[I] * r).sum(axis = 1) / dist
+        cos_j = -(normals[J] * r).sum(axis = 1) / dist
+        facing = (cos_i > 0) & (cos_j > 0)
+        I, J, r, dist, cos_i, cos_j = I[facing], J[facing], r[facing], dist[facing], cos_i[facing], cos_j[facing]
+        visible = ~bvh.occluded(centroids[I], r, primitive_test)
+        if dim == 3:
+            kernel = cos_i * cos_j / (np.pi * dist**2)
+        else:
+            kernel = cos_i * cos_j / (2.0 * dist)
+        kernel = kernel * visible
+        for rows_ij, cols_ij, values in ((I, J, kernel * areas[J]), (J, I, kernel * areas[I])):
+            kept = values > threshold
+            rows_list.append(rows_ij[kept])
+            cols_list.append(cols_ij[kept])
+            values_list.append(values[kept])
+    F = scipy.sparse.csr_matrix((np.concatenate(values_list), (np.concatenate(rows_list), np.concatenate(cols_list))),
+                                shape = (n, n))
+    row_sum = np.asarray(F.sum(axis = 1)).ravel()
+    scale = np.where(row_sum > 1.0, 1.0 / np.maximum(row_sum, 1e-300), 1.0)
+    if closed:
+        scale = np.where(row_sum > 0, 1.0 / np.maximum(row_sum, 1e-300), 1.0)
+    return scipy.sparse.diags(scale).dot(F).tocsr()
+
+
+class ViewFactorRadiation(object):
+    def __init__(self, mesh, boundary_facets, settings, ambient_temperature, cache_folder = None):
+        if MPI.size(mesh.mpi_comm()) > 1:
+            raise SolverError('view factor radiation can only run in serial')
+        self.mesh = mesh
+        self.settings = settings
+        self.boundary_ids = list(settings['boundary_ids'])
+        self.ambient_temperature = ambient_temperature
+        self.closed = bool(settings['closed']) if 'closed' in settings else False
+        self.tolerance = settings['tolerance'] if 'tolerance' in settings else 1e-6
+        self.threshold = settings['threshold'] if 'threshold' in settings else 1e-8
+        self.maximum_facets = settings['maximum_facets'] if 'maximum_facets' in settings else 20000
+        if 'cache_folder' in settings and settings['cache_folder']:
+            cache_folder = settings['cache_folder']
+        self.cache_folder = cache_folder or '.'
+
+        self.build_geometry(boundary_facets)
+        self.view_factors = self.load_or_compute_view_factors()
+        self.build_radiosity_system()
+        self.build_functions()
+
+    def build_geometry(self, boundary_facets):
+        # enclosure facets and all exterior facets (occluders), with outward normals pointing into the enclosure
+        mesh = self.mesh
+        tdim = mesh.topology().dim()
+        if mesh.ufl_cell().cellname() not in ('triangle', 'tetrahedron'):
+            raise SolverError('view factor radiation supports only triangle or tetrahedron mesh')
+        mesh.init(tdim - 1, tdim)
+        x = mesh.coordinates()
+        markers = boundary_facets.array()
+        exterior, enclosure, cells = [], [], []
+        for f in facets(mesh):
+            if f.exterior():
+                exterior.append(f.index())
+                if markers[f.index()] in self.boundary_ids:
+                    enclosure.append(f.index())
+                    cells.append(f.entities(tdim)[0])
+        facet_vertices = mesh.topology()(tdim - 1, 0)
+        self.occluder_vertices = np.array([x[facet_vertices(f)] for f in exterior])
+        if len(enclosure) > self.maximum_facets:
+            raise SolverError('enclosure has {} facets, more than `maximum_facets` {} of view factor radiation, '
+                              'coarsen the enclosure boundary or raise the limit'.format(len(enclosure), self.maximum_facets))
+        self.facets = np.array(enclosure, dtype = np.intp)
+        self.facet_cells = np.array(cells, dtype = np.intp)
+        self.facet_markers = markers[self.facets]
+        self.facet_vertex_indices = np.array([facet_vertices(f) for f in self.facets])
+        v = x[self.facet_vertex_indices]  # (n, tdim, gdim)
+        self.centroids = v.mean(axis = 1)
+        if tdim == 2:
+            e = v[:, 1] - v[:, 0]
+            self.areas = np.sqrt((e * e).sum(axis = 1))
+            normals = np.column_stack([e[:, 1], -e[:, 0]])
+        else:
+            normals = np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
+            self.areas = 0.5 * np.sqrt((normals * normals).sum(axis = 1))
+        normals /= np.sqrt((normals * normals).sum(axis = 1))[:, None]
+        cell_centroids = np.array([x[Cell(mesh, c).entities(0)].mean(axis = 0) for c in self.facet_cells])
+        outward = ((self.centroids - cell_centroids) * normals).sum(axis = 1) > 0
+        self.normals = np.where(outward[:, None], normals, -normals)
+
+    def get_cache_filename(self):
+        h = hashlib.sha1()
+        h.update(np.ascontiguousarray(self.centroids).tobytes())
+        h.update(np.ascontiguousarray(self.normals).tobytes())
+        h.update(np.ascontiguousarray(self.occluder_vertices).tobytes())
+        h.update(repr((self.closed, self.threshold)).encode('utf-8'))
+        return os.path.join(self.cache_folder, 'view_factors_{}.npz'.format(h.hexdigest()[:16]))
+
+    def load_or_compute_view_factors(self):
+        filename = self.get_cache_filename()
+        if os.path.exists(filename):
+            data = np.load(filename)
+            if 'indptr' in data.files and data['facets'].shape == self.facets.shape and (data['facets'] == self.facets).all():
+                return scipy.sparse.csr_matrix((data['data'], data['indices'], data['indptr']), shape = tuple(data['shape']))
+        lower = self.occluder_vertices.min(axis = 1)
+        upper = self.occluder_vertices.max(axis = 1)
+        bvh = BVH(lower, upper)
+        if self.mesh.topology().dim() == 2:
+            test = segment_test(self.occluder_vertices)
+        else:
+            test = triangle_test(self.occluder_vertices)
+        F = compute_view_factors(self.centroids, self.normals, self.areas, bvh, test, self.closed, threshold = self.threshold)
+        np.savez(filename, data = F.data, indices = F.indices, indptr = F.indptr, shape = np.array(F.shape),
+                 facets = self.facets)
+        return F
+
+    def build_radiosity_system(self):
+        # (I - F (1 - eps)) G = F eps sigma T^4 + (1 - sum_j F_ij) sigma T_amb^4, factorized once since F and eps are fixed
+        eps = self.settings['emissivity'] if 'emissivity' in self.settings else 1.0
+        if isinstance(eps, dict):
+            self.emissivity = np.array([eps[m] for m in self.facet_markers], dtype = float)
+        else:
+            self.emissivity = np.full(len(self.facets), float(eps))
+        F = self.view_factors
+        A = scipy.sparse.identity(len(self.facets), format = 'csc') - F.dot(scipy.sparse.diags(1.0 - self.emissivity))
+        self._radiosity_solver = scipy.sparse.linalg.splu(A.tocsc())
+        self._emission_operator = F.dot(scipy.sparse.diags(self.emissivity)).tocsr()
+        row_sum = np.asarray(F.sum(axis = 1)).ravel()
+        self._ambient_irradiation = self._radiosity_solver.solve((1.0 - row_sum) * Stefan_constant * self.ambient_temperature**4)
+
+    def build_functions(self):
+        # irradiation G and emissivity as DGT (facet) functions, facet dof is located by its local index in the cell
+        V = FunctionSpace(self.mesh, 'Discontinuous Lagrange Trace', 0)
+        tdim = self.mesh.topology().dim()
+        dofmap = V.dofmap()
+        self.facet_dofs = np.array([dofmap.cell_dofs(c)[list(Cell(self.mesh, c).entities(tdim - 1)).index(f)]
+                                    for f, c in zip(self.facets, self.facet_cells)], dtype = np.intp)
+        self.irradiation = Function(V)
+        self.emissivity_function = Function(V)
+        self._set_facet_values(self.emissivity_function, self.emissivity)
+
+    def _set_facet_values(self, function, values):
+        x = function.vector().get_local()
+        x[self.facet_dofs] = values
+        function.vector().set_local(x)
+        function.vector().apply('insert')
+
+    def update(self, T):
+        """ update irradiation from temperature function T, return relative change of the irradiation """
+        vertex_T = T.compute_vertex_values(self.mesh)
+        emissive_power = Stefan_constant * (vertex_T[self.facet_vertex_indices]**4).mean(axis = 1)
+        G = self._radiosity_solver.solve(self._emission_operator.dot(emissive_power)) + self._ambient_irradiation
+        G_old = self.irradiation.vector().get_local()[self.facet_dofs]
+        self._set_facet_values(self.irradiation, G)
+        return np.abs(G - G_old).max() / max(np.abs(G).max(), 1e-300)
+
+    def absorbed_flux(self, T, T_lagged = None):
+        # UFL expression of net radiative heat flux into the surface, T**4 is linearized by T_lagged for Picard iteration
+        emission = pow(T_lagged, 3) * T if T_lagged is not None else pow(T, 4)
+        return self.emissivity_function * (self.irradiation - Stefan_constant * emission)
+
+    def measure(self, ds):
+        return ds(tuple(self.boundary_ids))
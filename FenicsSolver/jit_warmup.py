@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2018 - Qingfeng Xia <qingfeng.xia iesensor.com>         *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+from __future__ import print_function, division
+import sys
+import copy
+import time
+import logging
+import importlib
+
+"""Ahead-of-time JIT compiling of all forms of a case, without solving, to fill the dolfin (instant/dijitso) cache
+Usage: `python -m FenicsSolver.jit_warmup case_input.json [--steady]`, then the production run starts with a warm cache
+
+Form variants: the case itself, for a transient case also the other BDF time schemes, and steady if `--steady` is given,
+each for the first and later time steps, boundary conditions of the case file are all included in the generated form.
+Form signature does not depend on values of Constant, so changing values in case file does not need recompiling.
+"""
+
+from dolfin import Form, lhs, rhs, derivative
+
+from .main import load_settings
+from .SolverBase import SolverError, _bdf_orders
+
+logger = logging.getLogger('FenicsSolver.jit_warmup')
+
+def create_solver(settings):
+    # solver module has the same name as solver class
+    solver_name = settings['solver_name']
+    try:
+        module = importlib.import_module('FenicsSolver.' + solver_name)
+    except ImportError:
+        raise NameError('Solver name : {} is not supported by Fenics'.format(solver_name))
+    return getattr(module, solver_name)(settings)
+
+
+def get_form_variants(settings, including_steady = False):
+    """ list of (variant name, modified case settings), the case settings itself is the first,
+    `solver_settings` of variants are deep copied, so the case settings are not changed.
+    The steady variant of a transient case is added only if `including_steady`, e.g. steady initialization
+    """
+    variants = [('case', settings)]
+    ts = settings['solver_settings']['transient_settings']
+    if not ts['transient']:
+        return variants
+    case_scheme = ts['time_scheme'] if 'time_scheme' in ts else None
+    modifications = [('steady', {'transient': False})] if including_steady else []
+    modifications += [(scheme, {'time_scheme': scheme}) for scheme in sorted(_bdf_orders) if scheme != case_scheme]
+    for name, modification in modifications:
+        s = copy.copy(settings)  # mesh and other dolfin objects are shared
+        s['solver_settings'] = copy.deepcopy(settings['solver_settings'])
+        s['solver_settings']['transient_settings'].update(modification)
+        variants.append((name, s))
+    return variants
+
+
+def compile_form(name, form):
+    # Form() constructor triggers the FFC JIT compiling, or load from the cache
+    t0 = time.time()
+    Form(form)
+    elapsed = time.time() - t0
+    logger.info('compiled form `%s` in %.3f seconds', name, elapsed)
+    return elapsed
+
+
+def compile_solver_forms(solver, variant_name):
+    """ generate forms of the first and the second step, return dict of form name and compiling time """
+    timings = {}
+    solver.init_solver()
+    solver.current_time = solver.transient_settings['starting_time']
+    steps = [0, 1] if solver.transient_settings['transient'] else [0]
+    for step in steps:
+        solver.current_step = step
+        F, bcs = solver.generate_form(step, solver.trial_function, solver.test_function, solver.w_current, solver.w_prev)
+        prefix = '{}_step{}'.format(variant_name, step)
+        if len(F.arguments()) == 1:  # residual form of the nonlinear problem, TrialFunction has been replaced
+            J = solver.J if hasattr(solver, 'J') else derivative(F, solver.w_current, solver.trial_function)
+            timings[prefix + '_residual'] = compile_form(prefix + '_residual', F)
+            timings[prefix + '_jacobian'] = compile_form(prefix + '_jacobian', J)
+        else:
+            timings[prefix + '_lhs'] = compile_form(prefix + '_lhs', lhs(F))
+            timings[prefix + '_rhs'] = compile_form(prefix + '_rhs', rhs(F))
+    return timings
+
+
+def warmup(case_input, including_steady = False):
+    """ build solver and its forms for all variants without solving, return dict of form name and compiling time """
+    settings = load_settings(case_input)
+    timings = {}
+    for variant_name, s in get_form_variants(settings, including_steady):
+        try:
+            solver = create_solver(s)
+            timings.update(compile_solver_forms(solver, variant_name))
+        except SolverError as e:  # some solvers support only transient or steady
+            logger.warning('skip form variant `%s`: %s', variant_name, e)
+    return timings
+
+
+def report(timings):
+    logger.info('%40s %12s', 'form', 'time (s)')
+    for name, t in sorted(timings.items(), key=lambda item: -item[1]):
+        logger.info('%40s %12.3f', name, t)
+    logger.info('%40s %12.3f', 'total', sum(timings.values()))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level = logging.INFO, format = '%(message)s')
+    args = [a for a in sys.argv[1:] if a != '--steady']
+    if len(args) < 1:
+        print("Not enough input argument, Usage: `python -m FenicsSolver.jit_warmup case_input [--steady]`")
+    else:
+        report(warmup(args[0], '--steady' in sys.argv[1:]))
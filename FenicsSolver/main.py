@@ -30,15 +30,18 @@ import os.path
 python2 and python3 compatible
 """
 
+_encoding = 'ascii'
 if sys.version_info[0] >= 3:
     unicode = str
+    _encode = lambda s: s  # str is already unicode, bytes key would not match str key
+else:
+    _encode = lambda s: s.encode(_encoding)
 
-_encoding = 'ascii'
 def _decode_list(data):
     rv = []
     for item in data:
         if isinstance(item, unicode):
-            item = item.encode(_encoding)
+            item = _encode(item)
         elif isinstance(item, list):
             item = _decode_list(item)
         elif isinstance(item, dict):
@@ -51,9 +54,9 @@ def _decode_dict(data):
     for key in data:
         value = data[key]
         if isinstance(key, unicode):
-            key = key.encode(_encoding)
+            key = _encode(key)
         if isinstance(value, unicode):
-            value = value.encode(_encoding)
+            value = _encode(value)
         elif isinstance(value, list):
             value = _decode_list(value)
         elif isinstance(value, dict):
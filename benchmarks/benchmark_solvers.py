@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2018 - Qingfeng Xia <qingfeng.xia iesensor.com>         *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""Performance benchmark of all solvers on generated meshes of increasing size
+
+Usage:
+    python benchmark_solvers.py                       # run all cases, compare with `baseline.json` if it exists
+    python benchmark_solvers.py --update-baseline     # run all cases and store the results as baseline
+    python benchmark_solvers.py --cases ScalarTransport,LinearElasticity --sizes 8,16 --tolerance 0.3
+    python benchmark_solvers.py --cases FSI           # FSISolver runs only in serial, not in the default cases
+
+For each case and mesh size, assembly time, solve time, total time, linear and nonlinear iteration counts,
+number of DOFs and peak RSS are collected from the solver's PerformanceProfiler and written as JSON (`--output`).
+Linear problems are solved by the persistent linear solver (`reusing_linear_solver`), whose assembly is timed
+separately, `assembly_time` is None if any problem is still solved by dolfin LinearVariationalSolver or
+NonlinearVariationalSolver, whose assembly is counted in `solve_time` (see `notes` of the performance report).
+`solve_time` is the exclusive time of linear_solve and nonlinear_solve phases, so the assembly and linear solves
+nested in the Newton and Picard iterations of SolverBase are not counted twice.
+A metric larger than `(1 + tolerance) * baseline` is reported as a regression, so is a failed case which passed
+in the baseline, exit code is 1 for regressions, or for any failed case if there is no baseline to compare.
+
+No baseline is shipped with the source, since timing is not portable, it must be generated on the same machine
+and software stack as the later runs, e.g. the CI node, before the change to be measured:
+    git stash  # or checkout the reference commit
+    mpirun -np 4 python benchmarks/benchmark_solvers.py --update-baseline  # writes benchmarks/baseline.json
+    git stash pop
+    mpirun -np 4 python benchmarks/benchmark_solvers.py  # compares with the baseline
+Without the baseline, results are only written to `--output` and regressions can not be detected.
+"""
+
+from __future__ import print_function, division
+import os.path
+import sys
+import copy
+import json
+import argparse
+from collections import OrderedDict
+
+from dolfin import *
+set_log_level(ERROR)
+
+from FenicsSolver import SolverBase
+
+_here = os.path.dirname(os.path.abspath(__file__))
+default_baseline_filename = os.path.join(_here, 'baseline.json')
+
+timing_metrics = ('assembly_time', 'solve_time', 'total_time')
+count_metrics = ('linear_iterations', 'nonlinear_iterations', 'peak_rss_mb')
+
+
+def _case_settings(mesh, bcs, transient_settings = None):
+    s = copy.deepcopy(SolverBase.default_case_settings)
+    s['mesh'] = mesh
+    s['boundary_conditions'] = bcs
+    if transient_settings:
+        s['solver_settings']['transient_settings'] = transient_settings
+    s['solver_settings']['reusing_linear_solver'] = True  # assembly is timed separately from linear solve
+    s['report_settings'] = copy.copy(SolverBase.default_report_settings)
+    s['report_settings']['plotting_freq'] = 0
+    s['report_settings']['saving_freq'] = 0
+    return s
+
+
+def _scalar_transport_settings(n):
+    mesh = UnitSquareMesh(n, n)
+    bcs = OrderedDict()
+    bcs['hot'] = {'boundary': AutoSubDomain(lambda x, on_boundary: on_boundary and near(x[1], 1)), 'boundary_id': 1,
+                    'type': 'Dirichlet', 'value': 360}
+    bcs['cold'] = {'boundary': AutoSubDomain(lambda x, on_boundary: on_boundary and near(x[1], 0)), 'boundary_id': 2,
+                    'type': 'HTC', 'value': 100, 'ambient': 300}
+    s = _case_settings(mesh, bcs, {'transient': True, 'starting_time': 0, 'time_step': 100, 'ending_time': 1000})
+    s['scalar_name'] = 'temperature'
+    s['initial_values'] = {'temperature': 300}
+    s['material'] = {'density': 1000, 'specific_heat_capacity': 4200, 'thermal_conductivity': 0.6}
+    s['convective_velocity'] = None
+    return s
+
+
+def scalar_transport(n):
+    from FenicsSolver.ScalarTransportSolver import ScalarTransportSolver
+    return ScalarTransportSolver(_scalar_transport_settings(n))
+
+
+def scalar_transport_dg(n):
+    from FenicsSolver.ScalarTransportDGSolver import ScalarTransportDGSolver
+    s = _scalar_transport_settings(n)
+    s['convective_velocity'] = Constant((0.005, -0.005))
+    return ScalarTransportDGSolver(s)
+
+
+def coupled_navier_stokes(n):
+    from FenicsSolver.CoupledNavierStokesSolver import CoupledNavierStokesSolver
+    mesh = UnitSquareMesh(n, n)
+    bcs = OrderedDict()
+    bcs['wall'] = {'boundary': AutoSubDomain(lambda x, on_boundary: on_boundary and (near(x[1], 0) or near(x[1], 1))),
+                    'boundary_id': 1, 'values': [{'variable': 'velocity', 'type': 'Dirichlet', 'value': (0, 0)}]}
+    bcs['inlet'] = {'boundary': AutoSubDomain(lambda x, on_boundary: on_boundary and near(x[0], 0)), 'boundary_id': 2,
+                    'values': [{'variable': 'velocity', 'type': 'Dirichlet', 'value': ('4*x[1]*(1-x[1])', '0')}]}
+    bcs['outlet'] = {'boundary': AutoSubDomain(lambda x, on_boundary: on_boundary and near(x[0], 1)), 'boundary_id': 3,
+                    'values': [{'variable': 'pressure', 'type': 'Dirichlet', 'value': 1e5}]}
+    s = _case_settings(mesh, bcs, {'transient': True, 'starting_time': 0, 'time_step': 0.01, 'ending_time': 0.05})
+    s['initial_values'] = {'velocity': (0, 0), 'pressure': 1e5}
+    s['solver_settings']['reference_values'] = {'velocity': (1, 1), 'pressure': 1e5}
+    s['material'] = {'name': 'fluid', 'kinematic_viscosity': 0.1, 'density': 1}
+    s['body_source'] = (0, 0)
+    return CoupledNavierStokesSolver(s)
+
+
+def _elasticity_settings(mesh, bcs):
+    s = _case_settings(mesh, bcs)
+    s['material'] = {'name': 'steel', 'elastic_modulus': 2e11, 'poisson_ratio': 0.27, 'density': 7800,
+                        'thermal_expansion_coefficient': 2e-6}
+    s['temperature_distribution'] = None
+    s['solver_settings']['reference_values'] = {'temperature': 293}
+    return s
+
+
+def linear_elasticity(n):
+    from FenicsSolver.LinearElasticitySolver import LinearElasticitySolver
+    mesh = BoxMesh(Point(0, 0, 0), Point(10, 1, 1), 4*n, n, n)
+    bcs = OrderedDict()
+    bcs['fixed'] = {'boundary': AutoSubDomain(lambda x, on_boundary: on_boundary and near(x[0], 0)), 'boundary_id': 1,
+                    'type': 'Dirichlet', 'value': Constant((0, 0, 0))}
+    bcs['tensile'] = {'boundary': AutoSubDomain(lambda x, on_boundary: on_boundary and near(x[0], 10)), 'boundary_id': 2,
+                    'type': 'stress', 'value': Constant((1e8, 0, 0))}
+    return LinearElasticitySolver(_elasticity_settings(mesh, bcs))
+
+
+def nonlinear_elasticity(n):
+    from FenicsSolver.NonlinearElasticitySolver import NonlinearElasticitySolver
+    mesh = UnitCubeMesh(n, n, n)
+    bcs = OrderedDict()
+    bcs['left'] = {'boundary': AutoSubDomain(lambda x, on_boundary: on_boundary and near(x[0], 0)), 'boundary_id': 1,
+                    'type': 'Dirichlet', 'value': Constant((0, 0, 0))}
+    bcs['right'] = {'boundary': AutoSubDomain(lambda x, on_boundary: on_boundary and near(x[0], 1)), 'boundary_id': 2,
+                    'type': 'Dirichlet', 'value': Constant((0.1, 0, 0))}
+    s = _elasticity_settings(mesh, bcs)
+    s['material'] = {'name': 'rubber', 'elastic_modulus': 10, 'poisson_ratio': 0.3, 'density': 800,
+                        'thermal_expansion_coefficient': 2e-6}
+    return NonlinearElasticitySolver(s)
+
+
+def large_deformation(n):
+    from FenicsSolver.LargeDeformationSolver import LargeDeformationSolver
+    mesh = RectangleMesh(Point(0, 0), Point(20, 1), 20*n//4, n//4, 'crossed')
+    bcs = OrderedDict()
+    bcs['fixed'] = {'boundary': AutoSubDomain(lambda x: near(x[0], 0)), 'boundary_id': 1,
+                    'type': 'Dirichlet', 'value': ((0.0, 0.0), (0.0, 0.0))}
+    bcs['pressure'] = {'boundary': AutoSubDomain(lambda x: near(x[0], 20)), 'boundary_id': 2,
+                    'type': 'pressure', 'value': lambda t: 100*t, 'direction': Constant((0.0, 1.0))}
+    s = _case_settings(mesh, bcs, {'transient': True, 'starting_time': 0, 'time_step': 0.25, 'ending_time': 1.0})
+    s['material'] = {'name': 'steel', 'elastic_modulus': 1e5, 'poisson_ratio': 0.3, 'density': 1000,
+                        'thermal_expansion_coefficient': 2e-6}
+    s['solver_settings']['reference_values'] = {'temperature': 293}
+    return LargeDeformationSolver(s)
+
+
+def fsi(n):
+    # channel flow over an elastic layer at the bottom, fluid and solid meshes are submeshes of the parent mesh
+    from FenicsSolver.FSISolver import FSISolver
+    parent_mesh = RectangleMesh(Point(0, 0), Point(4, 1), 4*n, n)
+    h_solid = 0.25
+    markers = MeshFunction('size_t', parent_mesh, parent_mesh.topology().dim(), 0)
+    AutoSubDomain(lambda x: x[1] <= h_solid + DOLFIN_EPS).mark(markers, 1)
+    fluid_mesh = SubMesh(parent_mesh, markers, 0)
+    solid_mesh = SubMesh(parent_mesh, markers, 1)
+    interface = AutoSubDomain(lambda x, on_boundary: on_boundary and near(x[1], h_solid))
+    transient_settings = {'transient': True, 'starting_time': 0, 'time_step': 0.01, 'ending_time': 0.03}
+
+    fbcs = OrderedDict()
+    fbcs['interface'] = {'boundary': interface, 'boundary_id': 1, 'coupling': 'FSI',
+                    'values': [{'variable': 'velocity', 'type': 'Dirichlet', 'value': (0, 0)}]}
+    fbcs['top'] = {'boundary': AutoSubDomain(lambda x, on_boundary: on_boundary and near(x[1], 1)), 'boundary_id': 2,
+                    'values': [{'variable': 'velocity', 'type': 'Dirichlet', 'value': (0, 0)}]}
+    fbcs['inlet'] = {'boundary': AutoSubDomain(lambda x, on_boundary: on_boundary and near(x[0], 0)), 'boundary_id': 3,
+                    'values': [{'variable': 'velocity', 'type': 'Dirichlet', 'value': (1, 0)}]}
+    fbcs['outlet'] = {'boundary': AutoSubDomain(lambda x, on_boundary: on_boundary and near(x[0], 4)), 'boundary_id': 4,
+                    'values': [{'variable': 'pressure', 'type': 'Dirichlet', 'value': 1e5}]}
+    fs = _case_settings(fluid_mesh, fbcs, transient_settings)
+    fs['initial_values'] = {'velocity': (0, 0), 'pressure': 1e5}
+    fs['solver_settings']['reference_values'] = {'velocity': (1, 1), 'pressure': 1e5}
+    fs['material'] = {'name': 'fluid', 'kinematic_viscosity': 0.1, 'density': 1}
+    fs['body_source'] = (0, 0)
+
+    sbcs = OrderedDict()
+    sbcs['interface'] = {'boundary': interface, 'boundary_id': 1, 'type': 'stress', 'value': Constant((0, 0))}
+    sbcs['fixed'] = {'boundary': AutoSubDomain(lambda x, on_boundary: on_boundary and near(x[1], 0)), 'boundary_id': 2,
+                    'type': 'Dirichlet', 'value': Constant((0, 0))}
+    ss = _elasticity_settings(solid_mesh, sbcs)
+    ss['fe_degree'] = fs['fe_degree'] + 1
+    ss['material']['elastic_modulus'] = 1e6
+
+    settings = {'participants': [{'solver_domain': 'fluidic', 'settings': fs}, {'solver_domain': 'elastic', 'settings': ss}],
+                'parent_mesh': parent_mesh, 'transient_settings': transient_settings, 'coupling_settings': {}}
+    return FSISolver(settings)
+
+
+cases = OrderedDict([('ScalarTransport', scalar_transport),
+                     ('ScalarTransportDG', scalar_transport_dg),
+                     ('CoupledNavierStokes', coupled_navier_stokes),
+                     ('LinearElasticity', linear_elasticity),
+                     ('NonlinearElasticity', nonlinear_elasticity),
+                     ('LargeDeformation', large_deformation),
+                     ('FSI', fsi)])
+default_cases = [name for name in cases if name != 'FSI']  # FSISolver raises SolverError under MPI
+
+
+def collect_metrics(solvers):
+    # sum of all participant solvers' profilers, e.g. fluid and solid solver of FSI
+    metrics = {'assembly_time': 0.0, 'solve_time': 0.0, 'linear_iterations': 0, 'nonlinear_iterations': 0,
+               'dofs': 0, 'peak_rss_mb': 0.0}
+    for solver in solvers:
+        p = solver.profiler
+        c = p.cumulative
+        if metrics['assembly_time'] is not None:
+            metrics['assembly_time'] += c.get('assembly', 0.0) + c.get('jit', 0.0)
+        if 'linear_solve' in p.notes or 'nonlinear_solve' in p.notes:  # assembly is counted in dolfin variational solvers
+            metrics['assembly_time'] = None
+        metrics['solve_time'] += p.exclusive.get('linear_solve', 0.0) + p.exclusive.get('nonlinear_solve', 0.0)
+        metrics['linear_iterations'] += p.iterations['linear']
+        metrics['nonlinear_iterations'] += p.iterations['nonlinear']
+        memory = solver.get_memory_usage()
+        metrics['dofs'] += memory['dofs']
+        if 'peak_rss_mb_max' in memory:
+            metrics['peak_rss_mb'] = max(metrics['peak_rss_mb'], memory['peak_rss_mb_max'])
+    return metrics
+
+
+def run_case(name, n):
+    timer = Timer('Benchmark' + name)
+    timer.start()
+    solver = cases[name](n)
+    solver.solve()
+    total_time = MPI.max(mpi_comm_world(), timer.stop())  # the slowest process
+    metrics = collect_metrics(getattr(solver, 'solver_list', [solver]))
+    metrics['total_time'] = total_time
+    return metrics
+
+
+def compare(results, baseline, tolerance):
+    """ list of regression message, a metric is regression if it is larger than the baseline by `tolerance` ratio """
+    regressions = []
+    for key, metrics in sorted(results.items()):
+        if key not in baseline or 'error' in baseline[key]:
+            continue
+        if 'error' in metrics:
+            regressions.append('{} failed, but passed in baseline: {}'.format(key, metrics['error']))
+            continue
+        for m in timing_metrics + count_metrics:
+            b = baseline[key].get(m)
+            if b is not None and metrics.get(m) is not None and metrics[m] > b * (1.0 + tolerance) + 1e-12:
+                regressions.append('{} {}: {} > baseline {}'.format(key, m, metrics[m], b))
+        if baseline[key].get('dofs') != metrics.get('dofs'):  # mesh or element has been changed
+            regressions.append('{} dofs: {} != baseline {}'.format(key, metrics.get('dofs'), baseline[key].get('dofs')))
+    return regressions
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'FenicsSolver performance benchmark')
+    parser.add_argument('--cases', default = ','.join(default_cases), help = 'comma separated case names')
+    parser.add_argument('--sizes', default = '8,16,32', help = 'comma separated mesh division numbers')
+    parser.add_argument('--baseline', default = default_baseline_filename, help = 'baseline JSON file, empty to skip comparing')
+    parser.add_argument('--update-baseline', action = 'store_true', help = 'save results as the new baseline')
+    parser.add_argument('--tolerance', type = float, default = 0.25, help = 'allowed relative increase of metrics')
+    parser.add_argument('--output', default = 'benchmark_results.json', help = 'result JSON file')
+    args = parser.parse_args(argv)
+
+    rank = MPI.rank(mpi_comm_world())  # all ranks run the cases, output only by rank 0
+    results = OrderedDict()
+    for name in args.cases.split(','):
+        if name not in cases:
+            raise NameError('benchmark case `{}` is not found in {}'.format(name, list(cases.keys())))
+        for n in [int(v) for v in args.sizes.split(',')]:
+            key = '{}_{}'.format(name, n)
+            if rank == 0: print('running benchmark case `{}`'.format(key))
+            try:
+                results[key] = run_case(name, n)
+            except Exception as e:  # solvers under development should not stop the whole suite
+                if rank == 0: print('benchmark case `{}` failed: {}'.format(key, e))
+                results[key] = {'error': str(e)}
+            if rank == 0: print(key, results[key])
+
+    if rank == 0:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent = 2)
+    failed = 1 if any('error' in metrics for metrics in results.values()) else 0
+    if not args.baseline:
+        return failed
+    if args.update_baseline:
+        if rank == 0:
+            with open(args.baseline, 'w') as f:
+                json.dump(results, f, indent = 2)
+            print('baseline is saved to `{}`'.format(args.baseline))
+        return failed
+    if not os.path.exists(args.baseline):
+        if rank == 0: print('baseline file `{}` is not found, run with `--update-baseline` to create it'.format(args.baseline))
+        return failed
+    baseline = json.load(open(args.baseline))
+    regressions = compare(results, baseline, args.tolerance)
+    if rank == 0:
+        for r in regressions:
+            print('performance regression: ' + r)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2018 - Qingfeng Xia <qingfeng.xia iesensor.com>         *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+
+"""Strong and weak scaling harness, running `benchmark_solvers.py` under `mpirun` with increasing number of processes
+
+Usage:
+    python scaling.py --cases ScalarTransport,LinearElasticity --ranks 1,2,4,8 --size 64
+    python scaling.py --mode weak --ranks 1,8,64 --size 16 --mpirun "mpirun --bind-to core"
+
+strong scaling: the same mesh for all rank numbers, speed-up = T(N0) / T(N), efficiency = speed-up * N0 / N
+weak scaling: mesh divisions are scaled by (N/N0)^(1/dim), so DOFs per process is roughly constant,
+    efficiency = T(N0) / T(N)
+N0 is the first (smallest) rank number. FSISolver runs only in serial, it is not included by default.
+Results (all metrics of each run, speed-up and efficiency) are written into a JSON file,
+exit code is 1 if any run failed.
+"""
+
+from __future__ import print_function, division
+import os.path
+import sys
+import json
+import shlex
+import argparse
+import tempfile
+import subprocess
+from collections import OrderedDict
+
+_here = os.path.dirname(os.path.abspath(__file__))
+default_cases = 'ScalarTransport,ScalarTransportDG,CoupledNavierStokes,LinearElasticity,NonlinearElasticity,LargeDeformation'
+case_dims = {'LinearElasticity': 3, 'NonlinearElasticity': 3}  # generated mesh dimension, 2 for other cases
+
+
+def get_size(case, size, nranks, nranks0, mode):
+    if mode == 'strong':
+        return size
+    dim = case_dims[case] if case in case_dims else 2
+    return int(round(size * (nranks / nranks0) ** (1.0 / dim)))
+
+
+def run_benchmark(mpirun, nranks, case, size):
+    # metrics dict of one benchmark case, run in a sub process
+    fd, output = tempfile.mkstemp(suffix = '.json')
+    os.close(fd)
+    try:
+        cmd = shlex.split(mpirun) + ['-np', str(nranks), sys.executable, os.path.join(_here, 'benchmark_solvers.py'),
+               '--cases', case, '--sizes', str(size), '--output', output, '--baseline', '']
+        print(' '.join(cmd))
+        subprocess.check_call(cmd)
+        with open(output) as f:
+            return json.load(f)['{}_{}'.format(case, size)]
+    finally:
+        os.remove(output)
+
+
+def scaling(cases, ranks, size, mode, mpirun):
+    """ dict of case name -> list of metrics of each rank number, with `ranks`, `size`, `speedup` and `efficiency` """
+    results = OrderedDict()
+    for case in cases:
+        runs = []
+        for n in ranks:
+            s = get_size(case, size, n, ranks[0], mode)
+            try:
+                metrics = run_benchmark(mpirun, n, case, s)
+            except (subprocess.CalledProcessError, KeyError, ValueError) as e:
+                metrics = {'error': str(e)}
+            metrics['ranks'] = n
+            metrics['size'] = s
+            runs.append(metrics)
+        t0 = runs[0]['total_time'] if 'total_time' in runs[0] else None
+        for r in runs:
+            if t0 and 'total_time' in r:
+                r['speedup'] = t0 / r['total_time']
+                if mode == 'strong':
+                    r['efficiency'] = r['speedup'] * ranks[0] / r['ranks']
+                else:
+                    r['efficiency'] = r['speedup']
+        results[case] = runs
+    return results
+
+
+def report(results, mode):
+    print("{} scaling".format(mode))
+    print("{:>20s} {:>6s} {:>6s} {:>10s} {:>12s} {:>10s} {:>10s}".format(
+            "case", "ranks", "size", "dofs", "time (s)", "speedup", "efficiency"))
+    for case, runs in results.items():
+        for r in runs:
+            if 'error' in r:
+                print("{:>20s} {:>6d} {:>6d}  failed: {}".format(case, r['ranks'], r['size'], r['error']))
+            else:
+                print("{:>20s} {:>6d} {:>6d} {:>10d} {:>12.3f} {:>10.2f} {:>10.2f}".format(case, r['ranks'], r['size'],
+                        r['dofs'], r['total_time'], r.get('speedup', 0), r.get('efficiency', 0)))
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'FenicsSolver strong and weak scaling')
+    parser.add_argument('--cases', default = default_cases, help = 'comma separated case names')
+    parser.add_argument('--ranks', default = '1,2,4', help = 'comma separated number of MPI processes')
+    parser.add_argument('--size', type = int, default = 32, help = 'mesh divisions (of the first rank number for weak scaling)')
+    parser.add_argument('--mode', choices = ['strong', 'weak'], default = 'strong')
+    parser.add_argument('--mpirun', default = 'mpirun', help = 'MPI launcher command with options')
+    parser.add_argument('--output', default = 'scaling_results.json', help = 'result JSON file')
+    args = parser.parse_args(argv)
+
+    ranks = [int(v) for v in args.ranks.split(',')]
+    results = scaling(args.cases.split(','), ranks, args.size, args.mode, args.mpirun)
+    report(results, args.mode)
+    with open(args.output, 'w') as f:
+        json.dump({'mode': args.mode, 'results': results}, f, indent = 2)
+    failed = [(case, r['ranks']) for case, runs in results.items() for r in runs if 'error' in r]
+    if failed:
+        print('failed runs (case, ranks): {}'.format(failed))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -22,6 +22,7 @@
 
 from __future__ import print_function, division
 import math
+import copy
 import numpy as np
 
 from config import is_interactive
@@ -29,6 +30,7 @@ interactively = is_interactive()
 
 from dolfin import *
 from FenicsSolver.ScalarTransportSolver  import ScalarTransportSolver
+from FenicsSolver.SolverBase import default_report_settings
 
 #mesh = UnitCubeMesh(20, 20, 20)
 mesh = UnitSquareMesh(40, 40)
@@ -87,6 +89,8 @@ settings = {'solver_name': 'ScalerEquationSolver',
                 # solver specific settings
                 'scalar_name': 'temperature',
                 }
+default_material = copy.deepcopy(settings['material'])  # setup() and test_radiation() modify material in place
+default_transient_settings = {'transient': True, 'starting_time': 0, 'time_step': 100, 'ending_time': 1000}  # 10 steps
 
 K_anisotropic = Expression((('exp(x[0])','sin(x[1])'), ('sin(x[0])','tan(x[1])')), degree=0)  #works!
 """
@@ -191,6 +195,34 @@ def post_process(T, interactively):
     if interactively:
         interactive()
 
+def case_settings(transient_settings = None, material = None, report_settings = None, **items):
+    """ independent copy of the module level `settings` for one test, so tests do not change each other:
+    dicts of boundary conditions, material, transient, solver and report settings are copied, dolfin objects are shared,
+    hot and cold boundaries are Dirichlet, no convective velocity or radiation unless given as keyword `items`
+    """
+    s = copy.copy(settings)
+    s['boundary_conditions'] = {
+        "hot": {'boundary': top, 'boundary_id': 1, 'values': {
+                    'temperature': {'variable': 'temperature', 'type': 'Dirichlet', 'value': Constant(T_hot)}
+                 } },
+        "cold": {'boundary': bottom, 'boundary_id': 2, 'values': {
+                    'temperature': {'variable': 'temperature', 'type': 'Dirichlet', 'value': Constant(T_cold)}
+                 } },
+        "left": bcs["left"], "right": bcs["right"]}
+    s['material'] = copy.deepcopy(default_material)
+    if material:
+        s['material'].update(material)
+    s['solver_settings'] = copy.deepcopy(settings['solver_settings'])
+    if transient_settings:
+        s['solver_settings']['transient_settings'] = copy.deepcopy(transient_settings)
+    s['report_settings'] = copy.deepcopy(default_report_settings)
+    if report_settings:
+        s['report_settings'].update(report_settings)
+    s['convective_velocity'] = None
+    s['radiation_settings'] = None
+    s.update(items)
+    return s
+
 def test_radiation():
     using_anisotropic_conductivity = False
     if using_anisotropic_conductivity:
@@ -214,6 +246,468 @@ def test_radiation():
     T = solver.solve()
     post_process(T, interactively)
 
+def test_nonlinear_methods():
+    # modified Newton, inexact Newton and Picard should converge to the Newton solution of the radiation case
+    results = {}
+    for method in ['newton', 'modified_newton', 'inexact_newton', 'picard']:
+        s = case_settings(material = {'conductivity': conductivity, 'emissivity': 0.9},
+                          radiation_settings = {'ambient_temperature': T_ambient-20, 'emissivity': 0.9})
+        s['solver_settings']['nonlinear_solver'] = {'method': method, 'relative_tolerance': 1e-10}
+        if method == 'inexact_newton':
+            s['solver_settings']['solver_preset'] = 'diffusion'
+        solver = ScalarTransportSolver(s)
+        results[method] = solver.solve().copy(deepcopy=True)
+        if method == 'modified_newton':
+            assert solver.profiler.iterations['jacobian'] < solver.profiler.iterations['nonlinear']
+    reference = results['newton'].vector()
+    for method, T in results.items():
+        assert (T.vector() - reference).norm('linf') < 1e-6 * T_hot, method
+
+def test_inexact_newton():
+    # loose Krylov tolerance of early Newton iterations should save linear iterations, direct solver is rejected
+    from FenicsSolver.SolverBase import SolverError
+    iterations = {}
+    for forcing_term_max in (1e-10, 0.9):  # the first is Newton with an accurate Krylov solve
+        s = case_settings(material = {'conductivity': conductivity, 'emissivity': 0.9},
+                          radiation_settings = {'ambient_temperature': T_ambient-20, 'emissivity': 0.9})
+        s['solver_settings']['nonlinear_solver'] = {'method': 'inexact_newton', 'relative_tolerance': 1e-10,
+                                                     'forcing_term_max': forcing_term_max}
+        s['solver_settings']['solver_preset'] = 'diffusion'
+        solver = ScalarTransportSolver(s)
+        solver.solve()
+        iterations[forcing_term_max] = solver.profiler.iterations
+        try:  # forcing term should replace the `ksp_rtol` 1e-8 of the preset
+            ksp_rtol = solver._newton_system['solver'].ksp().getTolerances()[0]
+            assert 0 < ksp_rtol <= forcing_term_max
+        except (AttributeError, ImportError):  # dolfin without petsc4py
+            pass
+    print('iterations of accurate and inexact Krylov solve: ', iterations)
+    assert iterations[0.9]['linear'] < iterations[1e-10]['linear']
+    s['solver_settings']['solver_preset'] = 'direct'
+    try:
+        ScalarTransportSolver(s)
+        assert False, 'inexact_newton with the direct solver should raise SolverError'
+    except SolverError:
+        pass
+
+def test_tabulated_material():
+    # tabulated conductivity in case file format should reproduce the same linear function given as python lambda
+    from FenicsSolver.MaterialProperty import TabulatedProperty
+    table = {'type': 'table', 'x': [T_cold, T_hot], 'values': [0.6, 1.2], 'extrapolation': 'linear'}
+    cubic = TabulatedProperty([300, 320, 340, 360], [0.6, 0.7, 0.75, 0.76], 'cubic')
+    assert abs(cubic(320) - 0.7) < 1e-12 and cubic(400) == 0.76
+    results = []
+    for k in [table, lambda T: 0.6 + (T - T_cold) * 0.01]:
+        s = case_settings(material = {'thermal_conductivity': k})
+        solver = ScalarTransportSolver(s)
+        results.append(solver.solve().copy(deepcopy=True))
+    assert (results[0].vector() - results[1].vector()).norm('linf') < 1e-6 * T_hot
+
+    # derivative of the cubic table, numpy and UFL expression, should agree with central finite difference
+    h = 1e-4
+    for extrapolation in ('constant', 'linear'):
+        p = TabulatedProperty([300, 320, 340, 360], [0.6, 0.7, 0.75, 0.76], 'cubic', extrapolation)
+        for t in [290, 305, 319, 333, 350, 359, 370]:
+            fd = (p(t + h) - p(t - h)) / (2 * h)
+            assert abs(p.derivative(t) - fd) < 1e-6, (extrapolation, t)
+            assert abs(assemble(p.derivative(Constant(t))*dx(domain=mesh)) - fd) < 1e-6, (extrapolation, t)
+    # Newton solve with the Jacobian of the cubic table should agree with Picard iteration of lagged conductivity
+    cubic_table = {'type': 'table', 'x': [300, 320, 340, 360], 'values': [0.6, 0.7, 0.75, 0.76], 'interpolation': 'cubic'}
+    results = []
+    for method in ('newton', 'picard'):
+        s = case_settings(material = {'thermal_conductivity': cubic_table})
+        s['solver_settings']['nonlinear_solver'] = {'method': method, 'relative_tolerance': 1e-10}
+        solver = ScalarTransportSolver(s)
+        assert solver.nonlinear
+        results.append(solver.solve().copy(deepcopy=True))
+    assert (results[0].vector() - results[1].vector()).norm('linf') < 1e-6 * T_hot
+
+def test_view_factor():
+    # two parallel plates (width 1, distance 0.8) facing each other, 2D analytical view factor sqrt(1 + 0.8**2) - 0.8,
+    # facets of the same plate do not see each other, so the sparse matrix has at most half of the entries
+    import os
+    import tempfile
+    from FenicsSolver.SolverBase import SolverError
+    from FenicsSolver.ViewFactor import ViewFactorRadiation, Stefan_constant
+    parent = RectangleMesh(Point(0, 0), Point(1, 1), 40, 40)
+    markers = MeshFunction('size_t', parent, 2, 0)
+    AutoSubDomain(lambda x: x[1] < 0.1 + DOLFIN_EPS or x[1] > 0.9 - DOLFIN_EPS).mark(markers, 1)
+    plates = SubMesh(parent, markers, 1)
+    boundary_facets = MeshFunction('size_t', plates, 1, 0)
+    AutoSubDomain(lambda x, on_boundary: on_boundary and near(x[1], 0.1)).mark(boundary_facets, 1)
+    AutoSubDomain(lambda x, on_boundary: on_boundary and near(x[1], 0.9)).mark(boundary_facets, 2)
+    cache_folder = tempfile.mkdtemp()
+    settings = {'boundary_ids': [1, 2], 'emissivity': 0.8}
+    vf = ViewFactorRadiation(plates, boundary_facets, settings, 300, cache_folder)
+    n = len(vf.facets)
+    assert vf.view_factors.nnz <= n * n // 2
+    F = vf.view_factors.toarray()
+    lower, upper = vf.facet_markers == 1, vf.facet_markers == 2
+    F12 = (vf.areas[lower, None] * F[np.ix_(lower, upper)]).sum() / vf.areas[lower].sum()
+    assert abs(F12 - (math.sqrt(1 + 0.8**2) - 0.8)) < 0.02
+    assert abs(vf.areas[:, None] * F - (vf.areas[:, None] * F).T).max() < 1e-12  # reciprocity
+    assert os.path.exists(vf.get_cache_filename())
+    assert (ViewFactorRadiation(plates, boundary_facets, settings, 300, cache_folder).view_factors.toarray() == F).all()
+
+    # irradiation of the factorized radiosity system should match the dense solve
+    T = interpolate(Constant(350), FunctionSpace(plates, 'CG', 1))
+    vf.update(T)
+    G = vf.irradiation.vector().get_local()[vf.facet_dofs]
+    A = np.eye(n) - F * (1 - 0.8)
+    G_dense = np.linalg.solve(A, F.dot(0.8 * Stefan_constant * 350**4 * np.ones(n)) +
+                              (1 - F.sum(axis = 1)) * Stefan_constant * 300**4)
+    assert abs(G - G_dense).max() < 1e-8 * abs(G_dense).max()
+    try:
+        ViewFactorRadiation(plates, boundary_facets, dict(settings, maximum_facets = n - 1), 300, cache_folder)
+        assert False, 'enclosure larger than `maximum_facets` should raise SolverError'
+    except SolverError:
+        pass
+
+def test_region_fields():
+    # multi-region body source and conductivity are DG0 fields filled from subdomain markers
+    s = case_settings(body_source = {'left': {'subdomain_id': 1, 'value': 1000.0}, 'right': {'subdomain_id': 2, 'value': 3000.0}})
+    solver = ScalarTransportSolver(s)
+    solver.subdomains.set_all(1)
+    AutoSubDomain(lambda x: x[0] > 0.5 - DOLFIN_EPS).mark(solver.subdomains, 2)
+    solver.material['conductivity'] = {1: 0.6, 2: 6.0}
+    bs = solver.get_body_source()
+    dx = Measure("dx", domain = mesh, subdomain_data = solver.subdomains)
+    assert abs(assemble(bs*dx(2)) - 1500.0) < 1e-8
+    assert abs(assemble(bs*dx) - 2000.0) < 1e-8
+    assert solver.get_body_source() is bs  # filled once
+    k = solver.get_material_value(solver.material['conductivity'])
+    assert abs(assemble(k*dx) - 3.3) < 1e-8
+    T = solver.solve()
+    post_process(T, interactively)
+    solver.body_source['right']['value'] = 5000.0  # edited in place, the same field is filled again
+    assert solver.get_body_source() is bs and abs(assemble(bs*dx) - 3000.0) < 1e-8
+
+    from FenicsSolver.SolverBase import SolverError
+    try:
+        solver.get_material_value({'left': 0.6, 'right': 6.0})
+        assert False, 'region name without subdomain_id should raise SolverError'
+    except SolverError:
+        pass
+    source = Expression('x[0]', degree = 1)
+    solver.body_source = {'left': {'subdomain_id': 1, 'value': source}, 'right': {'subdomain_id': 2, 'value': 3000.0}}
+    assert isinstance(solver.get_body_source()['right']['value'], Constant)
+    assert solver.body_source['right']['value'] == 3000.0  # dict of user is not changed
+
+def test_cellwise_stabilization():
+    # for uniform velocity, SUPG tau is constant in each cell, cell-wise DG0 field should give the same solution
+    results = []
+    for cellwise, frozen in [(False, False), (True, False), (True, True)]:
+        s = case_settings(convective_velocity = Constant((0.05, -0.05)))
+        s['advection_settings'] = {'stabilization_method': 'SPUG', 'Pe': 1.0/(0.1/(4200*1000)),
+                                   'cellwise_stabilization': cellwise, 'frozen_stabilization': frozen}
+        solver = ScalarTransportSolver(s)
+        results.append(solver.solve().copy(deepcopy=True))
+        if cellwise:
+            assert 'supg_tau' in solver._cell_fields
+    for T in results[1:]:
+        assert (T.vector() - results[0].vector()).norm('linf') < 1e-6 * T_hot
+
+def test_cellwise_stabilization_varying_velocity():
+    # rotating velocity increasing with time: SUPG tau field should be the cell average (DG0 projection) of tau
+    # of the current velocity, while the frozen field keeps tau of the first step
+    Pe = 1.0/(0.1/(4200*1000))
+    for frozen in (False, True):
+        velocity = Expression(('a*(1+t/500)*(0.5-x[1])', 'a*(1+t/500)*(x[0]-0.5)'), a = 0.05, t = 0, degree = 1)
+        s = case_settings(transient_settings = dict(default_transient_settings, static_form = True),
+                          material = {'conductivity': conductivity}, convective_velocity = velocity)
+        s['advection_settings'] = {'stabilization_method': 'SPUG', 'Pe': Pe,
+                                   'cellwise_stabilization': True, 'frozen_stabilization': frozen}
+        solver = ScalarTransportSolver(s)
+        solver.solve()
+        assert velocity.t > 0
+        h = 2*Circumradius(mesh)
+        tau = 0.5*h*pow(4.0/(Pe*h) + 2.0*sqrt(dot(velocity, velocity)), -1.0)
+        reference = project(tau, FunctionSpace(mesh, 'DG', 0)).vector()
+        error = (solver._cell_fields['supg_tau'][1].vector() - reference).norm('linf') / reference.norm('linf')
+        assert (error < 1e-8) == (not frozen), (frozen, error)
+
+def test_cached_forms_reused():
+    # velocity given by content is translated once, so the cell field and the advection operator cached by
+    # the expression are reused by the form generated again for each step of a non-static run
+    for splitting in (None, 'strang'):
+        s = case_settings(transient_settings = default_transient_settings, material = {'conductivity': conductivity},
+                          convective_velocity = (1e-5, -1e-5))
+        s['advection_settings'] = {'stabilization_method': 'SPUG', 'Pe': 1.0/(0.1/(4200*1000)), 'cfl': 0.5,
+                                   'cellwise_stabilization': True, 'operator_splitting': splitting}
+        solver = ScalarTransportSolver(s)
+        solver.solve()
+        name = 'advection_courant' if splitting else 'supg_tau'
+        form, advection = solver._cell_fields[name][2], solver._advection
+        solver.generate_form(solver.current_step, solver.trial_function, solver.test_function, solver.w_current, solver.w_prev)
+        assert solver._cell_fields[name][2] is form
+        if splitting:
+            assert solver._advection is advection and advection['time_invariant'] and advection['assembled']
+
+def test_transient_static_form():
+    # form generated once and reused, should give the same result as regenerating form for each step
+    results = []
+    for static_form in (False, True):
+        s = case_settings(transient_settings = dict(default_transient_settings, static_form = static_form),
+                          material = {'conductivity': conductivity})
+        solver = ScalarTransportSolver(s)
+        results.append(solver.solve().copy(deepcopy=True))
+    diff = results[0].vector() - results[1].vector()
+    assert diff.norm('linf') < 1e-6 * results[0].vector().norm('linf')
+
+def test_reusing_linear_solver():
+    # persistent solver reusing the factorization for the time invariant operator should not change the result
+    results = []
+    for reusing in (False, True):
+        s = case_settings(transient_settings = default_transient_settings, material = {'conductivity': conductivity})
+        s['solver_settings']['reusing_linear_solver'] = reusing
+        solver = ScalarTransportSolver(s)
+        results.append(solver.solve().copy(deepcopy=True))
+        if reusing:
+            assert solver.operator_time_invariant and solver._linear_system['assembled']
+    diff = results[0].vector() - results[1].vector()
+    assert diff.norm('linf') < 1e-8 * results[0].vector().norm('linf')
+
+def test_time_invariant_values():
+    # Constant of user may be assigned between time steps, the operator is time invariant only if it is declared
+    k = Constant(conductivity)
+    for declared in (False, True):
+        s = case_settings(transient_settings = default_transient_settings, material = {'conductivity': k})
+        s['solver_settings']['reusing_linear_solver'] = True
+        solver = ScalarTransportSolver(s)
+        if declared:
+            solver.time_invariant_values.append(k)
+        solver.solve()
+        assert solver.operator_time_invariant == declared
+
+def test_translated_values():
+    # the same value content is translated once, but each user gets its own Constant or Function
+    solver = ScalarTransportSolver(case_settings())
+    a, b = solver.translate_value(T_hot), solver.translate_value(T_hot)
+    assert a is not b
+    a.assign(T_cold)
+    assert float(b) == T_hot and float(solver.translate_value(T_hot)) == T_hot
+    f, g = solver.translate_value('x[0]'), solver.translate_value('x[0]')
+    assert f is not g and (f.vector() - g.vector()).norm('linf') == 0
+
+def test_time_dependent_dirichlet():
+    # ramped Dirichlet value is updated in place for the static form, the result should equal the regenerated form
+    ramp = lambda t: Constant(T_cold + (T_hot - T_cold) * min(t / 500.0, 1.0))
+    results = []
+    for static_form in (False, True):
+        s = case_settings(transient_settings = dict(default_transient_settings, static_form = static_form),
+                          material = {'conductivity': conductivity})
+        s['boundary_conditions']['hot']['values']['temperature']['value'] = ramp
+        solver = ScalarTransportSolver(s)
+        results.append(solver.solve().copy(deepcopy=True))
+    diff = results[0].vector() - results[1].vector()
+    assert diff.norm('linf') < 1e-6 * results[0].vector().norm('linf')
+    assert abs(results[1](Point(0.5, 1.0)) - T_hot) < 1e-6 * T_hot  # not frozen at the value of the first step
+
+def test_operator_splitting():
+    # Strang splitting of explicit advection and implicit diffusion at a large time step should be close to
+    # the coupled Crank-Nicolson form at a fine time step, diffusivity k/(rho*cp) = 1.4e-4 m^2/s and velocity
+    # 2e-4 m/s give Peclet number u*L/alpha of 1.4, heat is carried by 0.2 of the domain height in 1000 s
+    def run(velocity, time_step, splitting = None, static_form = False):
+        s = case_settings(transient_settings = dict(default_transient_settings, time_step = time_step,
+                              static_form = static_form),
+                          material = {'conductivity': 600.0}, convective_velocity = velocity,
+                          advection_settings = {'stabilization_method': None, 'operator_splitting': splitting, 'cfl': 0.5})
+        solver = ScalarTransportSolver(s)
+        T = solver.solve().copy(deepcopy=True)
+        if splitting:
+            assert solver.profiler.cumulative['advection'] > 0
+        return T.vector()
+    velocity = Constant((0, -2e-4))
+    reference = run(velocity, 10)
+    advection_effect = (reference - run(None, 10)).norm('linf')
+    split = run(velocity, 100, 'strang')
+    split_error = (split - reference).norm('linf')
+    print('operator splitting: advection effect = {}, splitting error = {}'.format(advection_effect, split_error))
+    assert advection_effect > 0.05 * (T_hot - T_cold)
+    assert split_error < 0.2 * advection_effect
+    assert (split - run(velocity, 100, 'strang', True)).norm('linf') < 1e-6 * T_hot
+
+def test_adaptive_time_step():
+    # time steps should not depend on the offset of temperature, e.g. Kelvin or Celsius
+    steps = []
+    for offset in (0, -273.15):
+        s = case_settings(transient_settings = dict(default_transient_settings, time_step = 10, ending_time = 2000,
+                              adaptive_time_step = {'tolerance': 1e-3, 'minimum_time_step': 1, 'maximum_time_step': 500}),
+                          material = {'conductivity': conductivity}, initial_values = {'temperature': T_ambient + offset})
+        for name, value in (('hot', T_hot), ('cold', T_cold)):
+            s['boundary_conditions'][name]['values']['temperature']['value'] = Constant(value + offset)
+        solver = ScalarTransportSolver(s)
+        T = solver.solve()
+        assert abs(solver.current_time - 2000) < 1e-6
+        steps.append((solver.current_step, solver.rejected_steps))
+    print('adaptive time stepping: steps and rejected steps = {}'.format(steps[0]))
+    assert steps[0] == steps[1]
+
+def test_bdf_time_scheme():
+    # higher order BDF scheme should be closer to the fine step reference than backward Euler at the same time step
+    results = {}
+    for time_scheme, time_step in [(None, 10), ('BDF1', 100), ('BDF2', 100), ('BDF3', 100)]:
+        s = case_settings(transient_settings = dict(default_transient_settings, time_step = time_step,
+                              time_scheme = time_scheme),
+                          material = {'conductivity': conductivity})
+        solver = ScalarTransportSolver(s)
+        results[time_scheme] = solver.solve().copy(deepcopy=True)
+    errors = {}
+    for time_scheme in ('BDF1', 'BDF2', 'BDF3'):
+        errors[time_scheme] = (results[time_scheme].vector() - results[None].vector()).norm('linf')
+    print('error of BDF time schemes: ', errors)
+    assert errors['BDF2'] < errors['BDF1']
+
+def test_steady_state_detection():
+    # pseudo-transient run should stop early and agree with the steady solution
+    results = []
+    for transient in (False, True):
+        s = case_settings(transient_settings = dict(default_transient_settings, transient = transient, time_step = 1000,
+                              ending_time = 1e7, steady_state_detection = {'tolerance': 1e-6, 'consecutive_steps': 3}),
+                          material = {'conductivity': conductivity})
+        solver = ScalarTransportSolver(s)
+        results.append(solver.solve().copy(deepcopy=True))
+    assert solver.steady_state_step is not None and solver.steady_state_time < 1e7
+    assert solver.steady_state_time == solver.current_time  # time of the last saved result
+    diff = results[0].vector() - results[1].vector()
+    print('steady state is detected at step {}, difference from steady solution: {}'.format(solver.steady_state_step, diff.norm('linf')))
+    assert diff.norm('linf') < 1e-3 * results[0].vector().norm('linf')
+
+    # restart from the checkpoint written before the steady step should detect the steady state at the same step
+    import os.path, shutil, tempfile
+    step, time = solver.steady_state_step, solver.steady_state_time
+    folder = tempfile.mkdtemp()
+    try:
+        for restart, ending_time in ((False, time - 500), (True, 1e7)):
+            s = case_settings(transient_settings = dict(default_transient_settings, time_step = 1000, ending_time = ending_time,
+                              restart = restart, steady_state_detection = {'tolerance': 1e-6, 'consecutive_steps': 3}),
+                              material = {'conductivity': conductivity},
+                              report_settings = {'checkpoint_freq': 0 if restart else 1,
+                                                 'checkpoint_filename': os.path.join(folder, 'checkpoint.h5')})
+            solver = ScalarTransportSolver(s)
+            solver.solve()
+    finally:
+        shutil.rmtree(folder)
+    assert solver.steady_state_step == step and solver.steady_state_time == time
+
+def test_jit_warmup_variants():
+    # the other BDF time schemes of a transient case are compiled, steady only on request, case settings are not changed
+    from FenicsSolver.jit_warmup import get_form_variants
+    s = case_settings(transient_settings = dict(default_transient_settings, time_scheme = 'BDF2'))
+    solver_settings = copy.deepcopy(s['solver_settings'])
+    assert set(dict(get_form_variants(s))) == set(['case', 'BDF1', 'BDF3'])
+    variants = dict(get_form_variants(s, including_steady = True))
+    assert set(variants) == set(['case', 'steady', 'BDF1', 'BDF3'])
+    assert variants['case'] is s and s['solver_settings'] == solver_settings
+    assert not variants['steady']['solver_settings']['transient_settings']['transient']
+    assert variants['BDF3']['solver_settings']['transient_settings']['time_scheme'] == 'BDF3'
+    assert list(dict(get_form_variants(case_settings()))) == ['case']
+
+def test_checkpoint_restart():
+    # restart from the last checkpoint should reproduce the result of an uninterrupted run
+    import os.path, shutil, tempfile
+    folder = tempfile.mkdtemp()
+    results = []
+    try:
+        for restart in (False, True):
+            s = case_settings(transient_settings = dict(default_transient_settings, restart = restart),
+                              material = {'conductivity': conductivity},
+                              report_settings = {'checkpoint_freq': 0 if restart else 4,
+                                                 'checkpoint_filename': os.path.join(folder, 'checkpoint.h5')})
+            solver = ScalarTransportSolver(s)
+            results.append(solver.solve().copy(deepcopy=True))
+    finally:
+        shutil.rmtree(folder)
+    diff = results[0].vector() - results[1].vector()
+    assert diff.norm('linf') < 1e-10 * results[0].vector().norm('linf')
+
+def test_result_writer():
+    # results of all steps are appended to the stream opened once, the stream is closed also if a step fails
+    import os.path, shutil, tempfile
+    folder = tempfile.mkdtemp()
+    try:
+        for moving_mesh, failing_step in [(False, None), (True, None), (False, 5)]:
+            s = case_settings(transient_settings = default_transient_settings, material = {'conductivity': conductivity},
+                              report_settings = {'saving_freq': 1, 'result_filename': os.path.join(folder, 'result.xdmf')})
+            solver = ScalarTransportSolver(s)
+            solver.moving_mesh = moving_mesh
+            solve_current_step = solver.solve_current_step
+            def solve_step():
+                if solver.current_step == failing_step:
+                    raise RuntimeError('step {} failed'.format(failing_step))
+                solve_current_step()
+            solver.solve_current_step = solve_step
+            try:
+                solver.solve()
+                assert failing_step is None
+            except RuntimeError:
+                assert failing_step is not None
+            timings = solver.result_writer_timings
+            print('result writer of moving mesh = {}, failing step = {}: {}'.format(moving_mesh, failing_step, timings))
+            assert solver.result_writer is None and timings['write_time'] > 0
+            assert timings['results'] == (failing_step - 1 if failing_step else 9)
+    finally:
+        shutil.rmtree(folder)
+
+def test_monitors():
+    # probe and integrals recorded per step should agree with the evaluation of the final field
+    s = case_settings(transient_settings = default_transient_settings,
+                      material = {'conductivity': conductivity}, report_settings = {'saving_freq': 0})
+    s['report_settings']['monitors'] = {'probes': {'T_center': {'point': (0.5, 0.5)}},
+                    'boundary_integrals': {'cold_flux': {'boundary_id': 2, 'integrand': lambda T, n: -conductivity*dot(grad(T), n)}},
+                    'volume_integrals': {'T_total': {'subdomain_id': None, 'integrand': 'value'}},
+                    'filename': None}
+    solver = ScalarTransportSolver(s)
+    T = solver.solve()
+    records = solver.monitor.get_records()
+    assert len(records['step']) == 10
+    assert abs(records['T_center'][-1] - T(Point(0.5, 0.5))) < 1e-8 * T_hot
+    assert abs(records['T_total'][-1] - assemble(T*dx(domain=mesh))) < 1e-8 * T_hot
+
+def test_performance_report():
+    # assembly is timed separately and linear iterations are counted only by the persistent linear solver,
+    # otherwise the report notes that linear_solve includes assembly, nested phases are excluded from `exclusive`
+    import json, os.path, shutil, tempfile
+    folder = tempfile.mkdtemp()
+    try:
+        for reusing in (False, True):
+            filename = os.path.join(folder, 'performance_{}.json'.format(reusing))
+            s = case_settings(transient_settings = default_transient_settings, material = {'conductivity': conductivity},
+                              report_settings = {'saving_freq': 0, 'performance_report': filename})
+            s['solver_settings']['reusing_linear_solver'] = reusing
+            ScalarTransportSolver(s).solve()
+            report = json.load(open(filename))
+            assert len(report['steps']) == 10 and 'linear_solve' in report['cumulative']
+            assert report['peak_memory']['dofs'] == Q.dim()
+            assert ('assembly' in report['cumulative']) == reusing
+            assert ('linear_solve' in report['notes']) == (not reusing)
+            if reusing:
+                assert report['iterations']['linear'] > 0
+            for phase, seconds in report['cumulative'].items():
+                assert 0 <= report['exclusive'][phase] <= seconds + 1e-12
+            if 'boundary_setup' in report['cumulative']:  # nested in form_generation
+                assert report['exclusive']['form_generation'] < report['cumulative']['form_generation']
+    finally:
+        shutil.rmtree(folder)
+
+def test_logger():
+    # solvers of the same class have their own logger and handler, repeated messages are rate limited
+    s = case_settings(report_settings = {'logging_rate_limit': 3600})
+    solvers = [ScalarTransportSolver(s) for i in range(2)]
+    assert solvers[0].logger is not solvers[1].logger
+    for solver in solvers:
+        handlers = [h for h in solver.logger.handlers if getattr(h, 'fenicssolver_handler', False)]
+        assert len(handlers) == 1
+    records = []
+    handlers[0].emit = records.append  # capture records passing the handler filters
+    for i in range(3):
+        solver.logger.info('repeated message in the time loop')
+    solver.logger.warning('warning is not rate limited')
+    solver.logger.warning('warning is not rate limited')
+    solver.logger.debug('below the default INFO level')
+    if MPI.rank(mpi_comm_world()) == 0:
+        assert len(records) == 3
+
 def test():
     #setup(using_anisotropic_conductivity = True, using_convective_velocity = False, using_DG_solver = False, using_HTC = False)
     #setup(using_anisotropic_conductivity = False, using_convective_velocity = False, using_DG_solver = False, using_HTC = True)
@@ -222,4 +716,27 @@ def test():
 
 if __name__ == '__main__':
     test()
-    test_radiation()
\ No newline at end of file
+    test_radiation()
+    test_region_fields()
+    test_cellwise_stabilization()
+    test_cellwise_stabilization_varying_velocity()
+    test_cached_forms_reused()
+    test_transient_static_form()
+    test_reusing_linear_solver()
+    test_time_invariant_values()
+    test_translated_values()
+    test_time_dependent_dirichlet()
+    test_operator_splitting()
+    test_adaptive_time_step()
+    test_bdf_time_scheme()
+    test_steady_state_detection()
+    test_jit_warmup_variants()
+    test_checkpoint_restart()
+    test_result_writer()
+    test_monitors()
+    test_performance_report()
+    test_logger()
+    test_nonlinear_methods()
+    test_inexact_newton()
+    test_tabulated_material()
+    test_view_factor()
\ No newline at end of file